@@ -1,8 +1,6 @@
 """
 This document contains the Habit Class.
-It imports sqlite3.
 """
-import sqlite3
 
 
 # THE HABIT CLASS.
@@ -23,10 +21,12 @@ class HabitClass:
         the periodicity of the habit which can be 'weekly'  or 'daily'
     datetime_of_creation: datetime
         the date and time of when the habit was first created
+    habit_id: int
+        the id of the habit in the database (None as long as the habit is not stored)
     """
 
     # INIT METHOD.
-    def __init__(self, habit_name, owner, category, periodicity, datetime_of_creation):
+    def __init__(self, habit_name, owner, category, periodicity, datetime_of_creation, habit_id=None):
         """
         Parameters
         ----------
@@ -40,15 +40,12 @@ class HabitClass:
             the periodicity of the habit which can be 'weekly'  or 'daily'
         :param datetime_of_creation: datetime
             the date and time of when the habit was first created
+        :param habit_id: int
+            the id of the habit in the database (None as long as the habit is not stored)
         """
+        self.habit_id = habit_id
         self.habit_name = habit_name
         self.owner = owner
         self.category = category
         self.periodicity = periodicity
         self.datetime_of_creation = datetime_of_creation
-
-        from os.path import join, dirname, abspath
-        db_path = join(dirname(abspath(__file__)), 'main_db.db')
-
-        self.conn = sqlite3.connect(db_path)
-        self.cur = self.conn.cursor()
\ No newline at end of file
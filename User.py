@@ -4,14 +4,20 @@ Since our programme can create and manage several users, all functions always re
 This code part contains functions to manage the user profile, to create and manage user specific habits and
 all functions around analysis.
 
-It imports the libraries questionary, sqlite, datetime and hashlib.
-It further imports the Habit.py document to be able to use the HabitClass.
+It imports the libraries questionary, datetime, hashlib and itertools. questionary is imported by the methods that
+prompt the user, so the programme starts faster when no prompt is shown (e.g. by the commands of cli.py).
+It further imports the Habit.py document to be able to use the HabitClass, the streaks.py document that computes
+the streaks, the rollup.py document with the completion counts per period, the database.py document that
+manages the database connections and the queries.py document with the SQL statements.
 """
-import questionary
-import sqlite3
-from datetime import datetime, timedelta
+from datetime import date, datetime
+from itertools import groupby
 import Habit
 import hashlib
+import queries
+import rollup
+import streaks
+import database
 
 
 # THE USER CLASS.
@@ -31,7 +37,14 @@ class UserClass:
         the password used by the user
 
     conn:
-        Establishing a connection to the database
+        the database connection of the current thread (see database.py)
+    cur:
+        the cursor of this connection
+
+    The habits of the user are read from the database once (at the login or when they are first needed) and then
+    kept in a cache, so looking up or listing habits needs no query. Every change of a habit made through this
+    object updates the cache. Changes made by other programmes (e.g. the command line) are only seen after
+    load_habits() was called again.
 
     Methods
     -------
@@ -39,18 +52,28 @@ class UserClass:
         stores the user data into the database
     update_profile()
         function to be used to update user profile data
+    load_habits()
+        reads all habits of the user from the database into the cache
     store_habit_in_db(new_habit)
         stores a new habit into the database
     get_habit(habit_name)
-        retrieves a habit from the database and gets all its information
+        retrieves a habit and gets all its information
+    get_all_habits()
+        returns all habits of the user without printing them
     choose_predefined_habit()
         user can choose from a list of predefined habits if they have no habits stored in the db yet
     create_habit()
         lets the user create a new habit
+    add_habit(habit_name, category, periodicity)
+        creates and stores a new habit without any prompts
     delete_habit()
         lets the user delete any habit from the db
+    remove_habit(habit_name)
+        deletes a habit from the db without any prompts
     update_habit()
         lets the user update certain elements from their habit (periodicity, category)
+    change_habit(habit_name, category, periodicity)
+        changes the category and / or the periodicity of a habit without any prompts
     show_all()
         shows all habits of the user
     show_weekly_habits()
@@ -59,8 +82,24 @@ class UserClass:
         shows all daily habits of the user
     is_completed()
         herewith the user can mark a habit as done
+    complete_habit(habit_name)
+        marks a habit as done without any prompts
+    record_completions(completions)
+        marks a batch of habits as done in one transaction, optionally with their own date and time
     get_habit_progress(habit_name, periodicity)
         retrieves the progress of a certain habit with a certain periodicity from the database
+    iter_progress_periods(habit_name, periodicity)
+        reads the days or weeks in which a certain habit was completed from the rollup table
+    completions_in_current_period(habit_name)
+        counts the completions of a habit today (daily habit) or in the current week (weekly habit)
+    get_progress_arrays()
+        returns the progress of all habits of the user as NumPy arrays (see columnar.py)
+    compute_all_streaks()
+        computes the streaks of all habits of the user from the rollup table with one query
+    get_stored_streaks()
+        reads the precomputed streaks of all habits of the user
+    get_stored_streak(habit)
+        reads the precomputed streaks of one habit
     current_streak_overview()
         displays all current streaks of all habits of the user
     current_streak_habit()
@@ -77,6 +116,12 @@ class UserClass:
         computes the longest daily streak for a specific habit with the periodicity daily
     compute_longest_weekly_streak_habit(habit_name)
         computes the longest weekly streak for a specific habit with the periodicity weekly
+    compute_window_stats(habit_name, days, weeks)
+        computes the completion rate, the missed periods and the best week of a habit over the last days or weeks
+    compute_window_overview(days, weeks)
+        computes these stats for all habits of the user
+    window_stats_overview()
+        lets the user choose a time window and displays these stats for all their habits
     """
 
     # INIT METHOD.
@@ -93,12 +138,17 @@ class UserClass:
         self.lastname = lastname
         self.username = username
         self.password = password
+        # habit name --> HabitClass, in the order of creation, None until it is loaded (see load_habits())
+        self._habits = None
 
-        from os.path import join, dirname, abspath
-        db_path = join(dirname(abspath(__file__)), 'main_db.db')
+    # THE DATABASE CONNECTION IS SHARED WITH ALL OTHER OBJECTS OF THE SAME THREAD.
+    @property
+    def conn(self):
+        return database.get_connection()
 
-        self.conn = sqlite3.connect(db_path)
-        self.cur = self.conn.cursor()
+    @property
+    def cur(self):
+        return database.get_cursor()
 
     # This is followed by all functions that have to do with the user himself, such as editing the profile or similar.
 
@@ -110,9 +160,9 @@ class UserClass:
         Function is used when first registering a user.
 
         """
-        self.cur.execute("INSERT INTO users VALUES(?, ?, ?, ?)",
-                         (self.firstname, self.lastname, self.username, self.password))
-        self.conn.commit()
+        database.run_write(self.conn, lambda conn: conn.execute(queries.INSERT_USER, {
+            "firstname": self.firstname, "lastname": self.lastname, "username": self.username,
+            "password": self.password}))
 
     # AN ALREADY REGISTERED USER CAN UPDATE THEIR PROFILE.
     def update_profile(self):
@@ -126,6 +176,7 @@ class UserClass:
         By pressing 'enter' the new entry is then saved in the database.
         The user is informed that his:her entry was updated.
         """
+        import questionary
         element = questionary.select("What element do you want to change? ", choices=[
             "(1) first name",
             "(2) last name",
@@ -133,16 +184,16 @@ class UserClass:
         ]).ask()
         if element == "(1) first name":
             new_firstname = questionary.text("What should your first name now be? ").ask()
-            self.cur.execute(f"UPDATE users SET firstname = '{new_firstname}' WHERE username = '{self.username}';")
-            self.cur.fetchall()
-            self.conn.commit()
+            database.run_write(self.conn, lambda conn: conn.execute(
+                queries.UPDATE_FIRSTNAME, {"firstname": new_firstname, "username": self.username}))
+            self.firstname = new_firstname
             print(f"\nYou successfully updated your name to '{new_firstname}'.\n")
 
         elif element == "(2) last name":
             new_lastname = questionary.text("What should your last name now be? ").ask()
-            self.cur.execute(f"UPDATE users SET lastname = '{new_lastname}' WHERE username = '{self.username}';")
-            self.cur.fetchall()
-            self.conn.commit()
+            database.run_write(self.conn, lambda conn: conn.execute(
+                queries.UPDATE_LASTNAME, {"lastname": new_lastname, "username": self.username}))
+            self.lastname = new_lastname
             print(f"\nYou successfully updated your name to '{new_lastname}'.\n")
 
         elif element == "(3) password":
@@ -151,15 +202,38 @@ class UserClass:
                                                 else "Your password must be at least four characters long and can "
                                                 "contain upper and lower case letters and numbers.").ask()
             new_password = hashlib.sha256(new_password.encode('utf-8')).hexdigest()
-            self.cur.execute(f"UPDATE users SET password = '{new_password}' WHERE username = '{self.username}';")
-            self.cur.fetchall()
-            self.conn.commit()
+            database.run_write(self.conn, lambda conn: conn.execute(
+                queries.UPDATE_PASSWORD, {"password": new_password, "username": self.username}))
+            self.password = new_password
             print(f"\nYou successfully updated your password.\n")
 
 
     # This is followed by all the functions that have to do with the basic creation of the Habits
     # and their storage and retrieval from the database.
 
+    # READS ALL HABITS OF THE USER INTO THE CACHE.
+    def load_habits(self):
+        """
+        Reads all habits of the user from the database into the cache. Called at the login.
+
+        Returns
+        -------
+        :return: dict
+            Returns the habits of the user by habit name, in the order of their creation.
+        """
+        self.cur.execute(queries.SELECT_HABITS, {"owner": self.username})
+        self._habits = {habit_name: Habit.HabitClass(habit_name, owner, category, periodicity, datetime_of_creation,
+                                                     habit_id)
+                        for habit_id, habit_name, owner, category, periodicity, datetime_of_creation
+                        in self.cur.fetchall()}
+        return self._habits
+
+    # RETURNS THE CACHED HABITS, THEY ARE LOADED FIRST IF NEEDED.
+    def _get_habits(self):
+        if self._habits is None:
+            self.load_habits()
+        return self._habits
+
     # THIS STORES HABIT DATA INTO THE DATABASE.
     def store_habit_in_db(self, new_habit):
         """
@@ -172,15 +246,24 @@ class UserClass:
             but is built in within other functions. There the habit attributes are defined and assigned
             to the parameter new_habit.
         """
-        self.cur.execute("INSERT INTO habits VALUES(?, ?, ?, ?, ?)",
-                         (new_habit.habit_name, new_habit.owner, new_habit.category, new_habit.periodicity,
-                          new_habit.datetime_of_creation))
-        self.conn.commit()
+        new_habit.habit_id = database.run_write(self.conn, lambda conn: conn.execute(queries.INSERT_HABIT, {
+            "habit_name": new_habit.habit_name, "owner": new_habit.owner, "category": new_habit.category,
+            "periodicity": new_habit.periodicity, "datetime_of_creation": new_habit.datetime_of_creation}).lastrowid)
+        if new_habit.owner == self.username and self._habits is not None:
+            self._habits[new_habit.habit_name] = new_habit
+
+    # RETURNS ALL HABITS OF THE USER WITHOUT PRINTING THEM (USED BY service.py).
+    def get_all_habits(self):
+        """
+        :return: list
+            Returns all habits (HabitClass) of the user from the cache, in the order of their creation.
+        """
+        return list(self._get_habits().values())
 
-    # FUNCTION TO RETRIEVE HABIT FROM THE DB
+    # FUNCTION TO RETRIEVE A HABIT OF THE USER
     def get_habit(self, habit_name):
         """
-        Retrieves the information of a habit from the database.
+        Retrieves the information of a habit from the cache of the habits of the user.
 
         Parameters
         ----------
@@ -194,14 +277,7 @@ class UserClass:
             Returns the habit.
             If no habit by the name (habit_name) is saved in the database, it returns None.
         """
-        self.cur.execute(f"SELECT * FROM habits WHERE habit_name = '{habit_name}' AND owner = '{self.username}';")
-        list_of_habits = self.cur.fetchall()
-        if len(list_of_habits) > 0:
-            habit_name, owner, category, periodicity, datetime_of_creation = list_of_habits[0]
-            habit = Habit.HabitClass(habit_name, owner, category, periodicity, datetime_of_creation)
-            return habit
-        else:
-            return None
+        return self._get_habits().get(habit_name)
 
     # IF A USER HAS NO SAVED DATA IN THE DATABASE, THEY ARE ASKED TO CHOOSE FROM A LIST OF PREDEFINED HABITS.
     # THE USER CAN CHOOSE FROM THIS LIST AFTER INITIAL REGISTRATION.
@@ -215,10 +291,8 @@ class UserClass:
         for yes and 'n' or 'N' for no. Depending on the answer, the habit is either stored in the database or passed.
         For this purpose the function store_habit_in_db(habit_name) is used.
         """
-        self.cur.execute(f"SELECT * FROM habits WHERE owner = '{self.username}';")
-        list_of_habits = self.cur.fetchall()
-
-        if len(list_of_habits) > 0:
+        import questionary
+        if len(self._get_habits()) > 0:
             pass
 
         else:
@@ -308,7 +382,8 @@ class UserClass:
         he/she can choose from a list in which category the habit belongs (Health, Fun, Mindfulness),
         he/she can specify whether it is a "daily" or "weekly" habit.
         The assignment to the user = owner and the datetime_of_creation are created.
-        After the input, get_habit(habit_name) is used to check if the habit already exists.
+        After the input of the name, get_habit(habit_name) is used to check if the habit already exists.
+        If it does, the user is asked for another name.
 
         Return
         ------
@@ -317,10 +392,18 @@ class UserClass:
             with the function store_habit_in_db(new_habit) (this happens in the background, the user doesn't need to
             do anything)
         """
+        import questionary
         habit_name = questionary.text("Type in the name of the habit: ",
                                       validate=lambda text: True if len(text) > 0 and text.isalpha()
                                       else "Please enter a correct value. "
                                            "Your habit name should only contain upper and lowercase letters.").ask()
+        while self.get_habit(habit_name):
+            print("\nThis habit already exists. Try again!\n")
+            habit_name = questionary.text("Type in the name of the habit: ",
+                                          validate=lambda text: True if len(text) > 0 and text.isalpha()
+                                          else "Please enter a correct value. "
+                                               "Your habit name should only contain upper and lowercase letters."
+                                          ).ask()
 
         owner = self.username
 
@@ -340,13 +423,30 @@ class UserClass:
         datetime_of_creation = datetime.now()
 
         new_habit = Habit.HabitClass(habit_name, owner, category, periodicity, datetime_of_creation)
-        existing_habit = self.get_habit(habit_name)
-        if existing_habit:
-            print("\nThis habit already exists. Try again!\n")
-            self.create_habit()
-        else:
-            print("\nWell done! You created a new habit. \n")
-            return new_habit
+        print("\nWell done! You created a new habit. \n")
+        return new_habit
+
+    # CREATES AND STORES A NEW HABIT WITHOUT ANY PROMPTS (USED BY THE COMMAND LINE, SEE cli.py).
+    def add_habit(self, habit_name, category, periodicity):
+        """
+        Creates a new habit and stores it in the database.
+
+        Parameters
+        ----------
+        :param habit_name: str
+        :param category: str --> 'Health', 'Fun' or 'Mindfulness'
+        :param periodicity: str --> 'Daily' or 'Weekly'
+
+        Returns
+        -------
+        :return:
+            Returns the new habit or None if the user already has a habit with this name.
+        """
+        if self.get_habit(habit_name):
+            return None
+        new_habit = Habit.HabitClass(habit_name, self.username, category, periodicity, datetime.now())
+        self.store_habit_in_db(new_habit)
+        return new_habit
 
     # FUNCTION THAT REMOVES A HABIT OUT OF THE DB.
     def delete_habit(self):
@@ -358,18 +458,33 @@ class UserClass:
         If it does not exist, it displays a print statement to the user.
         If it does exist, it deletes the habit out of the database and prints a success statement to the user.
         """
+        import questionary
         habit_name = questionary.text("What habit do you want to delete? ",
                                       validate=lambda text: True if len(text) > 0 and text.isalpha()
                                       else "Please enter a correct value.").ask()
-        existing_habit = self.get_habit(habit_name)
-        if existing_habit:
-            self.cur.execute(f"DELETE FROM habits WHERE habit_name = '{habit_name}' AND owner = '{self.username}';")
-            self.cur.fetchall()
-            self.conn.commit()
+        if self.remove_habit(habit_name):
             print(f"'{habit_name}' successfully deleted.")
         else:
             print("\nNo such habit in the database!\n")
 
+    # REMOVES A HABIT WITHOUT ANY PROMPTS (USED BY THE COMMAND LINE, SEE cli.py).
+    def remove_habit(self, habit_name):
+        """
+        Deletes a habit and its progress out of the database.
+
+        :param habit_name: str
+        :return: bool
+            Returns True if the habit was deleted, False if the user has no habit with this name.
+        """
+        existing_habit = self.get_habit(habit_name)
+        if existing_habit is None:
+            return False
+        # the progress of the habit is deleted with it (ON DELETE CASCADE)
+        database.run_write(self.conn, lambda conn: conn.execute(queries.DELETE_HABIT,
+                                                                {"habit_id": existing_habit.habit_id}))
+        del self._habits[habit_name]
+        return True
+
     # HABIT ENTRY IS UPDATED.
     def update_habit(self):
         """
@@ -382,6 +497,7 @@ class UserClass:
         element they chose.
         After successful selection of the list items, the habit is adjusted accordingly in the database.
         """
+        import questionary
         to_change = questionary.text("What habit do you want to change? ",
                                      validate=lambda text: True if len(text) > 0 and text.isalpha()
                                      else "Please enter a correct value.").ask()
@@ -400,11 +516,8 @@ class UserClass:
                                                       "Fun",
                                                       "Mindfulness"
                                                   ]).ask()
-                self.cur.execute(f"UPDATE habits SET category = '{new_category}' WHERE habit_name = '{to_change}' "
-                                 f"AND owner = '{self.username}';")
-                self.cur.fetchall()
+                self.change_habit(to_change, category=new_category)
                 print(f"\nYou successfully updated the category of your habit to '{new_category}'.\n")
-                self.conn.commit()
 
             else:
                 new_periodicity = questionary.select("Is this a daily or weekly habit?",
@@ -412,72 +525,88 @@ class UserClass:
                                                          "Daily",
                                                          "Weekly"
                                                      ]).ask()
-                self.cur.execute(
-                    f"UPDATE habits SET periodicity = '{new_periodicity}' WHERE habit_name = '{to_change}' "
-                    f"AND owner = '{self.username}';")
-                self.cur.execute(
-                    f"UPDATE progress SET periodicity = '{new_periodicity}' WHERE habit_name = '{to_change}' "
-                    f"AND owner = '{self.username}';")
-                self.cur.fetchall()
+                self.change_habit(to_change, periodicity=new_periodicity)
                 print(f"\nYou successfully updated the periodicity of your habit to '{new_periodicity}'.\n")
-                self.conn.commit()
 
         else:
             print("This habit is not in the database.")
 
+    # CHANGES THE CATEGORY AND / OR THE PERIODICITY OF A HABIT WITHOUT ANY PROMPTS (USED BY service.py).
+    def change_habit(self, habit_name, category=None, periodicity=None):
+        """
+        Changes the category and / or the periodicity of a habit in the database and in the cache.
+        If the periodicity changes, the streaks of the habit are recomputed in the same transaction.
+
+        Parameters
+        ----------
+        :param habit_name: str
+        :param category: str --> 'Health', 'Fun' or 'Mindfulness', None to keep the category
+        :param periodicity: str --> 'Daily' or 'Weekly', None to keep the periodicity
+
+        Returns
+        -------
+        :return:
+            Returns the changed habit or None if the user has no habit with this name.
+        """
+        existing_habit = self.get_habit(habit_name)
+        if existing_habit is None:
+            return None
+        category = category or existing_habit.category
+        periodicity = periodicity or existing_habit.periodicity
+
+        def change(conn):
+            conn.execute(queries.UPDATE_HABIT, {"category": category, "periodicity": periodicity,
+                                                "habit_id": existing_habit.habit_id})
+            # the progress refers to the habit_id, so it automatically follows the new periodicity
+            if periodicity != existing_habit.periodicity:
+                streaks.rebuild_streak_table(conn, [existing_habit.habit_id])
+
+        database.run_write(self.conn, change)
+        existing_habit.category = category
+        existing_habit.periodicity = periodicity
+        return existing_habit
+
     # The following are the functions that give an overview of all the habits.
 
-    # QUERIES THE DB AND RETURNS A LIST OF ALL HABITS OF THE USER.
+    # RETURNS A LIST OF ALL HABITS OF THE USER.
     def show_all(self):
         """
-        Queries the database and prints a list of all habits of the currently logged in user.
+        Prints a list of all habits of the currently logged in user.
 
         Returns
         -------
         :return: list
             returns a list of all habits
         """
-        self.cur.execute(f"SELECT habit_name FROM habits WHERE owner = '{self.username}';")
-        items = self.cur.fetchall()
-        habits = []
-        for item in items:
-            habits.append(item[0])
+        habits = list(self._get_habits())
         print(habits)
         return habits
 
-    # QUERIES THE DB AND RETURNS A LIST OF WEEKLY HABITS OF THE USER.
+    # RETURNS A LIST OF WEEKLY HABITS OF THE USER.
     def show_weekly_habits(self):
         """
-        Queries the database and returns a list of the weekly habits of the currently logged in user.
+        Returns a list of the weekly habits of the currently logged in user.
 
         Returns
         -------
         :return: list
             returns a list of weekly habits
         """
-        self.cur.execute(f"SELECT habit_name FROM habits WHERE periodicity = 'Weekly' AND owner = '{self.username}';")
-        items = self.cur.fetchall()
-        habits = []
-        for item in items:
-            habits.append(item[0])
+        habits = [habit.habit_name for habit in self._get_habits().values() if habit.periodicity == "Weekly"]
         print(habits)
         return habits
 
-    # QUERIES THE DB AND RETURNS A LIST OF ALL DAILY HABITS OF THE USER.
+    # RETURNS A LIST OF ALL DAILY HABITS OF THE USER.
     def show_daily_habits(self):
         """
-        Queries the database and returns a list of the daily habits of the currently logged in user.
+        Returns a list of the daily habits of the currently logged in user.
 
         Returns
         -------
         :return: list
             returns a list of all daily habits
         """
-        self.cur.execute(f"SELECT habit_name FROM habits WHERE periodicity = 'Daily' AND owner = '{self.username}';")
-        items = self.cur.fetchall()
-        habits = []
-        for item in items:
-            habits.append(item[0])
+        habits = [habit.habit_name for habit in self._get_habits().values() if habit.periodicity == "Daily"]
         print(habits)
         return habits
 
@@ -491,30 +620,90 @@ class UserClass:
         The program prompts the user to enter the name of the habit they want to mark as completed.
         They are only able to enter upper and lowercase letters.
         If the habit exists in the database, the program sets the date and time of completion and saved the progress
-        in the progress table of the database.
+        in the progress table of the database. The streak of the habit in the streaks table is updated with it.
         The user is informed via print statement if they were successful with the completion progress.
         """
+        import questionary
         to_complete = questionary.text("What habit do you want to mark as completed? ",
                                        validate=lambda text: True if len(text) > 0 and text.isalpha()
                                        else "Please enter a correct value.").ask()
-        existing_habit = self.get_habit(to_complete)
-
-        if existing_habit:
-            datetime_of_completion = datetime.now()
-            self.cur.execute("INSERT INTO progress VALUES(?, ?, ?, ?)",
-                             (existing_habit.habit_name, existing_habit.periodicity, self.username,
-                              datetime_of_completion))
-            self.conn.commit()
+        if self.complete_habit(to_complete):
             print("Yippie! You completed your habit. Well done!")
 
         else:
             print("This habit does not exist.")
 
+    # MARKS A HABIT AS DONE WITHOUT ANY PROMPTS (USED BY THE COMMAND LINE, SEE cli.py).
+    def complete_habit(self, habit_name):
+        """
+        Saves a completion of a habit with the current date and time in the progress table
+        and updates the streak of the habit in the streaks table.
+
+        :param habit_name: str
+        :return: bool
+            Returns True if the completion was saved, False if the user has no habit with this name.
+        """
+        return not self.record_completions([habit_name])
+
+    # MARKS SEVERAL HABITS AS DONE IN ONE TRANSACTION (E.G. A BURST OF COMPLETIONS SENT BY A DEVICE).
+    def record_completions(self, completions):
+        """
+        Saves a batch of completions in the progress table and updates the streaks table once for the whole batch.
+
+        The habit names are checked against the cached habits of the user (see load_habits()).
+        All completions of known habits are stored in one transaction, completions of unknown habits are skipped.
+        A completion can have its own date and time, e.g. to backfill completions that were recorded offline.
+
+        Parameters
+        ----------
+        :param completions:
+            An iterable of habit names (completed now) and / or (habit_name, datetime_of_completion) tuples.
+            The date and time of completion can be a datetime or an ISO string like '2021-08-07 11:57:59.369350'.
+
+        Returns
+        -------
+        :return: list
+            Returns the names of the unknown habits (empty if all completions were saved).
+        """
+        habits = self._get_habits()
+
+        now = datetime.now()
+        rows = []
+        streak_updates = []
+        unknown = []
+        for completion in completions:
+            habit_name, datetime_of_completion = (completion, now) if isinstance(completion, str) else completion
+            if isinstance(datetime_of_completion, str):
+                datetime_of_completion = datetime.fromisoformat(datetime_of_completion)
+            if habit_name not in habits:
+                if habit_name not in unknown:
+                    unknown.append(habit_name)
+                continue
+            habit = habits[habit_name]
+            rows.append((habit.habit_id, datetime_of_completion, *streaks.completion_columns(datetime_of_completion)))
+            streak_updates.append((habit.habit_id, habit.periodicity, datetime_of_completion))
+
+        if rows:
+            database.run_write(self.conn, self._store_completions, rows, streak_updates)
+        return unknown
+
+    # STORES COMPLETIONS AND UPDATES THE STREAKS (INSIDE THE TRANSACTION OF database.run_write()).
+    def _store_completions(self, conn, rows, streak_updates):
+        conn.executemany(queries.INSERT_PROGRESS, rows)
+        # the rollup table first, backfilled streaks are recomputed from it
+        rollup.add_completions(conn, ((habit_id, datetime_of_completion)
+                                      for habit_id, periodicity, datetime_of_completion in streak_updates))
+        streaks.record_completions(conn, streak_updates)
+
     # GETS ALL SAVED PROGRESS DATA OF A USER.
     def get_habit_progress(self, habit_name, periodicity):
         """
         Gets the date and time of completion of a specific habit from the progress table of the database.
 
+        The completions are always returned in chronological order, also if they were imported or backfilled
+        in a different order. The order comes from the progress index (habit_id, datetime_of_completion),
+        so the database does not need to sort them.
+
         Parameters
         ----------
         Both parameters are assigned within the functions compute_current_daily_streak, compute_current_weekly_streak,
@@ -531,9 +720,10 @@ class UserClass:
             user_progress --> if there is any saved progress in the database
             None --> if there is no progress saved
         """
-        self.cur.execute(f"SELECT datetime_of_completion FROM progress "
-                         f"WHERE owner = '{self.username}' AND habit_name = '{habit_name}' "
-                         f"AND periodicity = '{periodicity}';")
+        habit = self.get_habit(habit_name)
+        if habit is None or habit.periodicity != periodicity:
+            return None
+        self.cur.execute(queries.SELECT_COMPLETIONS, {"habit_id": habit.habit_id})
         user_progress = self.cur.fetchall()
 
         if len(user_progress) > 0:
@@ -542,29 +732,154 @@ class UserClass:
         else:
             return None
 
+    # READS THE PERIODS OF A HABIT FROM THE ROLLUP TABLE.
+    def iter_progress_periods(self, habit_name, periodicity, newest_first=False):
+        """
+        Reads the days (daily habit) or weeks (weekly habit) in which a specific habit was completed (generator).
+
+        The periods come from the rollup table (see rollup.py), which has one row per period, no matter how often
+        the habit was completed in it. So the weekly streaks do not need to collapse the completions into weeks.
+
+        Parameters
+        ----------
+        :param habit_name: str
+        :param periodicity: str --> 'Daily' or 'Weekly'
+        :param newest_first: bool
+            True for descending order, False for ascending order
+
+        Returns
+        -------
+        :return:
+            Yields the day or week ordinals. Yields nothing if the user has no such habit.
+        """
+        habit = self.get_habit(habit_name)
+        if habit is None or habit.periodicity != periodicity:
+            return
+        yield from rollup.iter_periods(self.conn, habit.habit_id, periodicity, newest_first)
+
+    # COUNTS THE COMPLETIONS OF A HABIT IN THE CURRENT DAY OR WEEK.
+    def completions_in_current_period(self, habit_name):
+        """
+        Counts how often a habit was completed today (daily habit) or in the current calendar week (weekly habit),
+        e.g. to check whether a weekly habit is already done this week. Reads one row of the rollup table.
+
+        :param habit_name: str
+        :return: int
+            Returns the number of completions, None if the user has no such habit.
+        """
+        habit = self.get_habit(habit_name)
+        if habit is None:
+            return None
+        period = streaks.to_period(datetime.now().date().toordinal(), habit.periodicity)
+        return rollup.count_in_period(self.conn, habit.habit_id, habit.periodicity, period)
+
+    # RETURNS THE PROGRESS OF THE USER AS NUMPY ARRAYS.
+    def get_progress_arrays(self):
+        """
+        Returns the completions of all habits of the user as NumPy arrays, e.g. for analyses with pandas.
+        Needs numpy, which is imported only here (see columnar.py).
+
+        :return: dict
+            Returns the arrays of columnar.load_history(); columnar.compute_streaks() computes their streaks.
+        """
+        import columnar
+        return columnar.load_history([self.username], self.conn)
+
     # Everything that has to do with the current streak of the habits.
 
+    # COMPUTES THE STREAKS OF ALL HABITS OF THE USER FROM THE ROLLUP TABLE.
+    def compute_all_streaks(self, today=None):
+        """
+        Computes the current and the longest streak of every habit of the user from the rollup table.
+
+        The days (daily habits) or weeks (weekly habits) with a completion are fetched for all habits of the user
+        with one query, one row per period (see rollup.py), ordered by habit and period (this order is served by
+        the primary key of the rollup table). The rows are then grouped by habit in one single pass and handed to
+        the streak engine, so no habit needs a query of its own.
+
+        Parameters
+        ----------
+        :param today: date
+            The day the current streaks are computed for, defaults to today.
+
+        Returns
+        -------
+        :return: dict
+            Returns {habit_name: {"periodicity": ..., "current": ..., "longest": ...}} for every habit of the user,
+            in the order the habits were created.
+        """
+        self.cur.execute(queries.SELECT_PERIODS_OF_USER, {"owner": self.username})
+        today = (today or datetime.now().date()).toordinal()
+
+        all_streaks = {}
+        for (habit_id, habit_name, periodicity), rows in groupby(self.cur, key=lambda row: row[:3]):
+            periods = (row[3] for row in rows if row[3] is not None)
+            current, longest = streaks.compute_streaks(periods, streaks.to_period(today, periodicity),
+                                                       streaks.GRACE[periodicity])
+            all_streaks[habit_name] = {"periodicity": periodicity, "current": current, "longest": longest}
+        return all_streaks
+
+    # READS THE PRECOMPUTED STREAKS OF ALL HABITS OF THE USER.
+    def get_stored_streaks(self):
+        """
+        Reads the precomputed current and longest streaks of all habits of the user from the streaks table.
+
+        The streaks table is updated whenever a habit is completed, so no progress history needs to be scanned.
+        Only if the latest completion of a habit lies in the future (e.g. imported data), the streaks are
+        computed from the history with compute_all_streaks().
+
+        Returns
+        -------
+        :return: dict
+            Returns {habit_name: {"periodicity": ..., "current": ..., "longest": ...}} for every habit of the user,
+            in the order the habits were created (same format as compute_all_streaks()).
+        """
+        self.cur.execute(queries.SELECT_STORED_STREAKS, {"owner": self.username})
+        rows = self.cur.fetchall()
+        today = datetime.now().date().toordinal()
+
+        stored_streaks = {}
+        for habit_name, periodicity, current_streak, longest_streak, last_period in rows:
+            current_period = streaks.to_period(today, periodicity)
+            if last_period is not None and last_period > current_period:
+                return self.compute_all_streaks()
+            current_streak = streaks.current_from_table(current_streak, last_period, current_period,
+                                                        streaks.GRACE[periodicity])
+            stored_streaks[habit_name] = {"periodicity": periodicity, "current": current_streak,
+                                          "longest": longest_streak or 0}
+        return stored_streaks
+
+    # READS THE PRECOMPUTED STREAKS OF ONE HABIT.
+    def get_stored_streak(self, habit):
+        """
+        Reads the precomputed current and longest streak of one habit (see get_stored_streaks()).
+
+        :param habit: HabitClass
+            a habit of the user as returned by get_habit()
+        :return: tuple
+            Returns (current streak, longest streak).
+        """
+        habit_streak = self.get_stored_streaks().get(habit.habit_name)
+        if habit_streak is None:
+            return 0, 0
+        return habit_streak["current"], habit_streak["longest"]
+
     # SHOWS THE USER A CURRENT STREAK OVERVIEW OF ALL THEIR HABITS SORTED BY PERIODICITY
     def current_streak_overview(self):
         """
         Shows the user a current streak overview of all their habits sorted by periodicity.
 
-        First selects all daily habits from the database with the owner == user and prints them to the user.
-        Then selects all weekly habits from the database with the owner == user and prints them.
+        Reads the streaks of all habits of the user at once (see get_stored_streaks()).
+        First prints the streaks of all daily habits to the user, then the streaks of all weekly habits.
         """
-        self.cur.execute(f"SELECT habit_name FROM habits WHERE owner = '{self.username}' AND periodicity = 'Daily';")
-        items = self.cur.fetchall()
-        for item in items:
-            habit_name = item[0]
-            daily_streak = self.compute_current_daily_streak(habit_name)
-            print(f"The current streak of {habit_name} is: ", daily_streak, " day(s)")
+        all_streaks = self.get_stored_streaks()
+        for habit_name, habit_streak in all_streaks.items():
+            if habit_streak["periodicity"] == "Daily":
+                print(f"The current streak of {habit_name} is: ", habit_streak["current"], " day(s)")
 
-        self.cur.execute(f"SELECT habit_name FROM habits WHERE owner = '{self.username}' AND periodicity = 'Weekly';")
-        items = self.cur.fetchall()
-        for item in items:
-            habit_name = item[0]
-            weekly_streak = self.compute_current_weekly_streak(habit_name)
-            print(f"The current streak of {habit_name} is: ", weekly_streak, " week(s)")
+        for habit_name, habit_streak in all_streaks.items():
+            if habit_streak["periodicity"] == "Weekly":
+                print(f"The current streak of {habit_name} is: ", habit_streak["current"], " week(s)")
 
     # RETURNS THE CURRENT STREAK OF A HABIT.
     # AUTOMATICALLY FILTERS IF THE HABIT IS A DAILY OR WEEKLY HABIT AND OUTPUTS THE DATA ACCORDINGLY.
@@ -573,30 +888,21 @@ class UserClass:
         Returns the current streak of a specific habit from the logged in user.
 
         User is asked to enter a habit name.
-        If the habit exists, the function gets its periodicity.
-        If the periodicity is 'Daily' it calls the function compute_current_daily_streak, otherwise it calls the
-        function compute_current_weekly_streak
+        If the habit exists, the function reads its precomputed streak and displays it in days or weeks,
+        depending on the periodicity of the habit.
         """
+        import questionary
         habit_name = questionary.text("For which habit do you want to see the current streak? ",
                                       validate=lambda text: True if len(text) > 0 and text.isalpha()
                                       else "Please enter a correct value.").ask()
         existing_habit = self.get_habit(habit_name)
-        periodicity = existing_habit.periodicity
 
         if existing_habit:
-            if periodicity == "Daily":
-                streak = self.compute_current_daily_streak(habit_name)
-                if streak is not None:
-                    print(f"The current streak of {habit_name} is: ", streak, " day(s)")
-                else:
-                    print("This habit does not exist.")
-
+            streak, longest_streak = self.get_stored_streak(existing_habit)
+            if existing_habit.periodicity == "Daily":
+                print(f"The current streak of {habit_name} is: ", streak, " day(s)")
             else:
-                streak = self.compute_current_weekly_streak(habit_name)
-                if streak is not None:
-                    print(f"The current streak of {habit_name} is: ", streak, " week(s)")
-                else:
-                    print("This habit does not exist.")
+                print(f"The current streak of {habit_name} is: ", streak, " week(s)")
         else:
             print("This habit does not exist.")
 
@@ -606,6 +912,8 @@ class UserClass:
         Computes the current streak of a habit with the periodicity daily.
 
         Function cannot be called directly by the user but is used within other functions.
+        A daily streak still counts if the habit was last completed yesterday.
+        The days / weeks are read newest first and only until the streak breaks (see iter_progress_periods()).
 
         Parameters
         ----------
@@ -618,24 +926,9 @@ class UserClass:
             Returns a number as the streak count (zero to infinite)
             Gives it to the functions current_streak_habit and current_streak_overview to be displayed to the user.
         """
-        habit_progress_total = self.get_habit_progress(habit_name, periodicity="Daily")
-        if habit_progress_total is None:
-            return 0
-        ref = datetime.now() - timedelta(days=1)
-        habits = []
-        for habit in reversed(habit_progress_total):
-            habit = datetime.strptime(habit[0], '%Y-%m-%d %H:%M:%S.%f')
-            habits.append(habit)
-        streak = 1 if datetime.now().date() == habits[0].date() else 0
-
-        for habit in habits[streak:]:
-            if habit.date() == ref.date():
-                streak += 1
-                ref -= timedelta(days=1)
-            else:
-                break
-
-        return streak
+        today = datetime.now().date().toordinal()
+        days = self.iter_progress_periods(habit_name, periodicity="Daily", newest_first=True)
+        return streaks.current_streak(days, today, grace=1)
 
     # COMPUTES THE CURRENT STREAK OF A HABIT WITH THE PERIODICITY WEEKLY
     def compute_current_weekly_streak(self, habit_name):
@@ -643,6 +936,10 @@ class UserClass:
         Computes the current streak of a habit with the periodicity weekly.
 
         Function cannot be called directly by the user but is used within other functions.
+        A weekly streak only counts if the habit was completed in the current calendar week.
+        The calendar weeks are counted across the turn of the year, so week 52 or 53 is followed by week 1
+        of the next year (see streaks.week_ordinal()).
+        The days / weeks are read newest first and only until the streak breaks (see iter_progress_periods()).
 
         Parameters
         ----------
@@ -655,53 +952,9 @@ class UserClass:
             Returns a number as the streak count (zero to infinite)
             Gives it to the functions current_streak_habit and current_streak_overview to be displayed to the user.
         """
-        habit_progress_total = self.get_habit_progress(habit_name, periodicity="Weekly")
-        if habit_progress_total is None:
-            return 0
-
-        # saves all habits in a list
-        habits = []
-        for habit in reversed(habit_progress_total):
-            x = datetime.strptime(habit[0], '%Y-%m-%d %H:%M:%S.%f')
-            habits.append(x)
-
-        # finds out which calendar week the stored data corresponds to
-        calendar_weeks = []
-        for n in range(0, len(habits)):
-            weeks = habits[n].isocalendar()[1]
-            calendar_weeks.append(weeks)
-
-        # deletes all duplicate / same values, so that the calendar week is stored only once
-        adj_calendar_weeks = []
-        x = []
-        for e in calendar_weeks:
-            if e not in x:
-                adj_calendar_weeks.append(e)
-                x.append(e)
-
-        now = datetime.now()
-        now_week = now.isocalendar()[1]
-
-        # computes the streak
-        streak = []
-        if len(adj_calendar_weeks) == 1:
-            if adj_calendar_weeks[0] == now_week:
-                streak.append(1)
-                list_sum = sum(streak)
-                return list_sum
-
-        elif len(adj_calendar_weeks) >= 2 and adj_calendar_weeks[0] == now_week:
-            streak.append(1)
-            for n in range(0, len(adj_calendar_weeks)-1):
-                x = adj_calendar_weeks[n] - adj_calendar_weeks[n + 1]
-                if x == 1:
-                    streak.append(1)
-                else:
-                    break
-            list_sum = sum(streak)
-            return list_sum
-        else:
-            return 0
+        weeks = self.iter_progress_periods(habit_name, periodicity="Weekly", newest_first=True)
+        this_week = streaks.week_ordinal(datetime.now().date().toordinal())
+        return streaks.current_streak(weeks, this_week)
 
     # Everything that has to do with the longest streak of the habits.
 
@@ -710,43 +963,27 @@ class UserClass:
         """
         Shows the user their longest streak of all their habits sorted by periodicity.
 
-        First selects all daily habits from the database with the owner == user,
-        then computes the longest streak from all habits and then prints the longest one to the user.
-
-        Then selects all weekly habits from the database with the owner == user,
-        then computes the longest streak from all habits and then prints the longest one to the user.
+        Reads the streaks of all habits of the user at once (see get_stored_streaks()).
+        Then prints the longest streak among all daily habits
+        and the longest streak among all weekly habits to the user.
         """
-        # daily habits
-        self.cur.execute(f"SELECT habit_name FROM habits WHERE owner = '{self.username}' AND periodicity = 'Daily';")
-        all_daily_habits = self.cur.fetchall()
-        daily_habits = []
-        for habit in all_daily_habits:
-            daily_habits.append(habit)
+        all_streaks = self.get_stored_streaks()
 
-        streaks = []
-        for habit in daily_habits:
-            longest_daily_habit_streak = self.compute_longest_daily_streak_habit(habit[0])
-            streaks.append((habit[0], longest_daily_habit_streak))
-
-        max_value = max(streaks, key=lambda e: e[1])
-        print(f"Your longest daily streak among all your daily habits is {max_value[1]} day(s). "
-              f"The habit '{max_value[0]}' is your strongest!")
+        # daily habits
+        daily_streaks = [(habit_name, habit_streak["longest"]) for habit_name, habit_streak in all_streaks.items()
+                         if habit_streak["periodicity"] == "Daily"]
+        if daily_streaks:
+            max_value = max(daily_streaks, key=lambda e: e[1])
+            print(f"Your longest daily streak among all your daily habits is {max_value[1]} day(s). "
+                  f"The habit '{max_value[0]}' is your strongest!")
 
         # weekly habits
-        self.cur.execute(f"SELECT habit_name FROM habits WHERE owner = '{self.username}' AND periodicity = 'Weekly';")
-        all_weekly_habits = self.cur.fetchall()
-        weekly_habits = []
-        for habit in all_weekly_habits:
-            weekly_habits.append(habit)
-
-        streaks = []
-        for habit in weekly_habits:
-            longest_weekly_habit_streak = self.compute_longest_weekly_streak_habit(habit[0])
-            streaks.append((habit[0], longest_weekly_habit_streak))
-
-        max_value = max(streaks, key=lambda e: e[1])
-        print(f"Your longest weekly streak among all your weekly habits is {max_value[1]} weeks(s). "
-              f"You're doing great with habit '{max_value[0]}'!")
+        weekly_streaks = [(habit_name, habit_streak["longest"]) for habit_name, habit_streak in all_streaks.items()
+                          if habit_streak["periodicity"] == "Weekly"]
+        if weekly_streaks:
+            max_value = max(weekly_streaks, key=lambda e: e[1])
+            print(f"Your longest weekly streak among all your weekly habits is {max_value[1]} weeks(s). "
+                  f"You're doing great with habit '{max_value[0]}'!")
 
     # ASKS THE USER FOR WHICH HABIT THEY WANT TO SEE THE LONGEST STREAK.
     # THEN SHOWS THE LONGEST STREAK FOR THE CHOSEN HABIT.
@@ -757,23 +994,20 @@ class UserClass:
 
         Asks the user for which habit they want to see the longest streak.
         Automatically filters if the habit is daily or weekly.
-        Uses the functions get_habit(), compute_longest_daily_streak_habit(), compute_longest_weekly_streak_habit().
+        Uses the functions get_habit() and get_stored_streak().
         """
+        import questionary
         habit_name = questionary.text("For which habit do you want to see your longest streak? ",
                                       validate=lambda text: True if len(text) > 0 and text.isalpha()
                                       else "Please enter a correct value.").ask()
         existing_habit = self.get_habit(habit_name)
-        periodicity = existing_habit.periodicity
 
         if existing_habit:
-            if periodicity == "Daily":
-                streak = self.compute_longest_daily_streak_habit(habit_name)
-                if streak is not None:
-                    print(f"The longest streak of {habit_name} is: ", streak, " day(s)")
+            current_streak, streak = self.get_stored_streak(existing_habit)
+            if existing_habit.periodicity == "Daily":
+                print(f"The longest streak of {habit_name} is: ", streak, " day(s)")
             else:
-                streak = self.compute_longest_weekly_streak_habit(habit_name)
-                if streak is not None:
-                    print(f"The longest streak of {habit_name} is: ", streak, " week(s)")
+                print(f"The longest streak of {habit_name} is: ", streak, " week(s)")
 
         else:
             print("This habit does not exist.")
@@ -783,9 +1017,8 @@ class UserClass:
         """
         Computes the longest streak of a habit with the periodicity daily.
 
-        Pulls all progress data from the database, stores and cleans the data in a list. Subtracts the values from each
-        other. The differences are saved in a new list. The streak is calculated if the number is a 1,
-        otherwise the loop breaks, then the maximum streak count is determined.
+        Reads the days with a completion in ascending order from the rollup table and hands them to the streak
+        engine, which counts the consecutive days in one pass and keeps the maximum streak count.
 
         Parameters
         ----------
@@ -797,75 +1030,19 @@ class UserClass:
         :return: int
              Returns a number from 0 to infinite (max_value) as the longest streak count.
         """
-        habit_progress_total = self.get_habit_progress(habit_name, periodicity="Daily")
-        if habit_progress_total is None:
-            return 0
-
-        habits = []
-        for habit in reversed(habit_progress_total):
-            habit = datetime.strptime(habit[0], '%Y-%m-%d %H:%M:%S.%f')
-            habits.append(habit)
-
-        # calculates the difference between the values
-        diff = []
-        streak = 1 if datetime.now().date() == habits[0].date() else 0
-        diff.append(streak)
-
-        for n in range(0, len(habits)-1):
-            difference = habits[n].date() - habits[n+1].date()
-            diff.append(difference.days)
-
-        # cleans up the differences in the list for easier reuse
-        adj_diff = [99]
-        for n in diff:
-            if n == 1:
-                adj_diff.append(1)
-            elif n == 0 and adj_diff[-1] != 0:
-                adj_diff.append(0)
-            elif n != 0:
-                adj_diff.append(99)
-
-        temp_diff = []
-        for i in range(1, len(adj_diff)-1):
-            if adj_diff[i] == 99 and adj_diff[i+1] == 1:
-                temp_diff.append(99)
-                temp_diff.append(1)
-            else:
-                temp_diff.append(adj_diff[i])
-
-        final_diff = temp_diff + adj_diff[-1:]
-
-        for i in range(len(final_diff)):
-            if final_diff[i] == 0:
-                final_diff[i] = 1
-
-        # calculates the streak
-        # stores the values in the cache until a 99 appears
-        # then the loop breaks, the values are summed and the max. value is output
-        streak_count = []
-        cache = []
-        for n in final_diff:
-            if n == 1:
-                cache.append(1)
-            else:
-                list_sum = sum(cache)
-                streak_count.append(list_sum)
-                cache.clear()
-                continue
-        list_sum = sum(cache)
-        streak_count.append(list_sum)
-
-        max_value = max(streak_count)
-        return max_value
+        days = self.iter_progress_periods(habit_name, periodicity="Daily")
+        today = datetime.now().date().toordinal()
+        current, longest = streaks.compute_streaks(days, today, grace=1)
+        return longest
 
     # COMPUTES THE LONGEST STREAK OF A HABIT WITH THE PERIODICITY WEEKLY
     def compute_longest_weekly_streak_habit(self, habit_name):
         """
         Computes the longest streak of a habit with the periodicity weekly.
 
-        Pulls all progress data from the database, stores and cleans the data in a list. Subtracts the values from each
-        other. The differences are saved in a new list.
-        The streak is calculated and the maximum streak count is returned.
+        Reads the weeks with a completion in ascending order from the rollup table and hands them to the streak
+        engine, which counts the consecutive calendar weeks in one pass and keeps the maximum streak count.
+        Since week ordinals include the year, the same week number in different years is never merged.
 
         Parameters
         ----------
@@ -877,64 +1054,129 @@ class UserClass:
         :return: int
              Returns a number from 0 to infinite (max_value) as the longest streak count.
         """
-        habit_progress_total = self.get_habit_progress(habit_name, periodicity="Weekly")
-        if habit_progress_total is None:
-            return 0
-
-        habits = []
-        for habit in reversed(habit_progress_total):
-            habit = datetime.strptime(habit[0], '%Y-%m-%d %H:%M:%S.%f')
-            habits.append(habit)
-
-        # finds out which calendar week the stored data corresponds to
-        calendar_weeks = []
-        for n in range(0, len(habits)):
-            weeks = habits[n].isocalendar()[1]
-            calendar_weeks.append(weeks)
-
-        # deletes all duplicate / same values, so that the calendar week is stored only once
-        adj_calendar_weeks = []
-        x = []
-        for e in calendar_weeks:
-            if e not in x:
-                adj_calendar_weeks.append(e)
-                x.append(e)
-
-        # computes the difference between the calendar weeks
-        diff = [1]
-        for n in range(0, len(adj_calendar_weeks)-1):
-            x = adj_calendar_weeks[n] - adj_calendar_weeks[n+1]
-            diff.append(x)
-
-        if len(adj_calendar_weeks) >= 2:
-            if adj_calendar_weeks[-1] != adj_calendar_weeks[-2]:
-                diff.append(1)
-
-            adj_diff = [1]
-            for i in range(1, len(diff)-1):
-                if diff[i] > 1 and diff[i+1] == 1:
-                    adj_diff.append(99)
-                    adj_diff.append(1)
-                else:
-                    adj_diff.append(diff[i])
-
-            # calculates the streak
-            # stores the values in the cache until a 99 appears
-            # then the loop breaks, the values are summed and the max. value is output
-            streak_count = []
-            cache = []
-            for n in adj_diff:
-                if n == 1:
-                    cache.append(1)
-                else:
-                    list_sum = sum(cache)
-                    streak_count.append(list_sum)
-                    cache.clear()
-                    continue
-            list_sum = sum(cache)
-            streak_count.append(list_sum)
-
-            max_value = max(streak_count)
-            return max_value
+        weeks = self.iter_progress_periods(habit_name, periodicity="Weekly")
+        this_week = streaks.week_ordinal(datetime.now().date().toordinal())
+        current, longest = streaks.compute_streaks(weeks, this_week)
+        return longest
+
+    # Everything that has to do with the stats of a time window (e.g. the last 30 days).
+
+    # COMPUTES THE COMPLETION RATE, THE MISSED PERIODS AND THE BEST WEEK OF A HABIT OVER A TIME WINDOW.
+    def compute_window_stats(self, habit_name, days=None, weeks=None, today=None):
+        """
+        Computes the stats of a habit over the last days or weeks up to today.
+
+        The window covers the last `days` days (incl. today) or the last `weeks` calendar weeks (incl. the current
+        week). A daily habit has one period per day of the window, a weekly habit one period per calendar week that
+        overlaps the window. A weekly habit always counts whole calendar weeks, so the completions of the first week
+        are counted also on the days before the window. Periods before the habit was created (or first completed,
+        for imported data) are not counted. The current period is only counted as missed once it is over.
+
+        Only the completion counts of the days (daily habit) or weeks (weekly habit) of the window are read from
+        the rollup table (one range scan of its primary key), the rest of the history is not touched.
+
+        Parameters
+        ----------
+        :param habit_name: str
+        :param days: int
+            the length of the window in days, e.g. 7, 30 or 90
+        :param weeks: int
+            the length of the window in calendar weeks (instead of days)
+        :param today: date
+            the last day of the window, defaults to today
+
+        Returns
+        -------
+        :return: dict
+            Returns None if the user has no such habit, otherwise
+            * periodicity, first_day and last_day (ISO dates) of the window
+            * periods --> the number of days or weeks of the window since the habit exists
+            * completed --> the number of these periods with at least one completion
+            * missed --> the number of these periods that are over and have no completion
+            * missed_periods --> the first day (ISO date) of every missed period
+            * completion_rate --> completed / (completed + missed), None if no period counts yet
+            * completions --> the number of completions in these periods
+            * best_week --> {"week_start": ISO date of the Monday, "completions": ...} of the week with the most
+              completions in the window, None if there are no completions
+            Raises ValueError unless exactly one of days and weeks is a positive number.
+        """
+        if (days is None) == (weeks is None) or (days if days is not None else weeks) < 1:
+            raise ValueError("Please give either a positive number of days or of weeks.")
+        habit = self.get_habit(habit_name)
+        if habit is None:
+            return None
+
+        last_day = (today or datetime.now().date()).toordinal()
+        if days is not None:
+            first_day = last_day - days + 1
         else:
-            return 1
+            first_day = streaks.week_ordinal(last_day) * 7 + 1 - 7 * (weeks - 1)
+        # the habit exists since it was created or first completed (imported progress can be older)
+        first_completion = rollup.first_period(self.conn, habit.habit_id, "Daily")
+        start_day = max(first_day, min(streaks.day_ordinal(habit.datetime_of_creation),
+                                       first_completion if first_completion is not None else last_day))
+
+        first_period = streaks.to_period(start_day, habit.periodicity)
+        current_period = streaks.to_period(last_day, habit.periodicity)
+        period_counts = dict(rollup.iter_window(self.conn, habit.habit_id, habit.periodicity, first_period,
+                                                current_period))
+        if habit.periodicity == "Weekly":
+            week_counts = period_counts
+        else:
+            week_counts = {}
+            for day, completions in period_counts.items():
+                week = streaks.week_ordinal(day)
+                week_counts[week] = week_counts.get(week, 0) + completions
+        completed = len(period_counts)
+        missed_periods = [period for period in range(first_period, current_period) if period not in period_counts]
+
+        def first_day_of(period):
+            return date.fromordinal(period * 7 + 1 if habit.periodicity == "Weekly" else period).isoformat()
+
+        best_week = max(week_counts.items(), key=lambda item: (item[1], item[0]), default=None)
+        return {
+            "periodicity": habit.periodicity,
+            "first_day": date.fromordinal(first_day).isoformat(),
+            "last_day": date.fromordinal(last_day).isoformat(),
+            "periods": max(current_period - first_period + 1, 0),
+            "completed": completed,
+            "missed": len(missed_periods),
+            "missed_periods": [first_day_of(period) for period in missed_periods],
+            "completion_rate": completed / (completed + len(missed_periods)) if completed or missed_periods else None,
+            "completions": sum(period_counts.values()),
+            "best_week": {"week_start": date.fromordinal(best_week[0] * 7 + 1).isoformat(),
+                          "completions": best_week[1]} if best_week else None,
+        }
+
+    # COMPUTES THE STATS OF A TIME WINDOW FOR ALL HABITS OF THE USER.
+    def compute_window_overview(self, days=None, weeks=None, today=None):
+        """
+        :return: dict
+            Returns {habit_name: compute_window_stats(...)} for every habit of the user, in the order the habits
+            were created. The parameters are the same as for compute_window_stats().
+        """
+        return {habit.habit_name: self.compute_window_stats(habit.habit_name, days, weeks, today)
+                for habit in self.get_all_habits()}
+
+    # SHOWS THE USER THE STATS OF A TIME WINDOW FOR ALL THEIR HABITS.
+    def window_stats_overview(self):
+        """
+        Asks the user for a time window (the last 7, 30 or 90 days or the last 12 weeks) and shows the completion
+        rate, the missed days or weeks and the best week of every habit in this window.
+        Uses the function compute_window_overview().
+        """
+        import questionary
+        windows = {"the last 7 days": {"days": 7}, "the last 30 days": {"days": 30},
+                   "the last 90 days": {"days": 90}, "the last 12 weeks": {"weeks": 12}}
+        window = questionary.select("For which time do you want to see your stats? ", choices=list(windows)).ask()
+        overview = self.compute_window_overview(**windows[window])
+        if not overview:
+            print("You have no habits yet.")
+        for habit_name, stats in overview.items():
+            unit = "day(s)" if stats["periodicity"] == "Daily" else "week(s)"
+            rate = f"{stats['completion_rate']:.0%}" if stats["completion_rate"] is not None else "-"
+            print(f"{habit_name}: completed in {stats['completed']} of {stats['periods']} {unit} ({rate}), "
+                  f"missed {stats['missed']} {unit}, {stats['completions']} completion(s)")
+            if stats["best_week"]:
+                print(f"    best week: {stats['best_week']['completions']} completion(s) in the week of "
+                      f"{stats['best_week']['week_start']}")
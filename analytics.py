@@ -0,0 +1,172 @@
+"""
+This document contains the analytics report over all users of our programme.
+It runs without any prompts, e.g. as a nightly job:
+    python analytics.py [--workers 4] [--csv filepath/report.csv] [--date 2021-08-07]
+
+For every habit of every user the report contains the current streak, the longest streak and the number of
+completions. The users are split into chunks which are analysed in parallel by a pool of processes, every
+process with its own database connection. The results are written into the table streak_report of the
+database or into a CSV file.
+
+It imports the libraries argparse, csv, multiprocessing, os and datetime and the ProcessPoolExecutor of
+concurrent.futures.
+It further imports database.py for the database connections and User.py to compute the streaks.
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+import database
+import User
+
+REPORT_HEADER = ["report_date", "owner", "habit_name", "periodicity", "current_streak", "longest_streak",
+                 "completions"]
+
+
+# SPLITS THE USERS INTO CHUNKS FOR THE WORKER PROCESSES.
+def partition(usernames, chunks):
+    """
+    Splits a list of usernames into at most the given number of chunks of (almost) the same size.
+
+    :param usernames: list
+    :param chunks: int
+    :return: list
+        Returns a list of lists of usernames.
+    """
+    chunks = max(1, min(chunks, len(usernames)))
+    return [usernames[n::chunks] for n in range(chunks)]
+
+
+# ANALYSES A CHUNK OF USERS. RUNS IN A WORKER PROCESS.
+def analyse_users(usernames, report_date):
+    """
+    Computes the report rows for a chunk of users.
+
+    Runs in a worker process, which uses its own database connection (see database.py).
+
+    Parameters
+    ----------
+    :param usernames: list
+        the users to analyse
+    :param report_date: date
+        the day the current streaks are computed for
+
+    Returns
+    -------
+    :return: list
+        Returns one row (see REPORT_HEADER) per habit of the users.
+    """
+    cur = database.get_cursor()
+    rows = []
+    for username in usernames:
+        user = User.UserClass(None, None, username, None)
+        all_streaks = user.compute_all_streaks(report_date)
+        cur.execute("SELECT habits.habit_name, count(progress.progress_id) FROM habits "
+                    "LEFT JOIN progress ON progress.habit_id = habits.habit_id "
+                    "WHERE habits.owner = ? GROUP BY habits.habit_id;", (username,))
+        completions = dict(cur.fetchall())
+        for habit_name, habit_streak in all_streaks.items():
+            rows.append((report_date.isoformat(), username, habit_name, habit_streak["periodicity"],
+                         habit_streak["current"], habit_streak["longest"], completions[habit_name]))
+    return rows
+
+
+# WRITES THE REPORT ROWS INTO THE DATABASE.
+def store_report(conn, report_date, chunks_of_rows):
+    """
+    Stores the report rows in the table streak_report. An older report of the same day is replaced.
+
+    :param conn: an open database connection
+    :param report_date: date
+    :param chunks_of_rows: an iterable of lists of report rows
+    :return: int
+        Returns the number of stored rows.
+    """
+    conn.execute("""CREATE TABLE IF NOT EXISTS streak_report (
+                    report_date text,
+                    owner text,
+                    habit_name text,
+                    periodicity text,
+                    current_streak integer,
+                    longest_streak integer,
+                    completions integer,
+                    PRIMARY KEY (report_date, owner, habit_name)
+                    )""")
+    # the rows are computed before the write lock is taken, so other writers are not blocked meanwhile
+    chunks_of_rows = list(chunks_of_rows)
+
+    def replace_report(conn):
+        conn.execute("DELETE FROM streak_report WHERE report_date = ?", (report_date.isoformat(),))
+        for rows in chunks_of_rows:
+            conn.executemany("INSERT INTO streak_report VALUES(?, ?, ?, ?, ?, ?, ?)", rows)
+        return sum(len(rows) for rows in chunks_of_rows)
+
+    return database.run_write(conn, replace_report)
+
+
+# WRITES THE REPORT ROWS INTO A CSV FILE.
+def write_report(path, chunks_of_rows):
+    """
+    Writes the report rows into a CSV file.
+
+    :param path: str
+    :param chunks_of_rows: an iterable of lists of report rows
+    :return: int
+        Returns the number of written rows.
+    """
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file, lineterminator="\n")
+        writer.writerow(REPORT_HEADER)
+        for rows in chunks_of_rows:
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+
+# RUNS THE REPORT OVER ALL USERS.
+def run_report(workers=None, csv_path=None, report_date=None, chunks_per_worker=4):
+    """
+    Computes the report for all users with a pool of worker processes.
+
+    Parameters
+    ----------
+    :param workers: int
+        the number of worker processes, defaults to the number of CPU cores
+    :param csv_path: str
+        if given, the report is written into this CSV file instead of the table streak_report
+    :param report_date: date
+        the day the current streaks are computed for, defaults to today
+    :param chunks_per_worker: int
+        every worker gets several smaller chunks, so that fast workers can take over work of slow ones
+
+    Returns
+    -------
+    :return: int
+        Returns the number of report rows.
+    """
+    workers = workers or os.cpu_count() or 1
+    report_date = report_date or date.today()
+    conn = database.get_connection()
+    usernames = [row[0] for row in conn.execute("SELECT username FROM users ORDER BY rowid")]
+    chunks = partition(usernames, workers * chunks_per_worker)
+
+    # the workers are started instead of forked, so none of them inherits the open database connection above
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=database.configure, initargs=(database.get_db_path(),)) as executor:
+        chunks_of_rows = executor.map(analyse_users, chunks, [report_date] * len(chunks))
+        if csv_path:
+            return write_report(csv_path, chunks_of_rows)
+        return store_report(conn, report_date, chunks_of_rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Computes the streak report over all users.")
+    parser.add_argument("--workers", type=int, help="number of worker processes (default: number of CPU cores)")
+    parser.add_argument("--csv", help="write the report into this CSV file instead of the database")
+    parser.add_argument("--date", type=date.fromisoformat, help="report date (YYYY-MM-DD, default: today)")
+    args = parser.parse_args()
+    count = run_report(args.workers, args.csv, args.date)
+    print(f"The report contains {count} habit(s).")
@@ -0,0 +1,413 @@
+"""
+This document contains the benchmarks of our programme.
+It generates a synthetic database and measures how long the database queries and the streak computations take.
+The results are written into a JSON file, so the results of two runs (e.g. before and after a change) can be
+compared with each other:
+    python benchmark.py run --output before.json
+    python benchmark.py run --output after.json
+    python benchmark.py compare before.json after.json
+
+The size of the synthetic database can be chosen, e.g. 1000 users with 20 habits each and 5 years of progress:
+    python benchmark.py run --users 1000 --habits 20 --years 5 --output results.json
+A generated database is kept and reused as long as the same parameters are used.
+
+Besides the queries, the start of the programme is measured: the import of main.py and a complete command of
+cli.py (python main.py stats ...), each in a new Python process.
+The entry "statement_cache" of the report compares repeated reads of the stored streaks with and without the
+prepared statements that every connection keeps (see database.STATEMENT_CACHE_SIZE).
+
+It imports the libraries argparse, contextlib, io, json, os, platform, random, sqlite3, statistics, subprocess, sys,
+tempfile and time, as well as datetime.
+It further imports database.py, initialisation.py, queries.py, streaks.py and User.py.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+import database
+import initialisation
+import queries
+import streaks
+import User
+
+# HABITS OF THE SYNTHETIC USERS, THE SAME AS THE PREDEFINED HABITS.
+HABIT_TEMPLATES = [("Yoga", "Health", "Weekly"), ("Walking", "Health", "Daily"), ("Drawing", "Fun", "Weekly"),
+                   ("Singing", "Fun", "Daily"), ("Meditation", "Mindfulness", "Weekly"),
+                   ("Journaling", "Mindfulness", "Daily")]
+# PASSWORD OF ALL SYNTHETIC USERS.
+PASSWORD = "password"
+
+
+# GENERATES THE ROWS OF THE SYNTHETIC PROGRESS.
+def generate_completions(periodicity, first_day, last_day, rng, completion_rate=0.8):
+    """
+    Generates the completions of one habit between two days (generator).
+
+    A habit is completed in a day (or week) with the probability completion_rate, so the history contains
+    streaks of different lengths.
+
+    Parameters
+    ----------
+    :param periodicity: str --> 'Daily' or 'Weekly'
+    :param first_day: date
+    :param last_day: date
+    :param rng: random.Random
+    :param completion_rate: float
+
+    Returns
+    -------
+    :return:
+        Yields the datetime of every completion in chronological order.
+    """
+    step = timedelta(days=7 if periodicity == "Weekly" else 1)
+    day = first_day
+    while day <= last_day:
+        if rng.random() < completion_rate:
+            offset = rng.randrange(7) if periodicity == "Weekly" else 0
+            completion_day = min(day + timedelta(days=offset), last_day)
+            yield datetime(completion_day.year, completion_day.month, completion_day.day,
+                           rng.randrange(6, 23), rng.randrange(60), rng.randrange(60), rng.randrange(1000000))
+        day += step
+
+
+# GENERATES A SYNTHETIC DATABASE.
+def generate_database(path, users=50, habits=10, years=5, seed=1):
+    """
+    Generates a synthetic database with users, habits and progress.
+
+    Parameters
+    ----------
+    :param path: str
+        the path of the new database file (an existing file is replaced)
+    :param users: int
+        the number of users
+    :param habits: int
+        the number of habits per user (half of them daily, half of them weekly)
+    :param years: int
+        the number of years of progress up to today
+    :param seed: int
+        the seed of the random numbers, the same seed generates the same database
+
+    Returns
+    -------
+    :return: int
+        Returns the number of progress rows.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    rng = random.Random(seed)
+    last_day = date.today()
+    first_day = last_day - timedelta(days=365 * years)
+
+    conn = sqlite3.connect(path)
+    initialisation.migrate_database(conn)
+    progress_rows = 0
+    with conn:
+        for n in range(users):
+            username = f"user{n}"
+            conn.execute("INSERT INTO users VALUES(?, ?, ?, ?)",
+                         ("Bench", "Mark", username, initialisation.hash_password(PASSWORD)))
+            for h in range(habits):
+                habit_name, category, periodicity = HABIT_TEMPLATES[h % len(HABIT_TEMPLATES)]
+                cur = conn.execute("INSERT INTO habits (habit_name, owner, category, periodicity, "
+                                   "datetime_of_creation) VALUES(?, ?, ?, ?, ?)",
+                                   (f"{habit_name}{h}", username, category, periodicity, datetime.now()))
+                habit_id = cur.lastrowid
+                rows = [(habit_id, completion, *streaks.completion_columns(completion))
+                        for completion in generate_completions(periodicity, first_day, last_day, rng)]
+                conn.executemany(queries.INSERT_PROGRESS, rows)
+                progress_rows += len(rows)
+        initialisation.rebuild_derived_tables(conn)
+    conn.close()
+    return progress_rows
+
+
+# MEASURES HOW LONG A FUNCTION TAKES.
+def measure(function, arguments, repeat=3):
+    """
+    Calls a function once for every entry of arguments and repeats this several times.
+
+    Parameters
+    ----------
+    :param function: the function to measure
+    :param arguments: list
+        a list of argument tuples, e.g. one tuple per habit
+    :param repeat: int
+        the number of repetitions
+
+    Returns
+    -------
+    :return: dict
+        Returns the number of calls and the min / median / mean / p95 / max duration of one call in milliseconds.
+    """
+    durations = []
+    # the overviews print their results, which is not part of the measurement
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            for args in arguments:
+                start = time.perf_counter()
+                function(*args)
+                durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    return {
+        "calls": len(durations),
+        "min_ms": durations[0],
+        "median_ms": statistics.median(durations),
+        "mean_ms": statistics.fmean(durations),
+        "p95_ms": durations[int(0.95 * (len(durations) - 1))],
+        "max_ms": durations[-1],
+    }
+
+
+# CHOOSES THE USERS WHOSE HABITS ARE MEASURED.
+def choose_usernames(conn, sample_users=20, seed=1):
+    """
+    :param conn: an open database connection
+    :param sample_users: int
+        the number of users
+    :param seed: int
+        the seed for the choice of the users
+    :return: list
+        Returns the usernames of randomly chosen users, the same seed chooses the same users.
+    """
+    usernames = [row[0] for row in conn.execute("SELECT username FROM users ORDER BY rowid")]
+    return random.Random(seed).sample(usernames, min(sample_users, len(usernames)))
+
+
+# RUNS ALL BENCHMARKS ON A DATABASE.
+def run_benchmarks(db_path, sample_users=20, repeat=3, seed=1):
+    """
+    Measures the database queries and streak computations of the UserClass on a database.
+
+    Parameters
+    ----------
+    :param db_path: str
+        the path of the database
+    :param sample_users: int
+        the number of randomly chosen users whose habits are measured
+    :param repeat: int
+        the number of repetitions
+    :param seed: int
+        the seed for the choice of the users
+
+    Returns
+    -------
+    :return: dict
+        Returns the results per measured function (see measure()).
+    """
+    database.configure(db_path)
+    try:
+        conn = database.get_connection()
+        users = [User.UserClass("Bench", "Mark", username, PASSWORD)
+                 for username in choose_usernames(conn, sample_users, seed)]
+
+        daily_habits = []
+        weekly_habits = []
+        for user in users:
+            for habit_name, periodicity in conn.execute("SELECT habit_name, periodicity FROM habits WHERE owner = ? "
+                                                        "ORDER BY habit_id", (user.username,)):
+                if periodicity == "Daily":
+                    daily_habits.append((user, habit_name))
+                else:
+                    weekly_habits.append((user, habit_name))
+
+        all_habits = [(user, habit_name, "Daily") for user, habit_name in daily_habits] + \
+                     [(user, habit_name, "Weekly") for user, habit_name in weekly_habits]
+        per_user = [(user,) for user in users]
+        return {
+            "get_habit_progress": measure(User.UserClass.get_habit_progress, all_habits, repeat),
+            "compute_current_daily_streak": measure(User.UserClass.compute_current_daily_streak,
+                                                    daily_habits, repeat),
+            "compute_current_weekly_streak": measure(User.UserClass.compute_current_weekly_streak,
+                                                     weekly_habits, repeat),
+            "compute_longest_daily_streak_habit": measure(User.UserClass.compute_longest_daily_streak_habit,
+                                                          daily_habits, repeat),
+            "compute_longest_weekly_streak_habit": measure(User.UserClass.compute_longest_weekly_streak_habit,
+                                                           weekly_habits, repeat),
+            "current_streak_overview": measure(User.UserClass.current_streak_overview, per_user, repeat),
+            "longest_streak_overview": measure(User.UserClass.longest_streak_overview, per_user, repeat),
+        }
+    finally:
+        database.configure()
+
+
+# MEASURES THE STORED STREAKS WITH AND WITHOUT THE STATEMENT CACHE.
+def measure_statement_cache(db_path, sample_users=20, repeat=3, seed=1, calls=10):
+    """
+    Measures repeated reads of the stored streaks (UserClass.get_stored_streaks()) once with connections that
+    prepare every statement again (cached_statements=0) and once with the default statement cache.
+
+    Parameters
+    ----------
+    :param db_path: str
+        the path of the database
+    :param sample_users: int
+        the number of randomly chosen users whose streaks are read
+    :param repeat: int
+        the number of repetitions
+    :param seed: int
+        the seed for the choice of the users
+    :param calls: int
+        the number of reads per user and repetition, the same statement is executed again and again
+
+    Returns
+    -------
+    :return: dict
+        Returns the results without the cache ("uncached") and with the cache ("cached", see measure()) and
+        the ratio of their median durations ("ratio", uncached / cached).
+    """
+    cache_size = database.STATEMENT_CACHE_SIZE
+    results = {}
+    database.configure(db_path)
+    try:
+        for name, size in [("uncached", 0), ("cached", cache_size)]:
+            database.set_statement_cache_size(size)
+            conn = database.get_connection()
+            users = [(User.UserClass("Bench", "Mark", username, PASSWORD),)
+                     for username in choose_usernames(conn, sample_users, seed)]
+            results[name] = measure(User.UserClass.get_stored_streaks, users * calls, repeat)
+    finally:
+        database.set_statement_cache_size(cache_size)
+        database.configure()
+    cached_median = results["cached"]["median_ms"]
+    results["ratio"] = results["uncached"]["median_ms"] / cached_median if cached_median else None
+    return results
+
+
+# MEASURES HOW LONG THE PROGRAMME TAKES TO START.
+def measure_startup(db_path, repeat=3):
+    """
+    Measures the start of the programme, every call in a new Python process.
+
+    * startup_import --> the import of main.py
+    * startup_cli_stats --> the command "python main.py stats" of the first synthetic user (incl. the login)
+
+    Parameters
+    ----------
+    :param db_path: str
+        the path of the database
+    :param repeat: int
+        the number of repetitions
+
+    Returns
+    -------
+    :return: dict
+        Returns the results per measured command (see measure()).
+    """
+    folder = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, HABIT_TRACKER_DB=db_path)
+    commands = {
+        "startup_import": [sys.executable, "-c", "import main"],
+        "startup_cli_stats": [sys.executable, os.path.join(folder, "main.py"), "stats", "--user", "user0",
+                              "--password", PASSWORD],
+    }
+    return {name: measure(lambda command=command: subprocess.run(command, cwd=folder, env=env, check=True,
+                                                                 stdout=subprocess.DEVNULL),
+                          [()], repeat)
+            for name, command in commands.items()}
+
+
+# RUNS THE BENCHMARKS AND WRITES THE RESULTS INTO A JSON FILE.
+def run(users=50, habits=10, years=5, sample_users=20, repeat=3, seed=1, db_path=None, output=None):
+    """
+    Generates the synthetic database (if needed), runs all benchmarks and writes the results into a JSON file.
+
+    Returns
+    -------
+    :return: dict
+        Returns the parameters, the environment and the results of the run.
+    """
+    parameters = {"users": users, "habits": habits, "years": years, "seed": seed, "date": date.today().isoformat()}
+    db_path = db_path or os.path.join(tempfile.gettempdir(),
+                                      f"habit_benchmark_{users}_{habits}_{years}_{seed}_{parameters['date']}.db")
+    if not os.path.exists(db_path):
+        parameters["progress_rows"] = generate_database(db_path, users, habits, years, seed)
+    else:
+        with contextlib.closing(sqlite3.connect(db_path)) as conn:
+            parameters["progress_rows"] = conn.execute("SELECT count(*) FROM progress").fetchone()[0]
+
+    report = {
+        "parameters": parameters,
+        "environment": {"python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                        "machine": platform.machine(), "system": platform.system()},
+        "results": {**run_benchmarks(db_path, sample_users, repeat, seed), **measure_startup(db_path, repeat)},
+        "statement_cache": measure_statement_cache(db_path, sample_users, repeat, seed),
+    }
+    if output:
+        with open(output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    return report
+
+
+# COMPARES THE RESULTS OF TWO RUNS.
+def compare(before, after):
+    """
+    Compares the median durations of two runs.
+
+    Parameters
+    ----------
+    :param before: dict
+        the report of the first run (as written by run())
+    :param after: dict
+        the report of the second run
+
+    Returns
+    -------
+    :return: list
+        Returns (name, median before, median after, ratio after / before) for every function measured in both runs.
+    """
+    rows = []
+    for name, result in after["results"].items():
+        if name in before["results"]:
+            median_before = before["results"][name]["median_ms"]
+            median_after = result["median_ms"]
+            rows.append((name, median_before, median_after, median_after / median_before if median_before else None))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks of the habit tracker.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--users", type=int, default=50)
+    run_parser.add_argument("--habits", type=int, default=10, help="habits per user")
+    run_parser.add_argument("--years", type=int, default=5, help="years of progress")
+    run_parser.add_argument("--sample-users", type=int, default=20, help="users whose habits are measured")
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--db", help="path of the synthetic database (default: in the temp folder)")
+    run_parser.add_argument("--output", help="JSON file for the results")
+
+    compare_parser = subparsers.add_parser("compare", help="compare the results of two runs")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        report = run(args.users, args.habits, args.years, args.sample_users, args.repeat, args.seed, args.db,
+                     args.output)
+        print(f"{report['parameters']['progress_rows']} progress rows")
+        for name, result in report["results"].items():
+            print(f"{name:40} {result['median_ms']:10.3f} ms (median of {result['calls']} calls)")
+        statement_cache = report["statement_cache"]
+        print(f"{'get_stored_streaks without statement cache':40} {statement_cache['uncached']['median_ms']:10.3f} ms, "
+              f"with: {statement_cache['cached']['median_ms']:.3f} ms ({statement_cache['ratio']:.2f}x)")
+    else:
+        with open(args.before, encoding="utf-8") as file:
+            before_report = json.load(file)
+        with open(args.after, encoding="utf-8") as file:
+            after_report = json.load(file)
+        for name, median_before, median_after, ratio in compare(before_report, after_report):
+            ratio_text = f"{ratio:.2f}x" if ratio is not None else "-"
+            print(f"{name:40} {median_before:10.3f} ms -> {median_after:10.3f} ms  {ratio_text}")
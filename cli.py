@@ -0,0 +1,131 @@
+"""
+This document contains the command line of our programme.
+With it, the habit tracker can be used without any prompts, e.g. by scripts, cron jobs or other devices.
+Every command does its work in one call of main.py and then ends:
+    python main.py login --user testuser1 --password 1234
+    python main.py complete --user testuser1 --habit Yoga [--habit Walking] [--at "2021-08-07 11:57"]
+    python main.py create --user testuser1 --habit Reading --category Fun --periodicity Daily
+    python main.py delete --user testuser1 --habit Reading
+    python main.py stats --user testuser1 [--json]
+
+Instead of --password the password can be set in the environment variable HABIT_TRACKER_PASSWORD,
+so it does not show up in the list of processes.
+Every command ends with the exit code 0 if it was successful and 1 if not.
+
+It imports the libraries argparse, json, os and sys as well as datetime.
+It further imports initialisation.py for the database and the login.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+import initialisation
+
+
+# BUILDS THE PARSER FOR THE COMMANDS.
+def build_parser():
+    """
+    Builds the parser for the commands and their arguments.
+
+    :return: argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser(prog="main.py", description="Habit Tracker without prompts. "
+                                                                 "Start main.py without a command to use the menu.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_command(name, help_text):
+        subparser = subparsers.add_parser(name, help=help_text)
+        subparser.add_argument("--user", required=True, help="your username")
+        subparser.add_argument("--password", help="your password (default: $HABIT_TRACKER_PASSWORD)")
+        return subparser
+
+    add_command("login", "check username and password")
+
+    complete = add_command("complete", "mark one or more habits as completed")
+    complete.add_argument("--habit", required=True, action="append", help="the habit (can be repeated)")
+    complete.add_argument("--at", type=datetime.fromisoformat,
+                          help="date and time of the completion, e.g. '2021-08-07 11:57' (default: now)")
+
+    create = add_command("create", "create a new habit")
+    create.add_argument("--habit", required=True)
+    create.add_argument("--category", required=True, choices=["Health", "Fun", "Mindfulness"])
+    create.add_argument("--periodicity", required=True, choices=["Daily", "Weekly"])
+
+    delete = add_command("delete", "delete a habit and its progress")
+    delete.add_argument("--habit", required=True)
+
+    stats = add_command("stats", "show the current and the longest streak of all habits")
+    stats.add_argument("--json", action="store_true", help="print the streaks as JSON")
+    return parser
+
+
+# RUNS ONE COMMAND.
+def main(argv=None):
+    """
+    Runs the command given on the command line.
+
+    Parameters
+    ----------
+    :param argv: list
+        the arguments of the command line without the name of the programme (default: sys.argv[1:])
+
+    Returns
+    -------
+    :return: int
+        Returns the exit code: 0 if the command was successful, 1 if not.
+    """
+    args = build_parser().parse_args(argv)
+    password = args.password if args.password is not None else os.environ.get("HABIT_TRACKER_PASSWORD")
+    if password is None:
+        print("Please enter your password with --password or in $HABIT_TRACKER_PASSWORD.", file=sys.stderr)
+        return 1
+
+    initialisation.launch_database()
+    user = initialisation.authenticate(args.user, password)
+    if user is None:
+        print("Invalid username or password.", file=sys.stderr)
+        return 1
+
+    if args.command == "login":
+        print("Login successful!")
+        return 0
+
+    if args.command == "complete":
+        datetime_of_completion = args.at or datetime.now()
+        missing = user.record_completions((habit_name, datetime_of_completion) for habit_name in args.habit)
+        for habit_name in missing:
+            print(f"The habit '{habit_name}' does not exist.", file=sys.stderr)
+        completed = len([habit_name for habit_name in args.habit if habit_name not in missing])
+        if completed:
+            print(f"{completed} habit(s) completed.")
+        return 1 if missing else 0
+
+    if args.command == "create":
+        if user.add_habit(args.habit, args.category, args.periodicity) is None:
+            print(f"The habit '{args.habit}' already exists.", file=sys.stderr)
+            return 1
+        print(f"The habit '{args.habit}' was created.")
+        return 0
+
+    if args.command == "delete":
+        if not user.remove_habit(args.habit):
+            print(f"The habit '{args.habit}' does not exist.", file=sys.stderr)
+            return 1
+        print(f"'{args.habit}' successfully deleted.")
+        return 0
+
+    # stats
+    all_streaks = user.get_stored_streaks()
+    if args.json:
+        print(json.dumps(all_streaks, indent=2))
+    else:
+        for habit_name, habit_streak in all_streaks.items():
+            unit = "day(s)" if habit_streak["periodicity"] == "Daily" else "week(s)"
+            print(f"{habit_name}: current streak {habit_streak['current']} {unit}, "
+                  f"longest streak {habit_streak['longest']} {unit}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
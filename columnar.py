@@ -0,0 +1,142 @@
+"""
+This document contains the columnar export of the progress history for analyses with NumPy (or pandas).
+
+load_history() reads the completions of one, several or all users with one query and returns them as NumPy arrays,
+one array per column, e.g.:
+    history = columnar.load_history(usernames=["testuser1"])
+    history["completed"]        --> datetime64 array of the date and time of every completion
+    history["habit_id"]         --> the habit of every completion, see history["habits"] for name, owner, ...
+    pandas.DataFrame({key: value for key, value in history.items() if key != "habits"})
+compute_streaks() computes the current and the longest streak of all these habits at once, vectorized over the
+arrays instead of looping over the completions.
+
+It imports the library numpy (install via "pip install numpy"), which is only needed for this document,
+as well as datetime.
+It further imports database.py for the database connection and streaks.py for the grace periods.
+"""
+from datetime import date
+import numpy as np
+import database
+import streaks
+
+
+# READS THE PROGRESS HISTORY AS NUMPY ARRAYS.
+def load_history(usernames=None, conn=None):
+    """
+    Reads the completions of the given users (or of all users) as NumPy arrays.
+
+    The completions are read with one query; the columns are converted into arrays as a whole, not row by row.
+
+    Parameters
+    ----------
+    :param usernames: list
+        the users whose completions are read, None for all users
+    :param conn: an open database connection, defaults to the connection of database.py
+
+    Returns
+    -------
+    :return: dict
+        Returns the arrays of the completions, all of the same length:
+        * habit_id --> int64, the habit of the completion
+        * completed --> datetime64[us], the date and time of the completion
+        * day --> int64, the day ordinal of the completion (see streaks.py)
+        * weekly --> bool, True if the habit is a weekly habit
+        and under "habits" the arrays of the habits of the users (also the ones without completions),
+        sorted by habit_id: habit_id, habit_name, owner and weekly.
+    """
+    conn = conn or database.get_connection()
+    condition = ""
+    params = ()
+    if usernames is not None:
+        params = list(usernames)
+        condition = f" WHERE habits.owner IN ({', '.join('?' for _ in params)})"
+
+    habit_rows = conn.execute("SELECT habit_id, habit_name, owner, periodicity = 'Weekly' FROM habits"
+                              f"{condition} ORDER BY habit_id", params).fetchall()
+    habit_ids, habit_names, owners, habit_weekly = zip(*habit_rows) if habit_rows else ((), (), (), ())
+    habits = {
+        "habit_id": np.array(habit_ids, dtype=np.int64),
+        "habit_name": np.array(habit_names, dtype=object),
+        "owner": np.array(owners, dtype=object),
+        "weekly": np.array(habit_weekly, dtype=bool),
+    }
+
+    rows = conn.execute("SELECT progress.habit_id, progress.datetime_of_completion, progress.day_ordinal "
+                        f"FROM progress JOIN habits ON habits.habit_id = progress.habit_id{condition}",
+                        params).fetchall()
+    completion_ids, completed, days = zip(*rows) if rows else ((), (), ())
+    habit_id = np.array(completion_ids, dtype=np.int64)
+    return {
+        "habit_id": habit_id,
+        "completed": np.array(completed, dtype="datetime64[us]"),
+        "day": np.array(days, dtype=np.int64),
+        # the periodicity of every completion is looked up in the (sorted) habit arrays
+        "weekly": habits["weekly"][np.searchsorted(habits["habit_id"], habit_id)],
+        "habits": habits,
+    }
+
+
+# COMPUTES THE STREAKS OF ALL HABITS OF A HISTORY AT ONCE.
+def compute_streaks(history, today=None):
+    """
+    Computes the current and the longest streak of every habit of a history (see load_history()), vectorized.
+
+    The results are the same as those of streaks.compute_streaks() for every single habit:
+    the completions are turned into periods (days or weeks), sorted by habit and period and reduced to one
+    entry per period. A streak ends wherever the habit changes or the gap to the next period is larger than one.
+    The current streak is the streak of the latest period up to today, if it is within the grace period.
+
+    Parameters
+    ----------
+    :param history: dict
+        the arrays returned by load_history()
+    :param today: date
+        the day the current streaks are computed for, defaults to today
+
+    Returns
+    -------
+    :return: dict
+        Returns the arrays habit_id, current and longest (int64), one entry per habit of history["habits"].
+    """
+    today = (today or date.today()).toordinal()
+    habit_ids = history["habits"]["habit_id"]
+    current = np.zeros(len(habit_ids), dtype=np.int64)
+    longest = np.zeros(len(habit_ids), dtype=np.int64)
+    result = {"habit_id": habit_ids, "current": current, "longest": longest}
+    if len(history["habit_id"]) == 0:
+        return result
+
+    weekly = history["weekly"]
+    # the week ordinal of streaks.week_ordinal()
+    periods = np.where(weekly, (history["day"] - 1) // 7, history["day"])
+    order = np.lexsort((periods, history["habit_id"]))
+    habit = history["habit_id"][order]
+    periods = periods[order]
+    weekly = weekly[order]
+
+    # one entry per habit and period
+    unique = np.ones(len(habit), dtype=bool)
+    unique[1:] = (habit[1:] != habit[:-1]) | (periods[1:] != periods[:-1])
+    habit, periods, weekly = habit[unique], periods[unique], weekly[unique]
+
+    # a new streak starts with the first period of a habit and after every gap
+    starts = np.ones(len(habit), dtype=bool)
+    starts[1:] = (habit[1:] != habit[:-1]) | (periods[1:] - periods[:-1] != 1)
+    start_index = np.flatnonzero(starts)
+    # the length of the streak up to (and including) every period
+    run = np.arange(len(habit)) - start_index[np.cumsum(starts) - 1] + 1
+
+    position = np.searchsorted(habit_ids, habit)
+    np.maximum.at(longest, position, run)
+
+    # the latest period up to today of every habit decides the current streak
+    current_period = np.where(weekly, (today - 1) // 7, today)
+    grace = np.where(weekly, streaks.GRACE["Weekly"], streaks.GRACE["Daily"])
+    up_to_today = np.flatnonzero(periods <= current_period)
+    latest = np.full(len(habit_ids), -1, dtype=np.int64)
+    np.maximum.at(latest, position[up_to_today], up_to_today)
+    has_latest = latest >= 0
+    latest = latest[has_latest]
+    is_current = periods[latest] >= current_period[latest] - grace[latest]
+    current[np.flatnonzero(has_latest)[is_current]] = run[latest[is_current]]
+    return result
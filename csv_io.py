@@ -0,0 +1,262 @@
+"""
+This document contains the import and export of our data as CSV files.
+The files have the same format as the files in the data folder (users.csv, habits.csv and progress.csv).
+
+The rows are streamed: the import reads the files in batches and stores every batch with one executemany
+in one transaction, the export writes the rows while they are fetched from the database.
+So the memory needed stays the same, no matter how many rows are imported or exported.
+
+The import and export can be started from the terminal:
+    python csv_io.py import filepath/foldername
+    python csv_io.py export filepath/foldername
+
+It imports the libraries csv, itertools and os.
+It further imports database.py for the database connection, initialisation.py to create the tables and to
+recompute the streaks and the completion counts after the progress was imported, and streaks.py for the
+integer columns of the completion time.
+"""
+import csv
+import itertools
+import os
+import database
+import initialisation
+import streaks
+
+# NUMBER OF ROWS THAT ARE STORED IN ONE TRANSACTION / FETCHED FROM THE DATABASE AT ONCE.
+BATCH_SIZE = 10000
+
+USERS_HEADER = ["firstname", "lastname", "username", "password"]
+HABITS_HEADER = ["habit_name", "owner", "category", "periodicity", "datetime_of_creation"]
+PROGRESS_HEADER = ["habit_name", "periodicity", "owner", "datetime_of_completion"]
+
+
+# READS A CSV FILE ROW BY ROW.
+def read_rows(path, header):
+    """
+    Reads a CSV file row by row (generator).
+
+    Parameters
+    ----------
+    :param path: str
+        the path of the CSV file
+    :param header: list
+        the expected column names in the first line of the file
+
+    Returns
+    -------
+    :return:
+        Yields every row after the header as a list of strings.
+        Raises ValueError if the first line is not the expected header.
+    """
+    with open(path, newline="", encoding="utf-8") as file:
+        reader = csv.reader(file)
+        first_row = next(reader, None)
+        if first_row != header:
+            raise ValueError(f"{path} must start with the header {','.join(header)}.")
+        for row in reader:
+            if row:
+                yield row
+
+
+# SPLITS THE ROWS INTO BATCHES.
+def batches(rows, batch_size=BATCH_SIZE):
+    """
+    Splits an iterable of rows into lists of at most batch_size rows (generator).
+    """
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+# STORES THE ROWS BATCH BY BATCH.
+def _store(conn, statement, rows, batch_size):
+    # every batch is stored in its own transaction, returns the number of stored rows
+    changes_before = conn.total_changes
+    for batch in batches(rows, batch_size):
+        database.run_write(conn, lambda c: c.executemany(statement, batch))
+    return conn.total_changes - changes_before
+
+
+# IMPORTS THE USERS.
+def import_users(path, conn=None, batch_size=BATCH_SIZE):
+    """
+    Imports users from a CSV file (format of data/users.csv). Users whose username already exists are skipped.
+
+    Parameters
+    ----------
+    :param path: str
+        the path of the CSV file
+    :param conn: an open database connection, defaults to the connection of database.py
+    :param batch_size: int
+        the number of rows stored in one transaction
+
+    Returns
+    -------
+    :return: int
+        Returns the number of imported users.
+    """
+    conn = conn or database.get_connection()
+    return _store(conn, "INSERT OR IGNORE INTO users (firstname, lastname, username, password) VALUES(?, ?, ?, ?)",
+                  read_rows(path, USERS_HEADER), batch_size)
+
+
+# IMPORTS THE HABITS.
+def import_habits(path, conn=None, batch_size=BATCH_SIZE):
+    """
+    Imports habits from a CSV file (format of data/habits.csv).
+    Habits that the owner already has (same habit name) are skipped.
+
+    Parameters and return value as in import_users().
+    """
+    conn = conn or database.get_connection()
+    return _store(conn, "INSERT OR IGNORE INTO habits (habit_name, owner, category, periodicity, datetime_of_creation) "
+                        "VALUES(?, ?, ?, ?, ?)",
+                  read_rows(path, HABITS_HEADER), batch_size)
+
+
+# IMPORTS THE PROGRESS.
+def import_progress(path, conn=None, batch_size=BATCH_SIZE):
+    """
+    Imports progress from a CSV file (format of data/progress.csv).
+
+    Every row is linked to the habit with the same owner and habit name, so the habits must be imported first.
+    Rows without such a habit are skipped, as well as completions that were already stored before the import
+    (same habit, same date and time), so importing the same file again adds nothing. Completions with the same date
+    and time within the file are all imported, as record_completions() of the UserClass stores them as well.
+    Afterwards the streaks table and the rollup table are recomputed for the habits that got new completions.
+
+    Parameters and return value as in import_users().
+    """
+    conn = conn or database.get_connection()
+    # only the completions stored before the import count as already stored, the rows of this import get higher ids
+    last_id = conn.execute("SELECT coalesce(max(progress_id), 0) FROM progress").fetchone()[0]
+    # the periodicity of the file is not needed, it is stored with the habit
+    rows = ((datetime_of_completion, *streaks.completion_columns(datetime_of_completion), owner, habit_name, last_id)
+            for habit_name, periodicity, owner, datetime_of_completion in read_rows(path, PROGRESS_HEADER))
+    # the check for an already stored completion is a lookup in the progress index (habit_id, datetime_of_completion)
+    imported = _store(conn, "INSERT INTO progress (habit_id, datetime_of_completion, completed_at, day_ordinal) "
+                            "SELECT habit_id, ?1, ?2, ?3 FROM habits "
+                            "WHERE owner = ?4 AND habit_name = ?5 AND NOT EXISTS (SELECT 1 FROM progress "
+                            "WHERE progress.habit_id = habits.habit_id AND progress.datetime_of_completion = ?1 "
+                            "AND progress.progress_id <= ?6)",
+                      rows, batch_size)
+    habit_ids = [row[0] for row in conn.execute("SELECT DISTINCT habit_id FROM progress WHERE progress_id > ?",
+                                                (last_id,))]
+    if habit_ids:
+        database.run_write(conn, initialisation.rebuild_derived_tables, habit_ids)
+    return imported
+
+
+# IMPORTS ALL THREE FILES OF A FOLDER.
+def import_all(folder, conn=None, batch_size=BATCH_SIZE):
+    """
+    Imports users.csv, habits.csv and progress.csv of a folder (in this order).
+    The tables are created first if they do not exist yet.
+
+    Parameters
+    ----------
+    :param folder: str
+        the folder with the CSV files
+    :param conn: an open database connection, defaults to the connection of database.py
+    :param batch_size: int
+        the number of rows stored in one transaction
+
+    Returns
+    -------
+    :return: dict
+        Returns the number of imported rows per table.
+    """
+    conn = conn or database.get_connection()
+    initialisation.migrate_database(conn)
+    return {
+        "users": import_users(os.path.join(folder, "users.csv"), conn, batch_size),
+        "habits": import_habits(os.path.join(folder, "habits.csv"), conn, batch_size),
+        "progress": import_progress(os.path.join(folder, "progress.csv"), conn, batch_size),
+    }
+
+
+# The following functions export the data.
+
+# READS THE ROWS OF A QUERY CHUNK BY CHUNK.
+def fetch_rows(conn, query, batch_size=BATCH_SIZE):
+    """
+    Executes a query and yields its rows, fetching batch_size rows at once (generator).
+    """
+    cur = conn.cursor()
+    cur.execute(query)
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+# WRITES ROWS INTO A CSV FILE.
+def write_rows(path, header, rows):
+    """
+    Writes the header and all rows into a CSV file.
+
+    :param path: str
+    :param header: list
+    :param rows: an iterable (e.g. a generator) of rows
+    :return: int
+        Returns the number of written rows.
+    """
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file, lineterminator="\n")
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+# EXPORTS ALL THREE TABLES INTO A FOLDER.
+def export_all(folder, conn=None, batch_size=BATCH_SIZE):
+    """
+    Exports users, habits and progress into users.csv, habits.csv and progress.csv of a folder.
+    The files have the same format as the ones read by import_all().
+
+    Parameters
+    ----------
+    :param folder: str
+        the folder for the CSV files, it is created if it does not exist
+    :param conn: an open database connection, defaults to the connection of database.py
+    :param batch_size: int
+        the number of rows fetched from the database at once
+
+    Returns
+    -------
+    :return: dict
+        Returns the number of exported rows per table.
+    """
+    conn = conn or database.get_connection()
+    os.makedirs(folder, exist_ok=True)
+    queries = {
+        "users": (USERS_HEADER, "SELECT firstname, lastname, username, password FROM users ORDER BY rowid"),
+        "habits": (HABITS_HEADER, "SELECT habit_name, owner, category, periodicity, datetime_of_creation "
+                                  "FROM habits ORDER BY habit_id"),
+        "progress": (PROGRESS_HEADER, "SELECT habits.habit_name, habits.periodicity, habits.owner, "
+                                      "progress.datetime_of_completion FROM progress "
+                                      "JOIN habits ON habits.habit_id = progress.habit_id "
+                                      "ORDER BY progress.progress_id"),
+    }
+    exported = {}
+    for table, (header, query) in queries.items():
+        exported[table] = write_rows(os.path.join(folder, f"{table}.csv"), header,
+                                     fetch_rows(conn, query, batch_size))
+    return exported
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) == 3 and sys.argv[1] == "import":
+        print(import_all(sys.argv[2]))
+    elif len(sys.argv) == 3 and sys.argv[1] == "export":
+        print(export_all(sys.argv[2]))
+    else:
+        print("Usage: python csv_io.py import|export filepath/foldername")
@@ -0,0 +1,392 @@
+"""
+This document contains the connection manager of our programme.
+All other documents get their database connection from here instead of opening their own one.
+
+Every thread gets its own connection (sqlite3 connections must not be used by two threads at the same time).
+The connections come from a bounded pool: if a thread ends, its connection goes back into the pool and is reused
+by the next thread, so no connection handles are leaking during long sessions.
+
+The database file is main_db.db next to this document. Another file can be used by setting the environment
+variable HABIT_TRACKER_DB or by calling configure(db_path).
+
+Several processes (the menu, the command line, the CSV import and the analytics report) may write the same database
+file at the same time. Therefore every connection is configured by configure_connection():
+* write-ahead logging (WAL) --> readers do not block the writer and the writer does not block the readers
+* synchronous NORMAL --> in WAL mode a commit does not wait for the disk, the database stays consistent after a crash
+* busy timeout --> a writer waits for the lock of another writer instead of failing at once
+Writes run through run_write(), which takes the write lock at the start of the transaction, commits and retries
+with an increasing delay if the database is still locked.
+
+It imports the libraries os, queue, random, sqlite3, threading, time and weakref.
+"""
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from os.path import join, dirname, abspath
+
+DEFAULT_DB_PATH = join(dirname(abspath(__file__)), 'main_db.db')
+DEFAULT_POOL_SIZE = 8
+# seconds a thread waits for a free connection before giving up
+POOL_TIMEOUT = 30
+# seconds a connection waits for the lock of another writer before sqlite3 raises "database is locked"
+BUSY_TIMEOUT = 5
+JOURNAL_MODE = "WAL"
+SYNCHRONOUS = "NORMAL"
+# number of attempts of a write and the delay in seconds before the first retry (doubled for every further retry)
+WRITE_ATTEMPTS = 5
+RETRY_DELAY = 0.05
+# the class of the new connections, replaced by profiling.py to measure the statements
+CONNECTION_FACTORY = sqlite3.Connection
+# the number of prepared statements every connection keeps, so a statement that is executed again is not parsed
+# again (see queries.py). 128 is the default of sqlite3 and holds all statements of queries.py, 0 turns the cache off
+# (see set_statement_cache_size() and the statement_cache entry of benchmark.py)
+STATEMENT_CACHE_SIZE = 128
+
+
+# SETS THE STORAGE OPTIONS OF A CONNECTION.
+def configure_connection(conn, busy_timeout=BUSY_TIMEOUT):
+    """
+    Sets the storage options of a connection: foreign keys, busy timeout, journal mode and synchronous mode.
+
+    Used for the connections of the pool, but also for connections that are opened directly (e.g. by the benchmarks).
+    The journal mode is stored in the database file, the other options only apply to this connection.
+
+    :param conn: an open sqlite3 connection
+    :param busy_timeout: float
+        the number of seconds to wait for the lock of another writer
+    :return: the connection
+    """
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout * 1000)}")
+    conn.execute(f"PRAGMA journal_mode = {JOURNAL_MODE}")
+    conn.execute(f"PRAGMA synchronous = {SYNCHRONOUS}")
+    return conn
+
+
+# CHECKS WHETHER AN ERROR MEANS THAT ANOTHER CONNECTION HOLDS THE LOCK.
+def is_busy_error(error):
+    """
+    :param error: an exception
+    :return: bool
+        Returns True if the error is "database is locked" / "database is busy", i.e. the write can be retried.
+    """
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in str(error) or "busy" in str(error))
+
+
+# RUNS A WRITE IN ONE TRANSACTION AND RETRIES IT IF THE DATABASE IS LOCKED.
+def run_write(conn, function, *args, attempts=WRITE_ATTEMPTS, delay=RETRY_DELAY):
+    """
+    Runs function(conn, *args) in one transaction and commits it.
+
+    The transaction starts with BEGIN IMMEDIATE, so the write lock is taken (or waited for, see BUSY_TIMEOUT)
+    before the function reads anything. If the database is still locked by another writer, the transaction is
+    rolled back and the function is called again after a delay that doubles with every attempt.
+    Any other error rolls the transaction back and is raised.
+
+    Parameters
+    ----------
+    :param conn: an open sqlite3 connection without an open transaction
+    :param function: a function that takes the connection and writes, e.g. lambda conn: conn.execute(...)
+    :param args: further arguments of the function
+    :param attempts: int
+        the maximum number of attempts
+    :param delay: float
+        the number of seconds before the first retry
+
+    Returns
+    -------
+    :return:
+        Returns the return value of the function.
+        Raises the sqlite3.OperationalError of the last attempt if the database stayed locked.
+        Raises sqlite3.ProgrammingError if the connection already has an open transaction.
+    """
+    if conn.in_transaction:
+        raise sqlite3.ProgrammingError("run_write() cannot be used inside an open transaction.")
+    for attempt in range(attempts):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            result = function(conn, *args)
+            conn.commit()
+            return result
+        except sqlite3.Error as error:
+            if conn.in_transaction:
+                conn.rollback()
+            if not is_busy_error(error) or attempt == attempts - 1:
+                raise
+        # the random factor keeps writers that failed together from retrying at the same moment
+        time.sleep(delay * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+# THE CONNECTION POOL.
+class ConnectionPool:
+    """
+    A bounded pool of sqlite3 connections to one database file.
+
+    Attributes
+    ----------
+    db_path: str
+        the path of the database file
+    pool_size: int
+        the maximum number of connections that can be in use at the same time
+    timeout: float
+        the number of seconds to wait for a free connection
+
+    Methods
+    -------
+    acquire()
+        takes a connection out of the pool (or opens a new one)
+    release(conn)
+        puts a connection back into the pool
+    get_connection()
+        returns the connection of the current thread
+    get_cursor()
+        returns the cursor of the connection of the current thread
+    release_thread_connection()
+        gives the connection of the current thread back to the pool
+    connection()
+        context manager that borrows a connection for a with-block
+    close()
+        closes all idle connections
+    """
+
+    # INIT METHOD.
+    def __init__(self, db_path, pool_size=DEFAULT_POOL_SIZE, timeout=POOL_TIMEOUT):
+        """
+        Parameters
+        ----------
+        :param db_path: str
+            the path of the database file
+        :param pool_size: int
+            the maximum number of connections that can be in use at the same time
+        :param timeout: float
+            the number of seconds to wait for a free connection
+        """
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._local = threading.local()
+
+    # OPENS A NEW CONNECTION.
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT, check_same_thread=False,
+                               factory=CONNECTION_FACTORY, cached_statements=STATEMENT_CACHE_SIZE)
+        return configure_connection(conn)
+
+    # TAKES A CONNECTION OUT OF THE POOL.
+    def acquire(self):
+        """
+        Takes an idle connection out of the pool or opens a new one if there is no idle connection.
+
+        Returns
+        -------
+        :return:
+            Returns a sqlite3 connection.
+            Raises sqlite3.OperationalError if all connections are in use for longer than the timeout.
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise sqlite3.OperationalError(f"No free database connection within {self.timeout} seconds.")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return self._connect()
+        except sqlite3.Error:
+            self._slots.release()
+            raise
+
+    # PUTS A CONNECTION BACK INTO THE POOL.
+    def release(self, conn):
+        """
+        Puts a connection back into the pool. A transaction that is still open is rolled back.
+
+        :param conn: a connection that was taken out with acquire()
+        """
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+        self._slots.release()
+
+    # RETURNS THE CONNECTION OF THE CURRENT THREAD.
+    def get_connection(self):
+        """
+        Returns the connection of the current thread.
+
+        The connection is taken out of the pool when the thread asks for it for the first time.
+        It goes back into the pool when the thread ends or calls release_thread_connection().
+
+        :return: a sqlite3 connection
+        """
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            holder = _ThreadConnection(self.acquire())
+            holder.finalizer = weakref.finalize(holder, self.release, holder.conn)
+            self._local.holder = holder
+        return holder.conn
+
+    # RETURNS THE CURSOR OF THE CONNECTION OF THE CURRENT THREAD.
+    def get_cursor(self):
+        """
+        Returns the cursor that belongs to the connection of the current thread.
+
+        :return: a sqlite3 cursor
+        """
+        self.get_connection()
+        return self._local.holder.cur
+
+    # GIVES THE CONNECTION OF THE CURRENT THREAD BACK TO THE POOL.
+    def release_thread_connection(self):
+        """
+        Gives the connection of the current thread back to the pool before the thread ends.
+        """
+        holder = getattr(self._local, "holder", None)
+        if holder is not None:
+            self._local.holder = None
+            holder.finalizer()
+
+    # BORROWS A CONNECTION FOR A WITH-BLOCK.
+    @contextmanager
+    def connection(self):
+        """
+        Borrows a connection from the pool for the duration of a with-block.
+
+        Used by short tasks that run in worker threads, e.g.:
+            with pool.connection() as conn:
+                conn.execute(...)
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    # CLOSES ALL IDLE CONNECTIONS.
+    def close(self):
+        """
+        Closes all idle connections of the pool and the connection of the current thread.
+        """
+        self.release_thread_connection()
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+
+
+class _ThreadConnection:
+    # holds the connection of one thread, when the thread ends the holder is garbage collected
+    # and the finalizer puts the connection back into the pool
+    def __init__(self, conn):
+        self.conn = conn
+        self.cur = conn.cursor()
+        self.finalizer = None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# SETS THE DATABASE FILE AND THE POOL SIZE.
+def configure(db_path=None, pool_size=None):
+    """
+    Sets the database file and the pool size for the whole programme.
+
+    The connections of the previous pool are closed.
+
+    Parameters
+    ----------
+    :param db_path: str
+        the path of the database file, defaults to HABIT_TRACKER_DB or main_db.db
+    :param pool_size: int
+        the maximum number of connections in use at the same time
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = ConnectionPool(db_path or os.environ.get("HABIT_TRACKER_DB", DEFAULT_DB_PATH),
+                               pool_size or DEFAULT_POOL_SIZE)
+
+
+# SETS THE CLASS OF THE NEW CONNECTIONS.
+def set_connection_factory(factory):
+    """
+    Sets the class of the new connections (a subclass of sqlite3.Connection, see profiling.py).
+
+    The connections of the current pool are closed, so all connections opened from now on use the new class.
+
+    :param factory: the connection class
+    """
+    global CONNECTION_FACTORY
+    CONNECTION_FACTORY = factory
+    if _pool is not None:
+        configure(_pool.db_path, _pool.pool_size)
+
+
+# SETS THE NUMBER OF PREPARED STATEMENTS OF THE NEW CONNECTIONS.
+def set_statement_cache_size(size):
+    """
+    Sets the number of prepared statements every new connection keeps (0 turns the statement cache off).
+
+    The connections of the current pool are closed, so all connections opened from now on use the new size.
+
+    :param size: int
+    """
+    global STATEMENT_CACHE_SIZE
+    STATEMENT_CACHE_SIZE = size
+    if _pool is not None:
+        configure(_pool.db_path, _pool.pool_size)
+
+
+# RETURNS THE POOL OF THE PROGRAMME.
+def get_pool():
+    """
+    Returns the pool of the programme and creates it with the default settings if it does not exist yet.
+
+    :return: ConnectionPool
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(os.environ.get("HABIT_TRACKER_DB", DEFAULT_DB_PATH))
+    return _pool
+
+
+# RETURNS THE PATH OF THE DATABASE FILE.
+def get_db_path():
+    """
+    :return: str
+        Returns the path of the database file currently in use.
+    """
+    return get_pool().db_path
+
+
+# SHORTCUTS TO THE POOL OF THE PROGRAMME.
+def get_connection():
+    """
+    :return: the connection of the current thread (see ConnectionPool.get_connection())
+    """
+    return get_pool().get_connection()
+
+
+def get_cursor():
+    """
+    :return: the cursor of the connection of the current thread (see ConnectionPool.get_cursor())
+    """
+    return get_pool().get_cursor()
+
+
+def connection():
+    """
+    :return: a context manager that borrows a connection (see ConnectionPool.connection())
+    """
+    return get_pool().connection()
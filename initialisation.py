@@ -2,13 +2,28 @@
 This document organises the basic functionality of our database and creates it if it does not already exist.
 Furthermore, this code deals with the creation of a user profile (registration)
 as well as with the login incl. password check.
-For this it imports User.py to be able to use the UserClass.
-It also imports the libraries questionary, sqlite3 and hashlib.
+For this it imports User.py to be able to use the UserClass, database.py for the database connection,
+queries.py for the SQL statements and streaks.py and rollup.py to maintain the streaks table and the rollup table.
+It also imports the libraries questionary, sqlite3 and hashlib. questionary is imported by the functions that prompt
+the user, so the programme starts faster when no prompt is shown (e.g. by the commands of cli.py).
 """
-import questionary
 import sqlite3
 import hashlib
 import User
+import database
+import queries
+import rollup
+import streaks
+
+
+# VERSION OF THE DATABASE SCHEMA. IT IS STORED IN THE DATABASE FILE ITSELF (PRAGMA user_version).
+# VERSION 0 IS THE ORIGINAL SCHEMA WITHOUT IDS AND INDEXES, VERSION 1 ADDED THEM, VERSION 2 ADDED THE STREAKS TABLE,
+# VERSION 3 ADDED THE INTEGER COLUMNS OF THE COMPLETION TIME TO THE PROGRESS TABLE,
+# VERSION 4 ADDED THE ROLLUP TABLE OF THE COMPLETION COUNTS PER DAY AND WEEK.
+SCHEMA_VERSION = 4
+
+# DATABASE FILES WHOSE SCHEMA IS ALREADY KNOWN TO BE UP TO DATE IN THIS PROCESS.
+_current_schema = set()
 
 
 # THIS PART LAUNCHES THE DATABASE IF IT NOT ALREADY EXISTS.
@@ -18,17 +33,47 @@ def launch_database():
     """
     Launch of the database if it not already exists.
 
-    The database consists of three tables:
+    The database consists of five tables:
     * users --> for all user data
     * habits --> for all habits across all users
     * progress --> for all progress data across users
+    * streaks --> for the precomputed current and longest streak of every habit
+    * completion_counts --> for the number of completions of every habit per day and per week (see rollup.py)
+
+    An already existing database with an older schema is migrated in place (see migrate_database()).
+    The schema version is only checked once per database file and process.
     """
-    from os.path import join, dirname, abspath
-    db_path = join(dirname(abspath(__file__)), 'main_db.db')
+    db_path = database.get_db_path()
+    if db_path in _current_schema:
+        return
+    migrate_database(database.get_connection())
+    if db_path != ":memory:":
+        _current_schema.add(db_path)
 
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
 
+# CREATES ALL TABLES AND INDEXES OF THE CURRENT SCHEMA.
+def create_tables(c):
+    """
+    Creates all tables and indexes of the current schema if they do not exist yet.
+
+    Every habit gets an integer habit_id. The progress table refers to it instead of repeating
+    the owner, the habit name and the periodicity of the habit.
+    Next to the date and time of completion, every progress row stores the epoch seconds (completed_at, in UTC)
+    and the day ordinal of the completion, see streaks.completion_columns(). The programme itself orders by the
+    date and time of completion and computes the streaks from the day ordinal; completed_at is only kept for
+    analyses outside the programme (e.g. SQL queries or pandas by time range).
+    The indexes cover the lookups of the UserClass:
+    * habits by (owner, habit_name) --> unique, a user cannot have two habits with the same name
+    * habits by (owner, periodicity) --> for the daily / weekly overviews
+    * progress by (habit_id, datetime_of_completion) --> for the progress of a habit in chronological order
+    * progress by (habit_id, day_ordinal) --> for the streaks, without reading the progress rows themselves
+
+    The streaks table holds one row per habit with the streak that ends with its latest completion,
+    its longest streak and the period (day or week ordinal, see streaks.py) of its latest completion.
+    The rollup table completion_counts is created by rollup.create_table().
+
+    :param c: the cursor of an open database connection
+    """
     c.execute("""CREATE TABLE IF NOT EXISTS users (
               firstname text,
               lastname text,
@@ -37,21 +82,147 @@ def launch_database():
               )""")
 
     c.execute("""CREATE TABLE IF NOT EXISTS habits (
-                  habit_name text,
-                  owner text, 
+                  habit_id integer PRIMARY KEY,
+                  habit_name text NOT NULL,
+                  owner text NOT NULL,
                   category text,
                   periodicity text,
                   datetime_of_creation datetime
                   )""")
 
     c.execute("""CREATE TABLE IF NOT EXISTS progress (
-                  habit_name text,
-                  periodicity text, 
-                  owner text, 
-                  datetime_of_completion datetime
+                  progress_id integer PRIMARY KEY,
+                  habit_id integer NOT NULL REFERENCES habits (habit_id) ON DELETE CASCADE,
+                  datetime_of_completion datetime,
+                  completed_at integer,
+                  day_ordinal integer
+                  )""")
+
+    c.execute("""CREATE TABLE IF NOT EXISTS streaks (
+                  habit_id integer PRIMARY KEY REFERENCES habits (habit_id) ON DELETE CASCADE,
+                  current_streak integer,
+                  longest_streak integer,
+                  last_period integer
                   )""")
-    conn.commit()
-    conn.close()
+
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS habits_owner_name ON habits (owner, habit_name)")
+    c.execute("CREATE INDEX IF NOT EXISTS habits_owner_periodicity ON habits (owner, periodicity)")
+    c.execute("CREATE INDEX IF NOT EXISTS progress_habit_completion ON progress (habit_id, datetime_of_completion)")
+    c.execute("CREATE INDEX IF NOT EXISTS progress_habit_day ON progress (habit_id, day_ordinal)")
+
+    rollup.create_table(c)
+
+
+# BRINGS AN EXISTING DATABASE TO THE CURRENT SCHEMA VERSION.
+def migrate_database(conn):
+    """
+    Creates the database schema or migrates an existing database in place to the current schema version.
+
+    Databases of version 0 store the owner, habit name and periodicity in every progress row. Their habits
+    get a habit_id and every progress row is linked to the habit of the same owner and name.
+    Progress rows of habits that were already deleted cannot be linked and are dropped.
+    Databases before version 2 get the streaks table, which is filled from the progress history.
+    Databases before version 3 get the integer columns of the completion time, which are computed from the
+    stored date and time of completion.
+    Databases before version 4 get the rollup table, which is filled from the progress table.
+    The migration runs in a single transaction, so a failed migration leaves the database untouched.
+    The transaction takes the write lock at its start, so if several processes start at the same time with an old
+    database, only the first one migrates it.
+
+    :param conn: an open database connection
+    """
+    c = conn.cursor()
+    version = c.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        # another process may have migrated the database while this one waited for the lock
+        version = c.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            c.execute("COMMIT")
+            return
+        habit_columns = [row[1] for row in c.execute("PRAGMA table_info(habits)")]
+        if version < 1 and habit_columns and "habit_id" not in habit_columns:
+            c.execute("ALTER TABLE habits RENAME TO habits_v0")
+            c.execute("ALTER TABLE progress RENAME TO progress_v0")
+            create_tables(c)
+            c.execute("""INSERT OR IGNORE INTO habits (habit_name, owner, category, periodicity, datetime_of_creation)
+                         SELECT habit_name, owner, category, periodicity, datetime_of_creation
+                         FROM habits_v0 ORDER BY rowid""")
+            c.execute("""INSERT INTO progress (habit_id, datetime_of_completion)
+                         SELECT habits.habit_id, progress_v0.datetime_of_completion
+                         FROM progress_v0 JOIN habits
+                         ON habits.owner = progress_v0.owner AND habits.habit_name = progress_v0.habit_name
+                         ORDER BY progress_v0.rowid""")
+            c.execute("DROP TABLE habits_v0")
+            c.execute("DROP TABLE progress_v0")
+        else:
+            progress_columns = [row[1] for row in c.execute("PRAGMA table_info(progress)")]
+            if progress_columns and "day_ordinal" not in progress_columns:
+                for column in ["completed_at", "day_ordinal"]:
+                    c.execute(f"ALTER TABLE progress ADD COLUMN {column} integer")
+            create_tables(c)
+        if version < 3:
+            fill_completion_columns(conn)
+        if version < 4:
+            rollup.rebuild_completion_counts(conn)
+        if version < 2:
+            streaks.rebuild_streak_table(conn)
+        c.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        c.execute("COMMIT")
+    except sqlite3.Error:
+        c.execute("ROLLBACK")
+        raise
+
+
+# COMPUTES THE INTEGER COLUMNS OF THE COMPLETION TIME FOR ALL PROGRESS ROWS THAT DO NOT HAVE THEM YET.
+def fill_completion_columns(conn):
+    """
+    Computes completed_at and day_ordinal of all progress rows that do not have them yet
+    from their date and time of completion (see streaks.completion_columns()).
+
+    Used by migrate_database(). Does not commit.
+
+    :param conn: an open database connection
+    """
+    for position, column in enumerate(["completed_at", "day_ordinal"]):
+        conn.create_function(f"compute_{column}", 1, lambda text, n=position: streaks.completion_columns(text)[n],
+                             deterministic=True)
+    conn.execute("UPDATE progress SET completed_at = compute_completed_at(datetime_of_completion), "
+                 "day_ordinal = compute_day_ordinal(datetime_of_completion) WHERE day_ordinal IS NULL")
+
+
+# RECOMPUTES THE STREAKS AND THE COMPLETION COUNTS OF ALL HABITS.
+# CAN BE STARTED FROM THE TERMINAL WITH: python initialisation.py rebuild-streaks
+def rebuild_streaks():
+    """
+    Recomputes the streaks table and the rollup table of the database from the complete progress history
+    of all habits.
+
+    Both tables are kept up to date whenever a habit is completed. This is only needed if progress data was
+    changed directly in the database.
+    """
+    conn = database.get_connection()
+    launch_database()
+    database.run_write(conn, rebuild_derived_tables)
+
+
+# RECOMPUTES ALL TABLES THAT ARE DERIVED FROM THE PROGRESS TABLE.
+def rebuild_derived_tables(conn, habit_ids=None):
+    """
+    Recomputes the rollup table (see rollup.py) from the progress table and then the streaks table
+    (see streaks.py) from the rollup table.
+
+    Does not commit, so it can run inside a bigger transaction.
+
+    :param conn: an open database connection
+    :param habit_ids: list
+        The habits to recompute. If None, all habits are recomputed.
+    """
+    rollup.rebuild_completion_counts(conn, habit_ids)
+    streaks.rebuild_streak_table(conn, habit_ids)
 
 
 # THIS SECTION IS FOR THE SETUP OF FIRST TIME USERS.
@@ -68,6 +239,7 @@ def register_user():
     A username can only exists once. If the username already exists, the user is prompted again to choose another
     username.
     """
+    import questionary
     firstname = questionary.text("What is your first name? ",
                                  validate=lambda text: True if len(text) > 0 and text.isalpha()
                                  else "Please enter a correct value. "
@@ -84,7 +256,7 @@ def register_user():
                                     validate=lambda text: True if len(text) >= 4 and text.isalnum()
                                     else "Your password must be at least four characters long and can "
                                          "contain upper and lower case letters and numbers.").ask()
-    password = hashlib.sha256(password.encode('utf-8')).hexdigest()
+    password = hash_password(password)
 
     new_user = User.UserClass(firstname, lastname, username, password)
     user = get_user(username)
@@ -107,13 +279,8 @@ def get_user(username):
     :param username: str
         Assigned to the function by register_user() or login().
     """
-
-    from os.path import join, dirname, abspath
-    db_path = join(dirname(abspath(__file__)), 'main_db.db')
-
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
-    cur.execute(f"SELECT * FROM users WHERE username = '{username}'")
+    cur = database.get_cursor()
+    cur.execute(queries.SELECT_USER, {"username": username})
     list_of_users = cur.fetchall()
 
     if len(list_of_users) > 0:
@@ -134,35 +301,75 @@ def login():
 
     User is asked for their username and password and they are able to type in a text.
     It is checked whether the username exists. If yes, the entered password is checked.
+    The user is asked again until the username exists.
 
     Returns
     -------
     :return:
         Returns the user to be allocated to the UserClass later on.
     """
+    import questionary
     user_name = questionary.text("Enter your username: ").ask()
     user = get_user(user_name)
-    if user:
-        check_password(user.password)
-        return user
-    else:
+    while not user:
         print("\nInvalid username.\n")
-        login()
+        user_name = questionary.text("Enter your username: ").ask()
+        user = get_user(user_name)
+    check_password(user.password)
+    user.load_habits()
+    return user
 
 
 # ENTERED PASSWORD BY THE USER IS CHECKED WITH THE PASSWORD IN DB.
 def check_password(password):
     """
     Entered passsword by the user is checked with the password in the database.
+    The user is asked again until the password is correct.
 
     :param password: str
         Assigned to the function by login().
         Password is hashed for data security reasons.
     """
+    import questionary
     password_input = questionary.password("Enter your password: ").ask()
-    password_input = hashlib.sha256(password_input.encode('utf-8')).hexdigest()
-    if password_input == password:
-        print("\nLogin successful!\n")
-    else:
+    while hash_password(password_input) != password:
         print("\nPassword incorrect. Try again!\n")
-        check_password(password)
+        password_input = questionary.password("Enter your password: ").ask()
+    print("\nLogin successful!\n")
+
+
+# HASHES A PASSWORD THE WAY IT IS STORED IN THE DB.
+def hash_password(password):
+    """
+    :param password: str
+    :return: str
+        Returns the SHA-256 hash of the password as it is stored in the database.
+    """
+    return hashlib.sha256(password.encode('utf-8')).hexdigest()
+
+
+# CHECKS USERNAME AND PASSWORD WITHOUT ANY PROMPTS (USED BY THE COMMAND LINE, SEE cli.py).
+def authenticate(username, password):
+    """
+    Checks a username and a password without any prompts.
+
+    :param username: str
+    :param password: str
+        the password in plain text
+    :return:
+        Returns the user if the username exists and the password is correct, otherwise None.
+    """
+    user = get_user(username)
+    if user and hash_password(password) == user.password:
+        user.load_habits()
+        return user
+    return None
+
+
+if __name__ == "__main__":
+    import sys
+    if sys.argv[1:] == ["rebuild-streaks"]:
+        rebuild_streaks()
+        print("The streaks and completion counts of all habits were recomputed.")
+    else:
+        print("Usage: python initialisation.py rebuild-streaks")
@@ -0,0 +1,360 @@
+"""
+This document contains the load test of our programme.
+It simulates many users who complete habits and look at their streaks at the same time, from several threads and
+processes, and reports how many operations per second the database managed, how long they took (p50 / p99) and how
+often an operation failed because the database was locked:
+    python loadtest.py --users 50 --processes 4 --threads 8 --duration 10 --output load.json
+
+The users of the load test are copies of the users in the data folder (users.csv, habits.csv and progress.csv) with
+the same habits and the same history, moved to the present. Every simulated operation picks a user and one of their
+habits; habits that were completed more often in the data are picked more often. The mix of the operations can be
+chosen, e.g. --mix complete=1,stats=1 for as many completions as streak overviews:
+    complete         --> the habit is marked as completed (UserClass.complete_habit(), the part of is_completed()
+                         without the prompt)
+    get_habit        --> the habit is looked up (UserClass.get_habit())
+    current_streak   --> the current streak of the habit is computed
+    longest_streak   --> the longest streak of the habit is computed
+    stats            --> the stored streaks of all habits of the user are read (UserClass.get_stored_streaks())
+Writes that find the database locked are retried by database.run_write(); the load test counts the operations that
+still failed afterwards.
+
+It imports the libraries argparse, json, multiprocessing, os, random, sqlite3, tempfile, threading and time,
+as well as concurrent.futures and datetime.
+It further imports csv_io.py to read the data folder, database.py, initialisation.py, queries.py, streaks.py
+and User.py.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+import csv_io
+import database
+import initialisation
+import queries
+import streaks
+import User
+
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+# PASSWORD OF ALL USERS OF THE LOAD TEST.
+PASSWORD = "password"
+# SECONDS THE THREADS GET TO LOAD THEIR USERS BEFORE THE OPERATIONS START, IN THIS PROCESS / IN A NEW PROCESS.
+START_DELAY = 0.5
+SPAWN_START_DELAY = 2.0
+
+# THE OPERATIONS OF A SIMULATED USER, CALLED WITH (user, habit_name, periodicity).
+OPERATIONS = {
+    "complete": lambda user, habit_name, periodicity: user.complete_habit(habit_name),
+    "get_habit": lambda user, habit_name, periodicity: user.get_habit(habit_name),
+    "current_streak": lambda user, habit_name, periodicity: (
+        user.compute_current_daily_streak(habit_name) if periodicity == "Daily"
+        else user.compute_current_weekly_streak(habit_name)),
+    "longest_streak": lambda user, habit_name, periodicity: (
+        user.compute_longest_daily_streak_habit(habit_name) if periodicity == "Daily"
+        else user.compute_longest_weekly_streak_habit(habit_name)),
+    "stats": lambda user, habit_name, periodicity: user.get_stored_streaks(),
+}
+# THE DEFAULT MIX: MOSTLY READS, EVERY FIFTH OPERATION IS A COMPLETION.
+DEFAULT_MIX = {"complete": 2, "get_habit": 3, "current_streak": 2, "longest_streak": 1, "stats": 2}
+
+
+# READS THE USERS, HABITS AND PROGRESS OF THE DATA FOLDER.
+def load_fixtures(folder=DATA_FOLDER):
+    """
+    Reads the CSV files of the data folder.
+
+    :param folder: str
+    :return: dict
+        Returns {username: {habit_name: (category, periodicity, [datetime of every completion])}}.
+    """
+    fixtures = {username: {} for _, _, username, _ in csv_io.read_rows(os.path.join(folder, "users.csv"),
+                                                                       csv_io.USERS_HEADER)}
+    for habit_name, owner, category, periodicity, _ in csv_io.read_rows(os.path.join(folder, "habits.csv"),
+                                                                       csv_io.HABITS_HEADER):
+        if owner in fixtures:
+            fixtures[owner][habit_name] = (category, periodicity, [])
+    for habit_name, _, owner, datetime_of_completion in csv_io.read_rows(os.path.join(folder, "progress.csv"),
+                                                                         csv_io.PROGRESS_HEADER):
+        if habit_name in fixtures.get(owner, {}):
+            fixtures[owner][habit_name][2].append(datetime.fromisoformat(datetime_of_completion))
+    return fixtures
+
+
+# CREATES THE DATABASE OF THE LOAD TEST.
+def prepare_database(db_path, users=50, folder=DATA_FOLDER):
+    """
+    Creates a database with copies of the users of the data folder.
+
+    User number n is a copy of the n-th user of users.csv (in turns) with the username 'load<n>'.
+    The history of the habits is moved by whole weeks, so the latest completion lies in the current week and the
+    streaks are as current as they were when the data was recorded.
+
+    Parameters
+    ----------
+    :param db_path: str
+        the path of the new database file (an existing file is replaced)
+    :param users: int
+        the number of users
+    :param folder: str
+        the data folder
+
+    Returns
+    -------
+    :return: list
+        Returns the plan of the load test: (username, [(habit_name, periodicity, weight)]) for every user,
+        the weight is the number of completions of the habit in the data (at least 1).
+    """
+    for suffix in ["", "-wal", "-shm"]:
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    fixtures = load_fixtures(folder)
+    completions = [completion for habits in fixtures.values() for _, _, history in habits.values()
+                   for completion in history]
+    latest = max(completions, default=datetime.now()).date()
+    shift = timedelta(weeks=(date.today() - latest).days // 7)
+
+    plan = []
+    conn = sqlite3.connect(db_path)
+    initialisation.migrate_database(conn)
+    with conn:
+        templates = list(fixtures.values())
+        for n in range(users):
+            username = f"load{n}"
+            conn.execute("INSERT INTO users VALUES(?, ?, ?, ?)",
+                         ("Load", "Test", username, initialisation.hash_password(PASSWORD)))
+            habits = []
+            for habit_name, (category, periodicity, history) in templates[n % len(templates)].items():
+                habit_id = conn.execute("INSERT INTO habits (habit_name, owner, category, periodicity, "
+                                        "datetime_of_creation) VALUES(?, ?, ?, ?, ?)",
+                                        (habit_name, username, category, periodicity, datetime.now())).lastrowid
+                conn.executemany(queries.INSERT_PROGRESS,
+                                 [(habit_id, completion + shift, *streaks.completion_columns(completion + shift))
+                                  for completion in history])
+                habits.append((habit_name, periodicity, max(len(history), 1)))
+            plan.append((username, habits))
+        initialisation.rebuild_derived_tables(conn)
+    conn.close()
+    return plan
+
+
+# PARSES A MIX LIKE 'complete=2,stats=1'.
+def parse_mix(text):
+    """
+    :param text: str
+        the weights of the operations, e.g. 'complete=2,stats=1' (operations that are not named are not run)
+    :return: dict
+        Returns {operation: weight}.
+        Raises ValueError if an operation is unknown or a weight is not a number.
+    """
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{name}', choose from {', '.join(OPERATIONS)}.")
+        mix[name] = float(weight) if weight else 1.0
+    return mix
+
+
+# RUNS THE OPERATIONS OF ONE THREAD.
+def _run_thread(plan, mix, seed, start, duration, results):
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    # every thread has its own user objects (the habit cache of a user object is not shared between threads)
+    users = [User.UserClass(None, None, username, None) for username, _ in plan]
+    for user in users:
+        user.load_habits()
+    latencies = {name: [] for name in names}
+    busy = dict.fromkeys(names, 0)
+    errors = dict.fromkeys(names, 0)
+
+    while time.perf_counter() < start:
+        time.sleep(0.001)
+    deadline = start + duration
+    while True:
+        operation_start = time.perf_counter()
+        if operation_start >= deadline:
+            break
+        index = rng.randrange(len(plan))
+        habit_name, periodicity, _ = rng.choices(plan[index][1], [weight for _, _, weight in plan[index][1]])[0]
+        name = rng.choices(names, weights)[0]
+        try:
+            OPERATIONS[name](users[index], habit_name, periodicity)
+        except sqlite3.OperationalError as error:
+            if database.is_busy_error(error):
+                busy[name] += 1
+            else:
+                errors[name] += 1
+            continue
+        except sqlite3.Error:
+            errors[name] += 1
+            continue
+        latencies[name].append((time.perf_counter() - operation_start) * 1000)
+    database.get_pool().release_thread_connection()
+    results.append((latencies, busy, errors))
+
+
+# RUNS THE THREADS OF ONE PROCESS.
+def run_process(db_path, plan, threads=4, duration=10, mix=None, seed=1, start_delay=START_DELAY):
+    """
+    Runs the load test in this process with several threads.
+
+    Parameters
+    ----------
+    :param db_path: str
+        the database prepared by prepare_database()
+    :param plan: list
+        the users and their habits as returned by prepare_database()
+    :param threads: int
+    :param duration: float
+        the number of seconds the operations run
+    :param mix: dict
+        the weights of the operations, defaults to DEFAULT_MIX
+    :param seed: int
+    :param start_delay: float
+        the number of seconds the threads get to load their users before the measurement starts together
+
+    Returns
+    -------
+    :return: dict
+        Returns per operation the latencies in milliseconds of the successful calls ('latencies') and the number
+        of calls that failed because the database was locked ('busy') or for another reason ('errors').
+    """
+    database.configure(db_path, pool_size=threads)
+    results = []
+    start = time.perf_counter() + start_delay
+    workers = [threading.Thread(target=_run_thread,
+                                args=(plan, mix or DEFAULT_MIX, seed * 1000 + n, start, duration, results))
+               for n in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    database.configure()
+
+    merged = {name: {"latencies": [], "busy": 0, "errors": 0} for name in mix or DEFAULT_MIX}
+    for latencies, busy, errors in results:
+        for name in merged:
+            merged[name]["latencies"].extend(latencies[name])
+            merged[name]["busy"] += busy[name]
+            merged[name]["errors"] += errors[name]
+    return merged
+
+
+# RETURNS A PERCENTILE OF SORTED VALUES.
+def percentile(values, fraction):
+    """
+    :param values: list
+        sorted values
+    :param fraction: float
+        e.g. 0.99 for the 99th percentile
+    :return: float
+        Returns the value below which the given fraction of the values lie, 0.0 if there are no values.
+    """
+    if not values:
+        return 0.0
+    return values[min(int(fraction * len(values)), len(values) - 1)]
+
+
+# SUMMARISES THE RESULTS OF ALL PROCESSES.
+def summarise(results, duration):
+    """
+    Parameters
+    ----------
+    :param results: list
+        the results of run_process() of every process
+    :param duration: float
+        the number of seconds the operations ran
+
+    Returns
+    -------
+    :return: dict
+        Returns per operation and in total ('all') the number of successful calls, the throughput (calls per
+        second), the p50 / p99 / max latency in milliseconds and the number of 'busy' and other errors.
+    """
+    merged = {}
+    for result in results:
+        for name, values in result.items():
+            entry = merged.setdefault(name, {"latencies": [], "busy": 0, "errors": 0})
+            entry["latencies"].extend(values["latencies"])
+            entry["busy"] += values["busy"]
+            entry["errors"] += values["errors"]
+    merged["all"] = {"latencies": [latency for values in list(merged.values()) for latency in values["latencies"]],
+                     "busy": sum(values["busy"] for values in merged.values()),
+                     "errors": sum(values["errors"] for values in merged.values())}
+
+    summary = {}
+    for name, values in merged.items():
+        latencies = sorted(values["latencies"])
+        summary[name] = {
+            "calls": len(latencies),
+            "throughput": len(latencies) / duration,
+            "p50_ms": percentile(latencies, 0.5),
+            "p99_ms": percentile(latencies, 0.99),
+            "max_ms": latencies[-1] if latencies else 0.0,
+            "busy": values["busy"],
+            "errors": values["errors"],
+        }
+    return summary
+
+
+# RUNS THE LOAD TEST.
+def run(users=50, processes=2, threads=4, duration=10, mix=None, seed=1, db_path=None, output=None):
+    """
+    Prepares the database, runs the load test in several processes at the same time and summarises the results.
+
+    Returns
+    -------
+    :return: dict
+        Returns the parameters and the summary of the load test (see summarise()).
+    """
+    mix = mix or DEFAULT_MIX
+    db_path = db_path or os.path.join(tempfile.gettempdir(), "habit_loadtest.db")
+    plan = prepare_database(db_path, users)
+    if processes == 1:
+        results = [run_process(db_path, plan, threads, duration, mix, seed)]
+    else:
+        # new processes are started instead of forked, so none of them inherits an open database connection
+        with ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [executor.submit(run_process, db_path, plan, threads, duration, mix, seed + n,
+                                       SPAWN_START_DELAY)
+                       for n in range(processes)]
+            results = [future.result() for future in futures]
+
+    report = {
+        "parameters": {"users": users, "processes": processes, "threads": threads, "duration": duration,
+                       "mix": mix, "seed": seed, "sqlite": sqlite3.sqlite_version},
+        "results": summarise(results, duration),
+    }
+    if output:
+        with open(output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test of the habit tracker.")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4, help="threads per process")
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--mix", type=parse_mix, help=f"weights of the operations, e.g. "
+                                                      f"'complete=2,stats=1' (from {', '.join(OPERATIONS)})")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", help="path of the load test database (default: in the temp folder, it is replaced)")
+    parser.add_argument("--output", help="JSON file for the results")
+    args = parser.parse_args()
+
+    report = run(args.users, args.processes, args.threads, args.duration, args.mix, args.seed, args.db, args.output)
+    print(f"{'operation':16} {'calls':>8} {'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} "
+          f"{'locked':>7} {'errors':>7}")
+    for name, result in report["results"].items():
+        print(f"{name:16} {result['calls']:8} {result['throughput']:10.1f} {result['p50_ms']:9.3f} "
+              f"{result['p99_ms']:9.3f} {result['max_ms']:9.3f} {result['busy']:7} {result['errors']:7}")
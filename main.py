@@ -2,56 +2,74 @@
 This document regulates our user guidance. It represents the menu or the main navigation.
 
 It imports the library 'questionary' as the Command Line Interface (CLI) that guides the user through the program
-as well as checks the user input.
+as well as checks the user input. questionary is only imported when the menu is shown, so the commands of cli.py
+start faster.
 It also imports the initialisation.py doc which launches the core functionalities of the program.
+
+If main.py is started with a command (e.g. "python main.py complete --user testuser1 --habit Yoga"),
+the command is run without any prompts by cli.py.
+With the option --profile (or the environment variable HABIT_TRACKER_PROFILE) the program measures its database
+and streak calls and prints a summary at the end (see profiling.py).
 """
-import questionary
+import os
+import sys
 import initialisation
 
 
-# CREATES THE DATABASE.
-initialisation.launch_database()
-
-
 # PROGRAM STARTS AND INTRO MESSAGE INTRODUCES THE APP.
 intro_message = "\n******************************\n" \
                 "Welcome to Habit Tracker!\n" \
                 "You can use this app to track your habits for a mindful life.\n" \
                 "******************************\n"
-print(intro_message)
 
 
 # ASKS THE USER TO LOGIN OR REGISTER.
-first_question = questionary.select(
-    "Is this your first time here or have you been here before? ", choices=[
-        "Register",
-        "Login"
-    ]).ask()
+def start():
+    """
+    Asks the user to login or to register first.
 
-if first_question == "Login":
-    user = initialisation.login()
-    print("Welcome back!\n")
+    Returns
+    -------
+    :return:
+        Returns the logged in user.
+    """
+    import questionary
+    first_question = questionary.select(
+        "Is this your first time here or have you been here before? ", choices=[
+            "Register",
+            "Login"
+        ]).ask()
+
+    if first_question == "Register":
+        print("\nLooks like you're new here! Let's set up your profile.\n")
+        initialisation.register_user()
+        print("\nPlease log in:\n")
+        return initialisation.login()
 
-elif first_question == "Register":
-    print("\nLooks like you're new here! Let's set up your profile.\n")
-    initialisation.register_user()
-    print("\nPlease log in:\n")
     user = initialisation.login()
-
-
-# IF THE USER HAS NO HABITS SAVED, HE MUST CHOOSE FROM A PREDEFINED LIST OF HABITS.
-user.choose_predefined_habit()
+    print("Welcome back!\n")
+    return user
 
 
 # FUNCTION THAT ASKS WHAT THE USER WANTS TO DO.
 # THIS IS THE MAIN MENU OF OUR PROGRAM.
-def menu():
+def menu(user):
     """
     This is the main menu of our program.
 
     It asks and prompts the user what they want to do and guides them through the programs functionalities.
     The user does not need to call any functions directly. They are always prompted if input is required.
+
+    Parameters
+    ----------
+    :param user: the logged in user
+
+    Returns
+    -------
+    :return: bool
+        Returns False if the user wants to exit the program, otherwise True so the menu is shown again.
     """
+    import questionary
     second_question = questionary.select("What do you want to do? ",
                                          choices=[
                                              "Edit User Profile",
@@ -62,10 +80,7 @@ def menu():
                                          ]).ask()
     if second_question == "Edit User Profile":
         print("No problem. Let's edit your profile.\n")
-        initialisation.get_user(user)
         user.update_profile()
-        print("\nWhat do you want to do now?\n")
-        menu()
 
     elif second_question == "Create, Change or Mark a Habit as completed":
         habit_question = questionary.select("Do you want to: ",
@@ -80,25 +95,17 @@ def menu():
             print("Let's create a habit.\n")
             new_habit = user.create_habit()
             user.store_habit_in_db(new_habit)
-            print("\nWhat do you want to do now?\n")
-            menu()
 
         elif habit_question == "Delete habit":
             user.delete_habit()
-            print("\nWhat do you want to do now?\n")
-            menu()
 
         elif habit_question == "Change an existing habit":
             print("Let's edit an existing habit!")
             user.update_habit()
-            print("\nWhat do you want to do now?\n")
-            menu()
 
         else:
             print("Let's mark a habit as completed.")
             user.is_completed()
-            print("\nWhat do you want to do now?\n")
-            menu()
 
     elif second_question == "Activity Overview":
         activity_question = questionary.select("Do you want to see...: ",
@@ -111,28 +118,23 @@ def menu():
         if activity_question == "all habits":
             print("\nYou currently have these habits saved:\n")
             user.show_all()
-            print("\nWhat do you want to do now?\n")
-            menu()
 
         elif activity_question == "all weekly habits":
             print("Your weekly habits are: \n")
             user.show_weekly_habits()
-            print("\nWhat do you want to do now?\n")
-            menu()
 
         else:
             print("Your daily habits are: \n")
             user.show_daily_habits()
-            print("\nWhat do you want to do now?\n")
-            menu()
 
-    if second_question == "View Stats":
+    elif second_question == "View Stats":
         stats_question = questionary.select("Do you want to see...: ",
                                             choices=[
                                                 "your current streak overview",
                                                 "your current streak per habit",
                                                 "your longest streak per habit",
-                                                "your longest streak overview (by periodicity)"
+                                                "your longest streak overview (by periodicity)",
+                                                "your completion rate (last days or weeks)"
                                             ]).ask()
         if stats_question == "your current streak overview":
             user.current_streak_overview()
@@ -140,14 +142,64 @@ def menu():
             user.current_streak_habit()
         elif stats_question == "your longest streak per habit":
             user.longest_streak_habit()
+        elif stats_question == "your completion rate (last days or weeks)":
+            user.window_stats_overview()
         else:
             user.longest_streak_overview()
-        print("\nWhat do you want to do now?\n")
-        menu()
 
-    if second_question == "Exit Program":
+    else:
         print(f"\nSee you soon, {user.firstname}!\n")
+        return False
+
+    return True
+
+
+# STARTS THE PROGRAM.
+def main(argv=None):
+    """
+    Starts the program.
+
+    Without a command the user is guided through the menu until they exit the program.
+    With a command (see cli.py) the command is run without any prompts.
+
+    Parameters
+    ----------
+    :param argv: list
+        the arguments of the command line without the name of the programme,
+        optionally starting with --profile or --profile=filepath.json
+
+    Returns
+    -------
+    :return: int
+        Returns the exit code.
+    """
+    argv = list(argv or [])
+    # THE PROFILING IS ONLY IMPORTED IF IT IS SWITCHED ON.
+    if argv and argv[0].partition("=")[0] == "--profile":
+        import profiling
+        profiling.enable(argv.pop(0).partition("=")[2] or None)
+    elif os.environ.get("HABIT_TRACKER_PROFILE"):
+        import profiling
+        profiling.enable_from_environment()
+
+    if argv:
+        import cli
+        return cli.main(argv)
+
+    # CREATES THE DATABASE.
+    initialisation.launch_database()
+    print(intro_message)
+    user = start()
+
+    # IF THE USER HAS NO HABITS SAVED, HE MUST CHOOSE FROM A PREDEFINED LIST OF HABITS.
+    user.choose_predefined_habit()
+
+    # THE MENU IS SHOWN AGAIN AFTER EVERY ACTION UNTIL THE USER EXITS THE PROGRAM.
+    while menu(user):
+        print("\nWhat do you want to do now?\n")
+    return 0
 
 
 # EXECUTES THE FUNCTION DEFINED ABOVE AND STARTS THE USER GUIDANCE.
-menu()
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
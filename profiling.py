@@ -0,0 +1,251 @@
+"""
+This document contains the optional profiling of our programme.
+It measures how long every SQL statement and every compute_* method of the UserClass takes and how many rows
+the statements read or change. At the end of the programme a summary is printed (and optionally saved as JSON).
+
+The profiling is switched off by default and costs nothing then: nothing is measured until enable() is called.
+It is switched on by the environment variable HABIT_TRACKER_PROFILE or by the option --profile of main.py:
+    HABIT_TRACKER_PROFILE=1 python main.py                      --> summary on the terminal (stderr)
+    HABIT_TRACKER_PROFILE=profile.json python main.py           --> summary on the terminal and in profile.json
+    python main.py --profile stats --user testuser1             --> the same for a command of cli.py
+    python main.py --profile=profile.json stats --user testuser1
+
+It imports the libraries atexit, functools, json, os, sqlite3, sys, threading and time.
+It further imports database.py, whose connections are replaced by measuring ones, and User.py.
+"""
+import atexit
+import functools
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import database
+import User
+
+ENV_VARIABLE = "HABIT_TRACKER_PROFILE"
+
+# kind ('sql' or 'method') --> name --> [calls, total seconds, max seconds, rows]
+_stats = {"sql": {}, "method": {}}
+_lock = threading.Lock()
+# the original methods of the UserClass while the profiling is enabled, None while it is disabled
+_original_methods = None
+_json_path = None
+
+
+# RECORDS ONE MEASUREMENT.
+def record(kind, name, seconds, rows=0, calls=1):
+    """
+    Adds a measurement to the statistics.
+
+    :param kind: str --> 'sql' or 'method'
+    :param name: str
+        the SQL statement or the name of the method
+    :param seconds: float
+    :param rows: int
+        the number of rows read or changed
+    :param calls: int
+        1 for a new call, 0 if the time and rows belong to the previous call (e.g. fetching the rows of a query)
+    """
+    with _lock:
+        entry = _stats[kind].setdefault(name, [0, 0.0, 0.0, 0])
+        entry[0] += calls
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+        entry[3] += rows
+
+
+# A CURSOR THAT MEASURES ITS STATEMENTS.
+class ProfilingCursor(sqlite3.Cursor):
+    """
+    A sqlite3 cursor that records the time and the rows of every statement it executes.
+    The time for fetching the rows of a query is added to the statement of the query.
+    """
+    statement = None
+
+    def _start(self, sql):
+        self.statement = " ".join(sql.split())
+        return time.perf_counter()
+
+    def _changed_rows(self):
+        # rowcount is -1 for queries, their rows are counted while they are fetched
+        return max(self.rowcount, 0)
+
+    def execute(self, sql, parameters=()):
+        start = self._start(sql)
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            record("sql", self.statement, time.perf_counter() - start, self._changed_rows())
+
+    def executemany(self, sql, seq_of_parameters):
+        start = self._start(sql)
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            record("sql", self.statement, time.perf_counter() - start, self._changed_rows())
+
+    def _fetch(self, fetch, *args):
+        start = time.perf_counter()
+        rows = fetch(*args)
+        count = len(rows) if isinstance(rows, list) else int(rows is not None)
+        record("sql", self.statement, time.perf_counter() - start, count, calls=0)
+        return rows
+
+    def fetchone(self):
+        return self._fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._fetch(super().fetchmany, size if size is not None else self.arraysize)
+
+    def fetchall(self):
+        return self._fetch(super().fetchall)
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            record("sql", self.statement, time.perf_counter() - start, calls=0)
+            raise
+        record("sql", self.statement, time.perf_counter() - start, 1, calls=0)
+        return row
+
+
+# A CONNECTION WHOSE CURSORS MEASURE THEIR STATEMENTS.
+class ProfilingConnection(sqlite3.Connection):
+    """
+    A sqlite3 connection that uses ProfilingCursor, also for the shortcuts execute() and executemany().
+    """
+
+    def cursor(self, factory=ProfilingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+# WRAPS A METHOD, SO EVERY CALL IS MEASURED.
+def _timed(name, method):
+    @functools.wraps(method)
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            record("method", name, time.perf_counter() - start)
+    return timed
+
+
+# SWITCHES THE PROFILING ON.
+def enable(json_path=None):
+    """
+    Switches the profiling on: from now on all new database connections and all compute_* methods of the UserClass
+    are measured. At the end of the programme the summary is printed on stderr (see write_summary()).
+
+    :param json_path: str
+        if given, the summary is also saved as JSON in this file
+    """
+    global _original_methods, _json_path
+    if _original_methods is not None:
+        return
+    _json_path = json_path
+    _original_methods = {name: method for name, method in vars(User.UserClass).items()
+                         if name.startswith("compute_") and callable(method)}
+    for name, method in _original_methods.items():
+        setattr(User.UserClass, name, _timed(f"UserClass.{name}", method))
+    database.set_connection_factory(ProfilingConnection)
+    atexit.register(_write_at_exit)
+
+
+# SWITCHES THE PROFILING ON IF THE ENVIRONMENT VARIABLE IS SET.
+def enable_from_environment():
+    """
+    Switches the profiling on if HABIT_TRACKER_PROFILE is set: '1' for the summary on stderr,
+    any other value is the path of the JSON file for the summary.
+    """
+    value = os.environ.get(ENV_VARIABLE)
+    if value:
+        enable(None if value == "1" else value)
+
+
+# SWITCHES THE PROFILING OFF.
+def disable():
+    """
+    Switches the profiling off and restores the original methods and connections. The statistics are kept.
+    """
+    global _original_methods
+    if _original_methods is None:
+        return
+    for name, method in _original_methods.items():
+        setattr(User.UserClass, name, method)
+    _original_methods = None
+    database.set_connection_factory(sqlite3.Connection)
+    atexit.unregister(_write_at_exit)
+
+
+# DELETES ALL MEASUREMENTS.
+def reset():
+    with _lock:
+        for stats in _stats.values():
+            stats.clear()
+
+
+# RETURNS THE STATISTICS.
+def summary():
+    """
+    :return: dict
+        Returns per kind ('sql' and 'method') a list of entries with name, calls, total_ms, mean_ms, max_ms and rows,
+        sorted by the total time (longest first). The time of a statement includes fetching its rows,
+        max_ms is the longest single step (executing or fetching).
+    """
+    with _lock:
+        return {kind: sorted(({"name": name, "calls": calls, "total_ms": total * 1000,
+                               "mean_ms": total * 1000 / calls if calls else 0.0, "max_ms": longest * 1000,
+                               "rows": rows}
+                              for name, (calls, total, longest, rows) in stats.items()),
+                             key=lambda entry: entry["total_ms"], reverse=True)
+                for kind, stats in _stats.items()}
+
+
+# FORMATS THE STATISTICS AS TEXT.
+def format_summary(result):
+    """
+    :param result: dict
+        the statistics as returned by summary()
+    :return: str
+        Returns a table per kind with one line per statement or method.
+    """
+    lines = []
+    for kind, title in [("method", "Methods"), ("sql", "SQL statements")]:
+        lines.append(f"{title:70} {'calls':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>9} {'rows':>8}")
+        for entry in result[kind]:
+            name = entry["name"] if len(entry["name"]) <= 70 else entry["name"][:67] + "..."
+            lines.append(f"{name:70} {entry['calls']:7} {entry['total_ms']:10.3f} {entry['mean_ms']:9.3f} "
+                         f"{entry['max_ms']:9.3f} {entry['rows']:8}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+# PRINTS THE SUMMARY AND SAVES IT AS JSON.
+def write_summary(stream=None, json_path=None):
+    """
+    Prints the summary as text and saves it as JSON.
+
+    :param stream: a text stream, defaults to sys.stderr
+    :param json_path: str
+        if given, the summary is also saved as JSON in this file
+    """
+    result = summary()
+    print("\nProfile\n" + format_summary(result), file=stream or sys.stderr)
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as file:
+            json.dump(result, file, indent=2)
+
+
+def _write_at_exit():
+    write_summary(json_path=_json_path)
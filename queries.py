@@ -0,0 +1,43 @@
+"""
+This document contains the SQL statements of the UserClass and of the login.
+Every statement is a constant with named parameters; the values are always passed separately, e.g.:
+    cur.execute(queries.SELECT_USER, {"username": username})
+So the text of a statement is the same for every call and every user. sqlite3 keeps the prepared statements of
+a connection in a cache (see database.STATEMENT_CACHE_SIZE) by their text, so a statement that is executed again
+is neither parsed nor planned again. Names or passwords with quotes are stored as they are and cannot change the
+statement.
+INSERT_PROGRESS is executed for a whole batch of rows at once (executemany), so it takes the values in the order of
+its columns instead of by name.
+"""
+
+# users
+INSERT_USER = "INSERT INTO users (firstname, lastname, username, password) " \
+              "VALUES(:firstname, :lastname, :username, :password)"
+SELECT_USER = "SELECT firstname, lastname, username, password FROM users WHERE username = :username"
+UPDATE_FIRSTNAME = "UPDATE users SET firstname = :firstname WHERE username = :username"
+UPDATE_LASTNAME = "UPDATE users SET lastname = :lastname WHERE username = :username"
+UPDATE_PASSWORD = "UPDATE users SET password = :password WHERE username = :username"
+
+# habits
+SELECT_HABITS = "SELECT habit_id, habit_name, owner, category, periodicity, datetime_of_creation FROM habits " \
+                "WHERE owner = :owner ORDER BY habit_id"
+INSERT_HABIT = "INSERT INTO habits (habit_name, owner, category, periodicity, datetime_of_creation) " \
+               "VALUES(:habit_name, :owner, :category, :periodicity, :datetime_of_creation)"
+UPDATE_HABIT = "UPDATE habits SET category = :category, periodicity = :periodicity WHERE habit_id = :habit_id"
+DELETE_HABIT = "DELETE FROM habits WHERE habit_id = :habit_id"
+
+# progress
+INSERT_PROGRESS = "INSERT INTO progress (habit_id, datetime_of_completion, completed_at, day_ordinal) " \
+                  "VALUES(?, ?, ?, ?)"
+SELECT_COMPLETIONS = "SELECT datetime_of_completion FROM progress WHERE habit_id = :habit_id " \
+                     "ORDER BY datetime_of_completion"
+
+# streaks
+SELECT_PERIODS_OF_USER = "SELECT habits.habit_id, habits.habit_name, habits.periodicity, completion_counts.period " \
+                         "FROM habits LEFT JOIN completion_counts ON completion_counts.habit_id = habits.habit_id " \
+                         "AND completion_counts.period_type = habits.periodicity " \
+                         "WHERE habits.owner = :owner ORDER BY habits.habit_id, completion_counts.period"
+SELECT_STORED_STREAKS = "SELECT habits.habit_name, habits.periodicity, streaks.current_streak, " \
+                        "streaks.longest_streak, streaks.last_period FROM habits " \
+                        "LEFT JOIN streaks ON streaks.habit_id = habits.habit_id " \
+                        "WHERE habits.owner = :owner ORDER BY habits.habit_id"
@@ -0,0 +1,164 @@
+"""
+This document contains the rollup table of our programme.
+The table completion_counts stores for every habit the number of completions per day and per calendar week:
+    habit_id | period_type | period | completions
+    1        | 'Daily'     | 738009 | 2            --> two completions on the day with the day ordinal 738009
+    1        | 'Weekly'    | 105429 | 5            --> five completions in the week with the week ordinal 105429
+The periods are the day and week ordinals of streaks.py, so the period of a habit is
+to_period(day, periodicity) and its streaks can be computed from one row per period instead of every completion.
+
+The table is updated whenever completions are stored (see add_completions()) and can always be rebuilt from the
+progress table (see rebuild_completion_counts()). The rows of a deleted habit are deleted with it.
+
+It imports streaks.py for the period ordinals.
+"""
+import streaks
+
+PERIOD_TYPES = ["Daily", "Weekly"]
+
+
+# CREATES THE ROLLUP TABLE.
+def create_table(c):
+    """
+    Creates the rollup table if it does not exist yet.
+
+    The primary key (habit_id, period_type, period) is also the order of the rows in the file (WITHOUT ROWID),
+    so the periods of a habit are read in order without a separate index.
+
+    :param c: the cursor of an open database connection
+    """
+    c.execute("""CREATE TABLE IF NOT EXISTS completion_counts (
+                  habit_id integer NOT NULL REFERENCES habits (habit_id) ON DELETE CASCADE,
+                  period_type text NOT NULL,
+                  period integer NOT NULL,
+                  completions integer NOT NULL,
+                  PRIMARY KEY (habit_id, period_type, period)
+                  ) WITHOUT ROWID""")
+
+
+# REBUILDS THE ROLLUP TABLE FROM THE PROGRESS TABLE.
+def rebuild_completion_counts(conn, habit_ids=None):
+    """
+    Recomputes the rollup table from the progress table with two GROUP BY queries.
+
+    Does not commit, so it can run inside a bigger transaction.
+
+    Parameters
+    ----------
+    :param conn: an open database connection
+    :param habit_ids: list
+        The habits to recompute. If None, the counts of all habits are recomputed.
+    """
+    condition = ""
+    params = ()
+    if habit_ids is not None:
+        params = list(habit_ids)
+        condition = f" WHERE habit_id IN ({', '.join('?' for _ in params)})"
+    conn.execute("DELETE FROM completion_counts" + condition, params)
+    # the week ordinal of streaks.week_ordinal(), (day_ordinal - 1) / 7 is an integer division in SQLite
+    for period_type, period in [("Daily", "day_ordinal"), ("Weekly", "(day_ordinal - 1) / 7")]:
+        conn.execute(f"INSERT INTO completion_counts (habit_id, period_type, period, completions) "
+                     f"SELECT habit_id, '{period_type}', {period}, count(*) FROM progress{condition} "
+                     f"GROUP BY habit_id, {period}", params)
+
+
+# ADDS NEW COMPLETIONS TO THE ROLLUP TABLE.
+def add_completions(conn, completions):
+    """
+    Adds a batch of new completions to the rollup table.
+
+    The completions are counted per period first, so every period gets one update per batch.
+    Does not commit, so the counts are stored together with the completions.
+
+    Parameters
+    ----------
+    :param conn: an open database connection
+    :param completions: an iterable of (habit_id, datetime_of_completion) tuples
+    """
+    counts = {}
+    for habit_id, datetime_of_completion in completions:
+        day = streaks.day_ordinal(datetime_of_completion)
+        for period_type in PERIOD_TYPES:
+            key = (habit_id, period_type, streaks.to_period(day, period_type))
+            counts[key] = counts.get(key, 0) + 1
+    conn.executemany("INSERT INTO completion_counts (habit_id, period_type, period, completions) "
+                     "VALUES(?, ?, ?, ?) ON CONFLICT (habit_id, period_type, period) "
+                     "DO UPDATE SET completions = completions + excluded.completions",
+                     [(*key, count) for key, count in counts.items()])
+
+
+# READS THE PERIODS WITH AT LEAST ONE COMPLETION.
+def iter_periods(conn, habit_id, period_type, newest_first=False):
+    """
+    Reads the periods in which a habit was completed, one row per period (generator).
+
+    :param conn: an open database connection
+    :param habit_id: int
+    :param period_type: str --> 'Daily' or 'Weekly'
+    :param newest_first: bool
+        True for descending order, False for ascending order
+    :return:
+        Yields the day or week ordinals.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT period FROM completion_counts WHERE habit_id = ? AND period_type = ? "
+                    f"ORDER BY period {'DESC' if newest_first else 'ASC'}", (habit_id, period_type))
+        for row in cur:
+            yield row[0]
+    finally:
+        cur.close()
+
+
+# RETURNS THE NUMBER OF COMPLETIONS IN ONE PERIOD.
+def count_in_period(conn, habit_id, period_type, period):
+    """
+    :param conn: an open database connection
+    :param habit_id: int
+    :param period_type: str --> 'Daily' or 'Weekly'
+    :param period: int
+        the day or week ordinal
+    :return: int
+        Returns the number of completions of the habit in this period.
+    """
+    row = conn.execute("SELECT completions FROM completion_counts WHERE habit_id = ? AND period_type = ? "
+                       "AND period = ?", (habit_id, period_type, period)).fetchone()
+    return row[0] if row else 0
+
+
+# READS THE COMPLETION COUNTS OF A RANGE OF PERIODS.
+def iter_window(conn, habit_id, period_type, first_period, last_period):
+    """
+    Reads the completion counts of a habit from one period to another (generator).
+    The rows are read with one range scan of the primary key, no other periods are touched.
+
+    :param conn: an open database connection
+    :param habit_id: int
+    :param period_type: str --> 'Daily' or 'Weekly'
+    :param first_period: int
+        the first day or week ordinal of the range
+    :param last_period: int
+        the last day or week ordinal of the range (included)
+    :return:
+        Yields (period, completions) for every period of the range with at least one completion, in order.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT period, completions FROM completion_counts WHERE habit_id = ? AND period_type = ? "
+                    "AND period BETWEEN ? AND ? ORDER BY period", (habit_id, period_type, first_period, last_period))
+        yield from cur
+    finally:
+        cur.close()
+
+
+# RETURNS THE FIRST PERIOD WITH A COMPLETION.
+def first_period(conn, habit_id, period_type):
+    """
+    :param conn: an open database connection
+    :param habit_id: int
+    :param period_type: str --> 'Daily' or 'Weekly'
+    :return: int
+        Returns the first day or week ordinal in which the habit was completed, None if it was never completed.
+    """
+    return conn.execute("SELECT min(period) FROM completion_counts WHERE habit_id = ? AND period_type = ?",
+                        (habit_id, period_type)).fetchone()[0]
@@ -0,0 +1,494 @@
+"""
+This document contains the HTTP service of our programme.
+It offers the habits, the completions and the streaks of the users as a JSON API, so other apps can use the habit
+tracker without any prompts. It uses the same methods of the UserClass as the menu and the command line.
+    python service.py --host 127.0.0.1 --port 8080
+
+Every request is authenticated with the username and password of the user (HTTP basic authentication):
+    GET    /habits                          --> all habits of the user
+    POST   /habits                          --> creates a habit:
+                                                {"habit_name": ..., "category": ..., "periodicity": ...}
+    GET    /habits/<habit_name>             --> one habit with its streaks
+    PATCH  /habits/<habit_name>             --> changes a habit: {"category": ...} and / or {"periodicity": ...}
+    DELETE /habits/<habit_name>             --> deletes a habit and its progress
+    POST   /habits/<habit_name>/completions --> marks a habit as completed: {} or {"at": "2021-08-07 11:57"}
+    POST   /completions                     --> several completions: {"completions": [{"habit": ..., "at": ...}]}
+    GET    /habits/<habit_name>/stats?days=30  --> completion rate, missed periods and best week of the last 30 days
+                                                (or ?weeks=12 for the last 12 weeks)
+    GET    /stats                           --> the current and the longest streak of all habits
+                                                (with ?days=... or ?weeks=... also the stats of this time window)
+    GET    /health                          --> checks whether the service runs (no authentication)
+
+The connections of the clients are handled by one asyncio event loop. The database work is blocking, so it runs in
+a pool of worker threads, which is not larger than the connection pool of database.py (a worker borrows a
+connection for every request). If more requests are waiting for a worker than max_pending, new requests are answered
+at once with 503 (Service Unavailable) instead of waiting longer and longer.
+Unknown habits are answered with 404, invalid values with 400. Any other error is logged with its traceback
+(logging module) and answered with 500 (Internal Server Error).
+The logged-in users are kept for a short time, so their habits do not have to be read for every request.
+The requests of one user run one after another, the requests of different users run at the same time.
+
+It imports the libraries argparse, asyncio, base64, json, logging, sqlite3, threading and time, as well as
+concurrent.futures, datetime and urllib.
+It further imports database.py for the connections and initialisation.py for the database and the login.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qsl, unquote, urlsplit
+import database
+import initialisation
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ["Health", "Fun", "Mindfulness"]
+PERIODICITIES = ["Daily", "Weekly"]
+
+# THE MAXIMUM NUMBER OF REQUESTS THAT MAY WAIT FOR A WORKER THREAD.
+MAX_PENDING = 256
+# THE NUMBER OF SECONDS A LOGGED-IN USER IS KEPT BEFORE THE PASSWORD AND THE HABITS ARE READ AGAIN.
+USER_CACHE_SECONDS = 30
+# THE NUMBER OF SECONDS AN IDLE CONNECTION OF A CLIENT IS KEPT OPEN.
+IDLE_TIMEOUT = 15
+MAX_BODY_SIZE = 1024 * 1024
+# THE LONGEST TIME WINDOW OF THE STATS (ABOUT TEN YEARS).
+MAX_WINDOW_DAYS = 3660
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error",
+           503: "Service Unavailable"}
+
+
+class HTTPError(Exception):
+    """
+    An error that is answered with its status code and message.
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# THE HTTP SERVICE.
+class HabitService:
+    """
+    A class used to represent the HTTP service.
+
+    Attributes
+    ----------
+    workers: int
+        the number of worker threads for the database work
+    max_pending: int
+        the maximum number of requests that may wait for a worker thread
+
+    Methods
+    -------
+    start(host, port)
+        starts the service, returns the asyncio server
+    close()
+        stops the service and its worker threads
+    handle_request(method, target, headers, body)
+        answers one request, returns the status code and the JSON payload
+    """
+
+    # INIT METHOD.
+    def __init__(self, workers=None, max_pending=MAX_PENDING, user_cache_seconds=USER_CACHE_SECONDS):
+        """
+        Parameters
+        ----------
+        :param workers: int
+            the number of worker threads, defaults to the size of the connection pool
+        :param max_pending: int
+            the maximum number of requests that may wait for a worker thread
+        :param user_cache_seconds: float
+            the number of seconds a logged-in user is kept
+        """
+        pool_size = database.get_pool().pool_size
+        self.workers = min(workers or pool_size, pool_size)
+        self.max_pending = max_pending
+        self.user_cache_seconds = user_cache_seconds
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="habit-service")
+        self._pending = 0
+        self._server = None
+        # username --> (time of the login, hash of the password, UserClass, lock of the user)
+        self._users = {}
+        self._users_lock = threading.Lock()
+
+    # STARTS THE SERVICE.
+    async def start(self, host="127.0.0.1", port=8080):
+        """
+        Prepares the database and starts listening for clients.
+
+        :param host: str
+        :param port: int
+            0 for any free port (see the sockets of the returned server)
+        :return: asyncio.Server
+        """
+        def launch_database():
+            initialisation.launch_database()
+            database.get_pool().release_thread_connection()
+
+        await asyncio.get_running_loop().run_in_executor(self._executor, launch_database)
+        self._server = await asyncio.start_server(self._serve_client, host, port)
+        return self._server
+
+    # STOPS THE SERVICE.
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=True)
+
+    # ANSWERS ALL REQUESTS OF ONE CLIENT CONNECTION.
+    async def _serve_client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(_read_request(reader), IDLE_TIMEOUT)
+                except HTTPError as error:
+                    writer.write(_response(error.status, {"error": error.message}, keep_alive=False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                status, payload = await self.handle_request(method, target, headers, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    # ANSWERS ONE REQUEST.
+    async def handle_request(self, method, target, headers, body):
+        """
+        Finds the handler of a request and runs it in a worker thread.
+
+        Parameters
+        ----------
+        :param method: str
+        :param target: str
+            the path of the request, e.g. '/habits/Yoga'
+        :param headers: dict
+            the headers of the request with lower-case names
+        :param body: bytes
+
+        Returns
+        -------
+        :return: tuple
+            Returns (status code, JSON payload).
+        """
+        try:
+            handler, arguments = _route(method, target)
+            if handler is None:
+                return 200, {"status": "ok"}
+            credentials = _credentials(headers)
+            # the parameters of the query string (e.g. ?days=30) are handed over together with the body
+            data = dict(_parse_body(body), **dict(parse_qsl(urlsplit(target).query)))
+            if self._pending >= self.max_pending:
+                raise HTTPError(503, "Too many requests, please try again later.")
+            self._pending += 1
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self._executor, self._run, handler,
+                                                                        credentials, arguments, data)
+            finally:
+                self._pending -= 1
+        except HTTPError as error:
+            return error.status, {"error": error.message}
+        except sqlite3.OperationalError as error:
+            if database.is_busy_error(error):
+                return 503, {"error": "The database is busy, please try again later."}
+            logger.exception("%s %s failed", method, target)
+            return 500, {"error": "Internal server error."}
+        except Exception:
+            logger.exception("%s %s failed", method, target)
+            return 500, {"error": "Internal server error."}
+
+    # RUNS A HANDLER FOR THE LOGGED-IN USER (IN A WORKER THREAD).
+    def _run(self, handler, credentials, arguments, data):
+        try:
+            user, lock = self._login(*credentials)
+            with lock:
+                return handler(user, *arguments, data)
+        finally:
+            # the connection goes back into the pool, so the workers never hold more connections than they use
+            database.get_pool().release_thread_connection()
+
+    # RETURNS THE LOGGED-IN USER, THE USER IS KEPT FOR user_cache_seconds.
+    def _login(self, username, password):
+        now = time.monotonic()
+        password_hash = initialisation.hash_password(password)
+        with self._users_lock:
+            entry = self._users.get(username)
+        if entry is not None and entry[1] == password_hash and now - entry[0] < self.user_cache_seconds:
+            return entry[2], entry[3]
+
+        user = initialisation.authenticate(username, password)
+        if user is None:
+            raise HTTPError(401, "Invalid username or password.")
+        with self._users_lock:
+            entry = self._users.get(username)
+            # a user that is still in use keeps its lock, so its requests still run one after another
+            lock = entry[3] if entry is not None else threading.Lock()
+            self._users[username] = (now, password_hash, user, lock)
+        return user, lock
+
+
+# READS ONE REQUEST OF A CLIENT.
+async def _read_request(reader):
+    """
+    Reads the request line, the headers and the body of one HTTP/1.1 request.
+
+    :param reader: asyncio.StreamReader
+    :return: tuple
+        Returns (method, target, headers, body), None if the client closed the connection.
+    """
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    parts = request_line.decode("latin-1").split()
+    if len(parts) != 3:
+        raise HTTPError(400, "Invalid request line.")
+    method, target, _ = parts
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HTTPError(400, "Invalid Content-Length.")
+    if length > MAX_BODY_SIZE:
+        raise HTTPError(413, "The body of the request is too large.")
+    body = await reader.readexactly(length) if length > 0 else b""
+    return method.upper(), target, headers, body
+
+
+# BUILDS A RESPONSE.
+def _response(status, payload, keep_alive=True):
+    body = json.dumps(payload).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n")
+    if status == 401:
+        head += 'WWW-Authenticate: Basic realm="habit tracker"\r\n'
+    return head.encode("latin-1") + b"\r\n" + body
+
+
+# READS USERNAME AND PASSWORD OUT OF THE AUTHORIZATION HEADER.
+def _credentials(headers):
+    scheme, _, encoded = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "basic":
+        raise HTTPError(401, "Please log in with your username and password.")
+    try:
+        username, separator, password = base64.b64decode(encoded, validate=True).decode("utf-8").partition(":")
+    except ValueError:
+        raise HTTPError(401, "Please log in with your username and password.")
+    if not separator:
+        raise HTTPError(401, "Please log in with your username and password.")
+    return username, password
+
+
+# READS THE JSON BODY OF A REQUEST.
+def _parse_body(body):
+    if not body:
+        return {}
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise HTTPError(400, "The body of the request is not valid JSON.")
+    if not isinstance(data, dict):
+        raise HTTPError(400, "The body of the request must be a JSON object.")
+    return data
+
+
+# FINDS THE HANDLER OF A REQUEST.
+def _route(method, target):
+    """
+    :return: tuple
+        Returns (handler, arguments taken from the path). The handler is None for /health.
+    """
+    segments = [unquote(segment) for segment in urlsplit(target).path.strip("/").split("/")]
+    routes = {
+        ("health",): {"GET": None},
+        ("habits",): {"GET": _list_habits, "POST": _create_habit},
+        ("habits", None): {"GET": _show_habit, "PATCH": _change_habit, "DELETE": _delete_habit},
+        ("habits", None, "completions"): {"POST": _complete_habit},
+        ("habits", None, "stats"): {"GET": _habit_window_stats},
+        ("completions",): {"POST": _record_completions},
+        ("stats",): {"GET": _stats},
+    }
+    for pattern, handlers in routes.items():
+        if len(pattern) == len(segments) and all(part is None or part == segment
+                                                  for part, segment in zip(pattern, segments)):
+            if method not in handlers:
+                raise HTTPError(405, f"{method} is not allowed for {target}.")
+            return handlers[method], [segment for part, segment in zip(pattern, segments) if part is None]
+    raise HTTPError(404, f"{target} does not exist.")
+
+
+# The following functions answer the requests. They run in a worker thread and get the logged-in user,
+# the habit name of the path (if there is one) and the JSON body of the request.
+
+def _habit_to_dict(habit):
+    return {"habit_name": habit.habit_name, "category": habit.category, "periodicity": habit.periodicity,
+            "datetime_of_creation": str(habit.datetime_of_creation)}
+
+
+def _get_existing_habit(user, habit_name):
+    habit = user.get_habit(habit_name)
+    if habit is None:
+        raise HTTPError(404, f"The habit '{habit_name}' does not exist.")
+    return habit
+
+
+def _check_choice(data, key, choices, required):
+    value = data.get(key)
+    if value is None and not required:
+        return None
+    if value not in choices:
+        raise HTTPError(400, f"'{key}' must be one of {', '.join(choices)}.")
+    return value
+
+
+def _parse_datetime(value):
+    if value is None:
+        return datetime.now()
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"'{value}' is not a date and time like '2021-08-07 11:57'.")
+
+
+def _list_habits(user, data):
+    return 200, {"habits": [_habit_to_dict(habit) for habit in user.get_all_habits()]}
+
+
+def _create_habit(user, data):
+    habit_name = data.get("habit_name")
+    if not isinstance(habit_name, str) or not habit_name:
+        raise HTTPError(400, "'habit_name' is missing.")
+    habit = user.add_habit(habit_name, _check_choice(data, "category", CATEGORIES, True),
+                           _check_choice(data, "periodicity", PERIODICITIES, True))
+    if habit is None:
+        raise HTTPError(409, f"The habit '{habit_name}' already exists.")
+    return 201, _habit_to_dict(habit)
+
+
+def _show_habit(user, habit_name, data):
+    habit = _get_existing_habit(user, habit_name)
+    current, longest = user.get_stored_streak(habit)
+    return 200, dict(_habit_to_dict(habit), current=current, longest=longest,
+                     completions_in_current_period=user.completions_in_current_period(habit_name))
+
+
+def _change_habit(user, habit_name, data):
+    _get_existing_habit(user, habit_name)
+    habit = user.change_habit(habit_name, _check_choice(data, "category", CATEGORIES, False),
+                              _check_choice(data, "periodicity", PERIODICITIES, False))
+    return 200, _habit_to_dict(habit)
+
+
+def _delete_habit(user, habit_name, data):
+    if not user.remove_habit(habit_name):
+        raise HTTPError(404, f"The habit '{habit_name}' does not exist.")
+    return 200, {"deleted": habit_name}
+
+
+def _complete_habit(user, habit_name, data):
+    _get_existing_habit(user, habit_name)
+    user.record_completions([(habit_name, _parse_datetime(data.get("at")))])
+    return 201, {"recorded": 1}
+
+
+def _record_completions(user, data):
+    completions = data.get("completions")
+    if not isinstance(completions, list) or not all(isinstance(completion, dict) for completion in completions):
+        raise HTTPError(400, "'completions' must be a list of objects like {\"habit\": ..., \"at\": ...}.")
+    batch = [(completion.get("habit"), _parse_datetime(completion.get("at"))) for completion in completions]
+    if not all(isinstance(habit_name, str) for habit_name, _ in batch):
+        raise HTTPError(400, "Every completion needs a 'habit'.")
+    unknown = user.record_completions(batch)
+    return 201, {"recorded": len([habit_name for habit_name, _ in batch if habit_name not in unknown]),
+                 "unknown": unknown}
+
+
+def _window(data):
+    window = {key: data[key] for key in ["days", "weeks"] if key in data}
+    try:
+        window = {key: int(value) for key, value in window.items()}
+    except (TypeError, ValueError):
+        raise HTTPError(400, "'days' and 'weeks' must be whole numbers.")
+    if len(window) != 1 or not 0 < window.get("days", window.get("weeks", 0) * 7) <= MAX_WINDOW_DAYS:
+        raise HTTPError(400, f"Please give either 'days' or 'weeks' (up to {MAX_WINDOW_DAYS} days).")
+    return window
+
+
+def _habit_window_stats(user, habit_name, data):
+    window = _window(data)
+    try:
+        stats = user.compute_window_stats(habit_name, **window)
+    except ValueError as error:
+        raise HTTPError(400, str(error))
+    if stats is None:
+        raise HTTPError(404, f"The habit '{habit_name}' does not exist.")
+    return 200, stats
+
+
+def _stats(user, data):
+    result = {"streaks": user.get_stored_streaks()}
+    if "days" in data or "weeks" in data:
+        window = _window(data)
+        try:
+            result["window"] = user.compute_window_overview(**window)
+        except ValueError as error:
+            raise HTTPError(400, str(error))
+    return 200, result
+
+
+# RUNS THE SERVICE UNTIL IT IS STOPPED (CTRL+C).
+async def serve(host, port, workers=None, max_pending=MAX_PENDING):
+    service = HabitService(workers, max_pending)
+    server = await service.start(host, port)
+    print(f"Habit tracker service on http://{host}:{server.sockets[0].getsockname()[1]} "
+          f"with {service.workers} worker thread(s)")
+    try:
+        await server.serve_forever()
+    finally:
+        await service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTTP service of the habit tracker.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, help="worker threads for the database (default: the pool size)")
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING,
+                        help="requests that may wait for a worker before new ones get 503")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.max_pending))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,357 @@
+"""
+This document contains the streak engine of our programme.
+It computes the current and the longest streak of a habit from its completion timestamps in one single pass.
+
+The engine works on integer period ordinals: a day ordinal is the proleptic Gregorian ordinal of a date
+(see date.toordinal()), a week ordinal counts the calendar weeks (Monday to Sunday) since 0001-01-01.
+Since both ordinals increase monotonically, two periods follow each other if their difference is exactly one,
+also across the turn of a year.
+
+It imports the library datetime.
+"""
+from datetime import date, datetime, timezone
+
+# day ordinal of 1970-01-01, used to convert NumPy datetime64 values into day ordinals
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+# CONVERTS A SINGLE COMPLETION TIMESTAMP INTO A DAY ORDINAL.
+def day_ordinal(timestamp):
+    """
+    Converts a single completion timestamp into a day ordinal.
+
+    Parameters
+    ----------
+    :param timestamp: datetime, date, str or int
+        The timestamp as stored in the database (e.g. '2021-08-07 11:57:59.369350'), a datetime or date object
+        or an already computed day ordinal.
+
+    Returns
+    -------
+    :return: int
+        Returns the day ordinal of the timestamp.
+    """
+    if isinstance(timestamp, datetime):
+        return timestamp.date().toordinal()
+    if isinstance(timestamp, date):
+        return timestamp.toordinal()
+    if isinstance(timestamp, str):
+        # only the date part is needed, so the time (with or without microseconds) is never parsed
+        return date.fromisoformat(timestamp[:10]).toordinal()
+    return int(timestamp)
+
+
+# COMPUTES THE INTEGER COLUMNS THAT ARE STORED WITH EVERY COMPLETION.
+def completion_columns(timestamp):
+    """
+    Computes the integer columns that are stored with every completion in the progress table.
+
+    They are computed once when the completion is stored, so reading the progress never needs to parse text.
+    The stored date and time of completion has no time zone, so it is read as UTC for the epoch seconds.
+    This way the same completion gets the same epoch seconds on every machine, no matter its time zone
+    (the same as NumPy, see columnar.py).
+
+    Parameters
+    ----------
+    :param timestamp: datetime or str
+        the (local) date and time of the completion, e.g. '2021-08-07 11:57:59.369350'
+
+    Returns
+    -------
+    :return: tuple
+        Returns (completed_at, day_ordinal): the epoch seconds and the day ordinal.
+    """
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return int(timestamp.timestamp()), timestamp.toordinal()
+
+
+# CONVERTS AN ARRAY OF COMPLETION TIMESTAMPS INTO DAY ORDINALS.
+def day_ordinals(timestamps):
+    """
+    Converts an array of completion timestamps into day ordinals.
+
+    Parameters
+    ----------
+    :param timestamps:
+        Either a NumPy datetime64 array or any iterable of values accepted by day_ordinal().
+
+    Returns
+    -------
+    :return:
+        Returns an integer array (NumPy input) or a list of day ordinals.
+    """
+    dtype = getattr(timestamps, "dtype", None)
+    if dtype is not None and dtype.kind == "M":
+        return timestamps.astype("datetime64[D]").astype("int64") + EPOCH_ORDINAL
+    return [day_ordinal(timestamp) for timestamp in timestamps]
+
+
+# CONVERTS A DAY ORDINAL INTO A WEEK ORDINAL.
+def week_ordinal(day):
+    """
+    Converts a day ordinal into a week ordinal.
+
+    The 1st of January of the year 1 is a Monday, so all days from Monday to Sunday of the same calendar week
+    share one week ordinal and consecutive calendar weeks have consecutive week ordinals.
+
+    Parameters
+    ----------
+    :param day: int
+        the day ordinal
+
+    Returns
+    -------
+    :return: int
+        Returns the week ordinal.
+    """
+    return (day - 1) // 7
+
+
+# CONVERTS AN ARRAY OF DAY ORDINALS INTO WEEK ORDINALS.
+def week_ordinals(days):
+    """
+    Converts an array of day ordinals into week ordinals.
+
+    :param days:
+        A NumPy integer array or any iterable of day ordinals.
+    :return:
+        Returns an integer array (NumPy input) or a list of week ordinals.
+    """
+    if hasattr(days, "dtype"):
+        return (days - 1) // 7
+    return [week_ordinal(day) for day in days]
+
+
+# COMPUTES THE CURRENT AND THE LONGEST STREAK IN ONE PASS.
+def compute_streaks(periods, current_period, grace=0):
+    """
+    Computes the current and the longest streak from sorted period ordinals in one single pass.
+
+    Several completions within the same period are only counted once. Periods that lie in the future
+    (after current_period) are counted for the longest streak, but not for the current streak.
+
+    Parameters
+    ----------
+    :param periods:
+        Day or week ordinals of all completions of a habit, sorted in ascending order.
+    :param current_period: int
+        The ordinal of the current day or week.
+    :param grace: int
+        Number of periods the current streak stays alive without a completion.
+        With grace=1 a daily streak still counts if the habit was last completed yesterday.
+
+    Returns
+    -------
+    :return: tuple
+        Returns (current streak, longest streak).
+    """
+    current = 0
+    longest = 0
+    run = 0
+    previous = None
+
+    for period in periods:
+        if previous is not None:
+            if period == previous:
+                continue
+            if period < previous:
+                raise ValueError("The periods must be sorted in ascending order.")
+        run = run + 1 if previous is not None and period - previous == 1 else 1
+        previous = period
+        if run > longest:
+            longest = run
+        if current_period - grace <= period <= current_period:
+            current = run
+
+    return current, longest
+
+
+# COMPUTES THE CURRENT STREAK FROM THE NEWEST COMPLETION BACKWARDS.
+def current_streak(periods_newest_first, current_period, grace=0):
+    """
+    Computes only the current streak from period ordinals sorted in descending order (newest first).
+
+    The periods are read only until the streak breaks, so the cost depends on the length of the current streak
+    and not on the length of the history. With a generator that reads the periods from the database while they
+    are iterated (see UserClass.iter_progress_periods()), the rest of the history is never fetched.
+    The result is the same as the current streak of compute_streaks().
+
+    Parameters
+    ----------
+    :param periods_newest_first: iterable
+        the period ordinals of the completions, sorted in descending order, duplicates are allowed
+    :param current_period: int
+        the ordinal of the current period
+    :param grace: int
+        the number of periods a streak stays current without a completion
+
+    Returns
+    -------
+    :return: int
+        Returns the current streak.
+        Raises ValueError if the periods are not sorted in descending order.
+    """
+    streak = 0
+    previous = None
+    for period in periods_newest_first:
+        if previous is not None and period > previous:
+            raise ValueError("The periods must be sorted in descending order.")
+        if period > current_period:
+            # completions dated in the future do not belong to the current streak
+            previous = period
+            continue
+        if streak == 0:
+            if period < current_period - grace:
+                return 0
+            streak = 1
+        elif period == previous - 1:
+            streak += 1
+        elif period != previous:
+            break
+        previous = period
+    return streak
+
+
+# THE NUMBER OF PERIODS A CURRENT STREAK STAYS ALIVE WITHOUT A COMPLETION.
+# A DAILY HABIT COMPLETED YESTERDAY STILL HAS A CURRENT STREAK, A WEEKLY HABIT MUST BE COMPLETED IN THE CURRENT WEEK.
+GRACE = {"Daily": 1, "Weekly": 0}
+
+
+# CONVERTS A DAY ORDINAL INTO THE PERIOD ORDINAL OF A HABIT.
+def to_period(day, periodicity):
+    """
+    :param day: int
+        the day ordinal
+    :param periodicity: str
+        'Daily' or 'Weekly'
+    :return: int
+        Returns the day ordinal for daily habits and the week ordinal for weekly habits.
+    """
+    return week_ordinal(day) if periodicity == "Weekly" else day
+
+
+# The following functions maintain the streaks table of the database.
+# It stores for every habit the streak that ends with its latest completion, the longest streak and the
+# period ordinal of the latest completion, so the stats do not need to scan the whole progress history.
+
+# REBUILDS THE STREAKS TABLE FROM THE ROLLUP TABLE.
+def rebuild_streak_table(conn, habit_ids=None):
+    """
+    Recomputes the streaks table from the rollup table completion_counts (see rollup.py), which has one row per
+    day or week with a completion, so the progress rows themselves are not read.
+    The rollup table must already contain all completions of the habits.
+
+    Does not commit, so it can run inside a bigger transaction.
+
+    Parameters
+    ----------
+    :param conn: an open database connection
+    :param habit_ids: list
+        The habits to recompute. If None, the streaks of all habits are recomputed.
+    """
+    query = ("SELECT habits.habit_id, completion_counts.period FROM habits "
+             "LEFT JOIN completion_counts ON completion_counts.habit_id = habits.habit_id "
+             "AND completion_counts.period_type = habits.periodicity")
+    params = ()
+    if habit_ids is not None:
+        habit_ids = list(habit_ids)
+        query += f" WHERE habits.habit_id IN ({', '.join('?' for _ in habit_ids)})"
+        params = habit_ids
+        conn.executemany("DELETE FROM streaks WHERE habit_id = ?", [(habit_id,) for habit_id in habit_ids])
+    else:
+        conn.execute("DELETE FROM streaks")
+    query += " ORDER BY habits.habit_id, completion_counts.period"
+
+    # collects the periods habit by habit and writes one row per habit
+    rows = []
+    habit_id = None
+    periods = []
+    for row_habit_id, period in conn.execute(query, params):
+        if row_habit_id != habit_id:
+            if periods:
+                rows.append(_streak_row(habit_id, periods))
+            habit_id, periods = row_habit_id, []
+        if period is not None:
+            periods.append(period)
+    if periods:
+        rows.append(_streak_row(habit_id, periods))
+
+    conn.executemany("INSERT INTO streaks (habit_id, current_streak, longest_streak, last_period) "
+                     "VALUES(?, ?, ?, ?)", rows)
+
+
+def _streak_row(habit_id, periods):
+    # the streak that ends with the latest completion is the current streak of the table
+    current, longest = compute_streaks(periods, periods[-1])
+    return habit_id, current, longest, periods[-1]
+
+
+# UPDATES THE STREAKS OF SEVERAL HABITS AFTER A BATCH OF COMPLETIONS.
+def record_completions(conn, completions):
+    """
+    Updates the streaks table after a batch of completions was stored, with one read and one write per batch.
+
+    The completions of every habit are applied in chronological order: a completion in the same period as the
+    latest completion changes nothing, a completion in the following period extends the streak, a later completion
+    starts a new streak. Habits with a completion before their latest stored completion (backfilling) are
+    recomputed from the rollup table, all of them together with one call of rebuild_streak_table(). So the rollup
+    table must be updated with the batch first (see rollup.add_completions()).
+    Does not commit, so the update is stored together with the completions.
+
+    Parameters
+    ----------
+    :param conn: an open database connection
+    :param completions: an iterable of (habit_id, periodicity, datetime_of_completion) tuples in any order
+    """
+    periods = {}
+    for habit_id, periodicity, datetime_of_completion in completions:
+        periods.setdefault(habit_id, set()).add(to_period(day_ordinal(datetime_of_completion), periodicity))
+    if not periods:
+        return
+
+    habit_ids = list(periods)
+    stored = {row[0]: row[1:] for row in conn.execute(
+        "SELECT habit_id, current_streak, longest_streak, last_period FROM streaks "
+        f"WHERE habit_id IN ({', '.join('?' for _ in habit_ids)})", habit_ids)}
+
+    rows = []
+    backfilled = []
+    for habit_id in habit_ids:
+        current, longest, last_period = stored.get(habit_id, (0, 0, None))
+        new_periods = sorted(periods[habit_id])
+        if last_period is not None and new_periods[0] < last_period:
+            backfilled.append(habit_id)
+            continue
+        for period in new_periods:
+            if period == last_period:
+                continue
+            current = current + 1 if last_period is not None and period == last_period + 1 else 1
+            longest = max(longest, current)
+            last_period = period
+        rows.append((habit_id, current, longest, last_period))
+
+    conn.executemany("INSERT OR REPLACE INTO streaks (habit_id, current_streak, longest_streak, last_period) "
+                     "VALUES(?, ?, ?, ?)", rows)
+    if backfilled:
+        rebuild_streak_table(conn, backfilled)
+
+
+# RETURNS THE CURRENT STREAK FROM THE VALUES OF THE STREAKS TABLE.
+def current_from_table(current_streak, last_period, current_period, grace=0):
+    """
+    Returns the current streak from the values stored in the streaks table.
+
+    The stored streak ends with the latest completion, so it only counts if this completion is recent enough.
+
+    :param current_streak: int or None
+    :param last_period: int or None
+    :param current_period: int
+    :param grace: int
+    :return: int
+    """
+    if last_period is None or last_period < current_period - grace:
+        return 0
+    return current_streak
@@ -1 +1,46 @@
-# init file
\ No newline at end of file
+# init file
+"""
+This document contains the base class of the tests that need a database of their own.
+
+It imports the libraries os, tempfile and unittest.
+It further imports database.py and initialisation.py to create the database and User.py for the test user.
+"""
+from unittest import TestCase
+
+import os
+import tempfile
+import database
+import initialisation
+import User
+
+
+# A TEST CASE WITH AN EMPTY DATABASE OF ITS OWN.
+class TempDatabaseTestCase(TestCase):
+    """
+    Every test gets a new database file (self.db_path) in a temporary folder, which database.py uses during
+    the test. The tables are created by initialisation.launch_database(). After the test database.py uses
+    its default database again and the folder is deleted.
+    The test user Anna Mustermann is stored by make_user().
+    """
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "main_db.db")
+        database.configure(self.db_path)
+        initialisation.launch_database()
+
+    def tearDown(self):
+        database.configure()
+        self.tmp.cleanup()
+
+    def make_user(self, password="1234"):
+        """
+        Stores the test user Anna Mustermann (username "anna") in the database of the test.
+
+        :param password: str
+            the password of the user, it is stored hashed, so the user can log in with it
+        :return: UserClass
+            Returns the stored user.
+        """
+        user = User.UserClass("Anna", "Mustermann", "anna", initialisation.hash_password(password))
+        user.store_in_db()
+        return user
@@ -1,11 +1,16 @@
 from unittest import TestCase
+from datetime import date, datetime, timedelta
 from freezegun import freeze_time
 
 import sys
 import os
+import random
 import Habit
 import User
+import database
 import initialisation
+import streaks
+from . import TempDatabaseTestCase
 
 # https://stackoverflow.com/a/11158224
 sys.path.insert(1, os.path.join(sys.path[0], '..'))
@@ -83,4 +88,289 @@ class TestUserClass(TestCase):
         streak_non_existing_habit = User.UserClass.compute_longest_weekly_streak_habit(user, "non_existing_habit")
         assert streak_yoga == 4
         assert streak_drawing == 5
-        assert streak_non_existing_habit == 0
\ No newline at end of file
+        assert streak_non_existing_habit == 0
+
+    @freeze_time('2021-08-07')
+    def test_compute_all_streaks(self):
+        user = initialisation.get_user("testuser1")
+        all_streaks = User.UserClass.compute_all_streaks(user)
+        assert list(all_streaks) == ["Yoga", "Walking", "Drawing", "Singing", "Meditation", "Journaling"]
+        for habit_name in ["Walking", "Singing", "Journaling"]:
+            assert all_streaks[habit_name] == {
+                "periodicity": "Daily",
+                "current": User.UserClass.compute_current_daily_streak(user, habit_name),
+                "longest": User.UserClass.compute_longest_daily_streak_habit(user, habit_name)}
+        for habit_name in ["Yoga", "Drawing", "Meditation"]:
+            assert all_streaks[habit_name] == {
+                "periodicity": "Weekly",
+                "current": User.UserClass.compute_current_weekly_streak(user, habit_name),
+                "longest": User.UserClass.compute_longest_weekly_streak_habit(user, habit_name)}
+
+    @freeze_time('2021-08-07')
+    def test_get_stored_streaks(self):
+        user = initialisation.get_user("testuser2")
+        assert User.UserClass.get_stored_streaks(user) == User.UserClass.compute_all_streaks(user)
+
+    @freeze_time('2021-09-30')
+    def test_get_stored_streaks_expired(self):
+        user = initialisation.get_user("testuser1")
+        stored_streaks = User.UserClass.get_stored_streaks(user)
+        assert stored_streaks == User.UserClass.compute_all_streaks(user)
+        assert stored_streaks["Journaling"] == {"periodicity": "Daily", "current": 0, "longest": 5}
+
+
+class TestStreaksAcrossYears(TempDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user()
+
+    def add_habit(self, habit_name, periodicity, completions):
+        habit = Habit.HabitClass(habit_name, "anna", "Health", periodicity, datetime(2019, 1, 1))
+        self.user.store_habit_in_db(habit)
+        conn = database.get_connection()
+        for datetime_of_completion in completions:
+            conn.execute("INSERT INTO progress (habit_id, datetime_of_completion, completed_at, day_ordinal) "
+                         "VALUES(?, ?, ?, ?)",
+                         (habit.habit_id, datetime_of_completion, *streaks.completion_columns(datetime_of_completion)))
+        initialisation.rebuild_derived_tables(conn)
+        conn.commit()
+
+    @freeze_time('2021-01-13')
+    def test_weekly_streak_across_new_year(self):
+        # week 52 and 53 of 2020, week 1 and 2 of 2021
+        self.add_habit("Yoga", "Weekly", [datetime(2020, 12, 21, 18), datetime(2020, 12, 28, 18),
+                                          datetime(2021, 1, 4, 18), datetime(2021, 1, 11, 18)])
+        assert User.UserClass.compute_current_weekly_streak(self.user, "Yoga") == 4
+        assert User.UserClass.compute_longest_weekly_streak_habit(self.user, "Yoga") == 4
+        assert User.UserClass.get_stored_streaks(self.user)["Yoga"]["current"] == 4
+
+    @freeze_time('2021-06-15')
+    def test_same_week_number_in_different_years(self):
+        # week 23 of 2020 and week 24 of 2021 are a year apart and no streak
+        self.add_habit("Yoga", "Weekly", [datetime(2020, 6, 1, 18), datetime(2020, 6, 3, 18),
+                                          datetime(2021, 6, 14, 18)])
+        # week 23 of 2019, 2020 and 2021 are three different weeks
+        self.add_habit("Drawing", "Weekly", [datetime(2019, 6, 3, 18), datetime(2020, 6, 1, 18),
+                                             datetime(2021, 6, 7, 18), datetime(2021, 6, 14, 18)])
+        assert User.UserClass.compute_current_weekly_streak(self.user, "Yoga") == 1
+        assert User.UserClass.compute_longest_weekly_streak_habit(self.user, "Yoga") == 1
+        assert User.UserClass.compute_current_weekly_streak(self.user, "Drawing") == 2
+        assert User.UserClass.compute_longest_weekly_streak_habit(self.user, "Drawing") == 2
+
+    @freeze_time('2022-01-02')
+    def test_daily_streak_across_new_year(self):
+        self.add_habit("Walking", "Daily", [datetime(2021, 12, 30, 9), datetime(2021, 12, 31, 9),
+                                            datetime(2022, 1, 1, 9), datetime(2022, 1, 2, 9)])
+        assert User.UserClass.compute_current_daily_streak(self.user, "Walking") == 4
+        assert User.UserClass.compute_all_streaks(self.user)["Walking"] == \
+            {"periodicity": "Daily", "current": 4, "longest": 4}
+
+
+class TestRecordCompletions(TempDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user()
+        self.user.add_habit("Yoga", "Health", "Weekly")
+        self.user.add_habit("Walking", "Health", "Daily")
+
+    @freeze_time('2021-08-07 12:00')
+    def test_record_completions(self):
+        unknown = self.user.record_completions(["Walking", ("Walking", datetime(2021, 8, 6, 9)),
+                                                ("Yoga", "2021-08-02 18:00:00"), "Running", "Running",
+                                                ("Yoga", datetime(2021, 7, 27, 18))])
+        assert unknown == ["Running"]
+        conn = database.get_connection()
+        assert conn.execute("SELECT count(*) FROM progress").fetchone()[0] == 4
+        assert not conn.in_transaction
+        assert self.user.get_stored_streaks() == self.user.compute_all_streaks() == {
+            "Yoga": {"periodicity": "Weekly", "current": 2, "longest": 2},
+            "Walking": {"periodicity": "Daily", "current": 2, "longest": 2}}
+
+    @freeze_time('2021-08-07 12:00')
+    def test_backfill(self):
+        self.user.record_completions([("Walking", datetime(2021, 8, 1, 9)), ("Walking", datetime(2021, 8, 7, 9))])
+        walking = self.user.get_habit("Walking")
+        assert self.user.get_stored_streak(walking) == (1, 1)
+        # the days in between were recorded offline and are sent later
+        self.user.record_completions([("Walking", datetime(2021, 8, day, 9)) for day in range(2, 7)])
+        assert self.user.get_stored_streak(walking) == (7, 7)
+        assert self.user.compute_all_streaks()["Walking"]["current"] == 7
+
+    @freeze_time('2021-08-07 12:00')
+    def test_completions_in_current_period(self):
+        # Monday 02.08.2021 and Saturday 07.08.2021 are in the same week, Sunday 01.08.2021 is not
+        self.user.record_completions([("Yoga", datetime(2021, 8, 1, 9)), ("Yoga", datetime(2021, 8, 2, 9)), "Yoga",
+                                      ("Walking", datetime(2021, 8, 6, 9))])
+        assert self.user.completions_in_current_period("Yoga") == 2
+        assert self.user.completions_in_current_period("Walking") == 0
+        assert self.user.completions_in_current_period("Running") is None
+
+    @freeze_time('2021-08-07 12:00')
+    def test_iter_progress_periods(self):
+        self.user.record_completions([("Walking", datetime(2021, 7, day, 9)) for day in range(1, 32)] +
+                                     [("Walking", datetime(2021, 8, day, 9)) for day in [3, 5, 6, 7, 7]])
+        days = list(self.user.iter_progress_periods("Walking", "Daily", newest_first=True))
+        assert days[:4] == [date(2021, 8, day).toordinal() for day in [7, 6, 5, 3]]
+        assert days == sorted(set(days), reverse=True) and len(days) == 35
+        assert list(self.user.iter_progress_periods("Walking", "Weekly")) == []
+        assert list(self.user.iter_progress_periods("Running", "Daily")) == []
+        assert User.UserClass.compute_current_daily_streak(self.user, "Walking") == 3
+        assert User.UserClass.compute_current_weekly_streak(self.user, "Yoga") == 0
+
+
+class TestHabitCache(TempDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_user()
+        self.user = initialisation.authenticate("anna", "1234")
+
+    def test_read_paths_need_no_query(self):
+        self.user.add_habit("Yoga", "Health", "Weekly")
+        self.user.add_habit("Walking", "Health", "Daily")
+        statements = []
+        database.get_connection().set_trace_callback(statements.append)
+        try:
+            assert self.user.get_habit("Yoga").periodicity == "Weekly"
+            assert self.user.get_habit("Running") is None
+            assert self.user.show_all() == ["Yoga", "Walking"]
+            assert self.user.show_weekly_habits() == ["Yoga"]
+            assert self.user.show_daily_habits() == ["Walking"]
+            assert self.user.add_habit("Yoga", "Fun", "Daily") is None
+        finally:
+            database.get_connection().set_trace_callback(None)
+        assert statements == []
+
+    def test_changes_update_the_cache(self):
+        yoga = self.user.add_habit("Yoga", "Health", "Weekly")
+        assert yoga.habit_id is not None
+        assert self.user.get_habit("Yoga") is yoga
+        assert self.user.remove_habit("Yoga")
+        assert self.user.get_habit("Yoga") is None
+        assert not self.user.remove_habit("Yoga")
+
+        # a habit created by another programme is seen after the habits were loaded again
+        User.UserClass(None, None, "anna", None).add_habit("Drawing", "Fun", "Weekly")
+        assert self.user.get_habit("Drawing") is None
+        self.user.load_habits()
+        assert self.user.get_habit("Drawing").category == "Fun"
+
+
+class TestShuffledInserts(TempDatabaseTestCase):
+    # property test: the results must not depend on the order in which the completions were stored
+    TODAY = datetime(2021, 8, 7, 12)
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user()
+
+    @staticmethod
+    def reference_streaks(periods, current_period, grace):
+        # brute force: the longest run of consecutive periods and the run that ends in the current period
+        longest = max((run for run in range(1, len(periods) + 1)
+                       if any(all(start + n in periods for n in range(run)) for start in periods)), default=0)
+        end = next((period for period in range(current_period, current_period - grace - 1, -1)
+                    if period in periods), None)
+        current = 0
+        while end is not None and end - current in periods:
+            current += 1
+        return current, longest
+
+    def random_completions(self, rng, habit_name):
+        days = rng.sample(range(1, 120), rng.randrange(0, 80)) + [0] * rng.randrange(0, 3)
+        completions = [(habit_name, self.TODAY - timedelta(days=day, hours=rng.randrange(12),
+                                                           microseconds=rng.randrange(1000000)))
+                       for day in days for _ in range(rng.randrange(1, 3))]
+        rng.shuffle(completions)
+        return completions
+
+    @freeze_time('2021-08-07 12:00')
+    def test_shuffled_inserts(self):
+        rng = random.Random(17)
+        for n in range(20):
+            daily, weekly = f"Walking{n}", f"Yoga{n}"
+            self.user.add_habit(daily, "Health", "Daily")
+            self.user.add_habit(weekly, "Health", "Weekly")
+            completions = self.random_completions(rng, daily) + self.random_completions(rng, weekly)
+            rng.shuffle(completions)
+            # stored in random batches, so later batches often backfill earlier ones
+            while completions:
+                size = rng.randrange(1, 20)
+                self.user.record_completions(completions[:size])
+                completions = completions[size:]
+
+            today = self.TODAY.date().toordinal()
+            for habit_name, grace, current_period, to_period in [
+                    (daily, 1, today, lambda day: day),
+                    (weekly, 0, streaks.week_ordinal(today), streaks.week_ordinal)]:
+                periodicity = "Daily" if grace else "Weekly"
+                progress = self.user.get_habit_progress(habit_name, periodicity) or []
+                assert progress == sorted(progress)
+                periods = {to_period(streaks.day_ordinal(row[0])) for row in progress}
+                assert list(self.user.iter_progress_periods(habit_name, periodicity)) == sorted(periods)
+
+                current, longest = self.reference_streaks(periods, current_period, grace)
+                if grace:
+                    assert self.user.compute_current_daily_streak(habit_name) == current
+                    assert self.user.compute_longest_daily_streak_habit(habit_name) == longest
+                else:
+                    assert self.user.compute_current_weekly_streak(habit_name) == current
+                    assert self.user.compute_longest_weekly_streak_habit(habit_name) == longest
+                assert self.user.get_stored_streaks()[habit_name] == self.user.compute_all_streaks()[habit_name] == \
+                    {"periodicity": periodicity, "current": current, "longest": longest}
+
+
+class TestWindowStats(TempDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user()
+        with freeze_time('2021-07-01'):
+            self.user.add_habit("Walking", "Health", "Daily")
+            self.user.add_habit("Yoga", "Health", "Weekly")
+        self.user.record_completions([("Walking", f"2021-08-0{day} 10:00") for day in [1, 2, 2, 5, 7]] +
+                                     [("Yoga", "2021-07-13 18:00"), ("Yoga", "2021-07-28 18:00"),
+                                      ("Yoga", "2021-07-29 18:00")])
+
+    @freeze_time('2021-08-07 12:00')
+    def test_daily_habit(self):
+        stats = self.user.compute_window_stats("Walking", days=7)
+        assert stats == {"periodicity": "Daily", "first_day": "2021-08-01", "last_day": "2021-08-07", "periods": 7,
+                         "completed": 4, "missed": 3, "missed_periods": ["2021-08-03", "2021-08-04", "2021-08-06"],
+                         "completion_rate": 4 / 7, "completions": 5,
+                         "best_week": {"week_start": "2021-08-02", "completions": 4}}
+        # the current day is not missed before it is over
+        assert self.user.compute_window_stats("Walking", days=2, today=date(2021, 8, 6))["missed_periods"] == []
+
+    @freeze_time('2021-08-07 12:00')
+    def test_weekly_habit(self):
+        stats = self.user.compute_window_stats("Yoga", weeks=4)
+        assert (stats["first_day"], stats["periods"], stats["completed"], stats["missed_periods"]) == \
+            ("2021-07-12", 4, 2, ["2021-07-19"])
+        assert stats["completion_rate"] == 2 / 3
+        assert stats["best_week"] == {"week_start": "2021-07-26", "completions": 2}
+        # a window of days covers every week it overlaps, the completions of the whole first week count
+        stats = self.user.compute_window_stats("Yoga", days=7)
+        assert (stats["first_day"], stats["periods"], stats["completed"], stats["missed"], stats["missed_periods"]) == \
+            ("2021-08-01", 2, 1, 0, [])
+        assert stats["completion_rate"] == 1 and stats["completions"] == 2
+        assert stats["best_week"] == {"week_start": "2021-07-26", "completions": 2}
+
+    @freeze_time('2021-08-07 12:00')
+    def test_periods_before_the_habit_existed(self):
+        with freeze_time('2021-08-05'):
+            self.user.add_habit("Reading", "Fun", "Daily")
+        stats = self.user.compute_window_stats("Reading", days=30)
+        assert (stats["periods"], stats["completed"], stats["missed"], stats["completion_rate"]) == (3, 0, 2, 0.0)
+        assert stats["best_week"] is None
+        # imported progress older than the habit counts from its first completion
+        self.user.record_completions([("Reading", "2021-08-03 10:00")])
+        assert self.user.compute_window_stats("Reading", days=30)["periods"] == 5
+
+    @freeze_time('2021-08-07 12:00')
+    def test_overview_and_errors(self):
+        overview = self.user.compute_window_overview(days=90)
+        assert list(overview) == ["Walking", "Yoga"]
+        assert overview["Walking"]["completions"] == 5
+        assert self.user.compute_window_stats("Running", days=7) is None
+        for window in [{}, {"days": 7, "weeks": 1}, {"days": 0}]:
+            with self.assertRaises(ValueError):
+                self.user.compute_window_stats("Walking", **window)
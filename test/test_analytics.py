@@ -0,0 +1,55 @@
+from unittest import TestCase
+from datetime import date
+
+import sys
+import os
+import csv
+import shutil
+import tempfile
+import analytics
+import database
+import initialisation
+import User
+
+# https://stackoverflow.com/a/11158224
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+
+class TestAnalytics(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "main_db.db")
+        shutil.copy(database.DEFAULT_DB_PATH, self.db_path)
+        database.configure(self.db_path)
+
+    def tearDown(self):
+        database.configure()
+        self.tmp.cleanup()
+
+    def test_partition(self):
+        assert analytics.partition(["a", "b", "c"], 2) == [["a", "c"], ["b"]]
+        assert analytics.partition(["a"], 4) == [["a"]]
+        assert analytics.partition([], 4) == [[]]
+
+    def test_run_report(self):
+        report_date = date(2021, 8, 7)
+        count = analytics.run_report(workers=2, report_date=report_date)
+        rows = database.get_connection().execute(
+            "SELECT owner, habit_name, current_streak, longest_streak, completions FROM streak_report "
+            "ORDER BY owner, habit_name").fetchall()
+        assert count == len(rows) == 9
+        assert ("testuser1", "Yoga", 2, 4, 11) in rows
+
+        user = initialisation.get_user("testuser2")
+        for habit_name, habit_streak in User.UserClass.compute_all_streaks(user, report_date).items():
+            assert ("testuser2", habit_name) in [row[:2] for row in rows]
+            assert [row[2:4] for row in rows if row[:2] == ("testuser2", habit_name)] == \
+                [(habit_streak["current"], habit_streak["longest"])]
+
+    def test_run_report_csv(self):
+        csv_path = os.path.join(self.tmp.name, "report.csv")
+        count = analytics.run_report(workers=2, csv_path=csv_path, report_date=date(2021, 8, 7))
+        with open(csv_path) as file:
+            rows = list(csv.reader(file))
+        assert rows[0] == analytics.REPORT_HEADER
+        assert len(rows) - 1 == count == 9
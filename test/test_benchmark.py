@@ -0,0 +1,38 @@
+from unittest import TestCase
+
+import sys
+import os
+import json
+import sqlite3
+import tempfile
+import benchmark
+
+# https://stackoverflow.com/a/11158224
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+
+class TestBenchmark(TestCase):
+    def test_generate_database(self):
+        with tempfile.TemporaryDirectory() as folder:
+            db_path = os.path.join(folder, "bench.db")
+            progress_rows = benchmark.generate_database(db_path, users=3, habits=4, years=1)
+            conn = sqlite3.connect(db_path)
+            assert conn.execute("SELECT count(*) FROM habits").fetchone()[0] == 12
+            assert conn.execute("SELECT count(*) FROM progress").fetchone()[0] == progress_rows > 0
+            assert conn.execute("SELECT count(*) FROM streaks").fetchone()[0] == 12
+            conn.close()
+
+    def test_run_and_compare(self):
+        with tempfile.TemporaryDirectory() as folder:
+            output = os.path.join(folder, "results.json")
+            report = benchmark.run(users=2, habits=2, years=1, sample_users=2, repeat=1,
+                                   db_path=os.path.join(folder, "bench.db"), output=output)
+            with open(output) as file:
+                assert json.load(file) == report
+            assert "compute_longest_weekly_streak_habit" in report["results"]
+            assert report["results"]["current_streak_overview"]["calls"] == 2
+            assert report["results"]["startup_cli_stats"]["calls"] == 1
+            assert [row[3] for row in benchmark.compare(report, report)] == [1.0] * len(report["results"])
+            # repeated reads of the stored streaks with and without the statement cache
+            assert report["statement_cache"]["uncached"]["calls"] == report["statement_cache"]["cached"]["calls"] == 20
+            assert report["statement_cache"]["ratio"] > 0
@@ -0,0 +1,57 @@
+from unittest.mock import patch
+
+import sys
+import os
+import io
+import subprocess
+import json
+import cli
+import database
+from . import TempDatabaseTestCase
+
+# https://stackoverflow.com/a/11158224
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+
+class TestCli(TempDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_user()
+
+    def run_cli(self, *argv):
+        with patch("sys.stdout", new_callable=io.StringIO) as stdout, patch("sys.stderr", new_callable=io.StringIO):
+            exit_code = cli.main(list(argv))
+        return exit_code, stdout.getvalue()
+
+    def test_login(self):
+        assert self.run_cli("login", "--user", "anna", "--password", "1234")[0] == 0
+        assert self.run_cli("login", "--user", "anna", "--password", "wrong")[0] == 1
+        assert self.run_cli("login", "--user", "nobody", "--password", "1234")[0] == 1
+        with patch.dict(os.environ, {"HABIT_TRACKER_PASSWORD": "1234"}):
+            assert self.run_cli("login", "--user", "anna")[0] == 0
+
+    def test_create_complete_stats_delete(self):
+        login = ["--user", "anna", "--password", "1234"]
+        assert self.run_cli("create", *login, "--habit", "Yoga", "--category", "Health",
+                            "--periodicity", "Weekly")[0] == 0
+        assert self.run_cli("create", *login, "--habit", "Yoga", "--category", "Health",
+                            "--periodicity", "Daily")[0] == 1
+        assert self.run_cli("complete", *login, "--habit", "Yoga")[0] == 0
+        assert self.run_cli("complete", *login, "--habit", "Yoga", "--habit", "Running")[0] == 1
+        assert self.run_cli("complete", *login, "--habit", "Yoga", "--at", "2021-08-07 11:57")[0] == 0
+        assert database.get_connection().execute("SELECT count(*) FROM progress").fetchone()[0] == 3
+
+        exit_code, output = self.run_cli("stats", *login, "--json")
+        assert exit_code == 0
+        assert json.loads(output) == {"Yoga": {"periodicity": "Weekly", "current": 1, "longest": 1}}
+
+        assert self.run_cli("delete", *login, "--habit", "Yoga")[0] == 0
+        assert self.run_cli("delete", *login, "--habit", "Yoga")[0] == 1
+        assert database.get_connection().execute("SELECT count(*) FROM progress").fetchone()[0] == 0
+
+    def test_commands_do_not_import_questionary(self):
+        # the prompt libraries are slow to import and only needed by the menu
+        folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run([sys.executable, "-c", "import sys, main, cli; print('questionary' in sys.modules)"],
+                                cwd=folder, capture_output=True, text=True, check=True).stdout
+        assert output.strip() == "False"
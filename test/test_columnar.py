@@ -0,0 +1,69 @@
+from datetime import date, datetime, timedelta
+
+import sys
+import os
+import random
+import numpy as np
+import columnar
+import User
+from . import TempDatabaseTestCase
+
+# https://stackoverflow.com/a/11158224
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+
+class TestColumnar(TempDatabaseTestCase):
+    def test_load_history(self):
+        user = self.make_user()
+        user.add_habit("Yoga", "Health", "Weekly")
+        user.add_habit("Walking", "Health", "Daily")
+        user.add_habit("Drawing", "Fun", "Weekly")
+        User.UserClass(None, None, "max", None).add_habit("Yoga", "Health", "Daily")
+        user.record_completions([("Walking", datetime(2021, 8, 6, 9, 30, 0, 5)), ("Yoga", "2021-08-02 18:00:00")])
+
+        history = user.get_progress_arrays()
+        assert list(history["habits"]["habit_name"]) == ["Yoga", "Walking", "Drawing"]
+        assert list(history["habits"]["weekly"]) == [True, False, True]
+        order = np.argsort(history["completed"])
+        assert history["completed"].dtype == np.dtype("datetime64[us]")
+        assert list(history["completed"][order]) == [np.datetime64("2021-08-02T18:00:00"),
+                                                     np.datetime64("2021-08-06T09:30:00.000005")]
+        assert list(history["habit_id"][order]) == [1, 2]
+        assert list(history["weekly"][order]) == [True, False]
+        assert list(history["day"][order]) == [date(2021, 8, 2).toordinal(), date(2021, 8, 6).toordinal()]
+
+        assert len(columnar.load_history(usernames=["nobody"])["habit_id"]) == 0
+        assert len(columnar.load_history()["habits"]["habit_id"]) == 4
+
+    def test_compute_streaks(self):
+        # the vectorized streaks must match the streaks computed habit by habit
+        rng = random.Random(5)
+        today = date(2021, 8, 7)
+        for n in range(5):
+            user = User.UserClass("Bench", "Mark", f"user{n}", "password")
+            user.store_in_db()
+            completions = []
+            for h in range(8):
+                habit_name = f"Habit{h}"
+                user.add_habit(habit_name, "Health", rng.choice(["Daily", "Weekly"]))
+                # some completions lie after the report date
+                completions += [(habit_name, datetime(2021, 8, 7, 9) - timedelta(days=rng.randrange(-5, 60)))
+                                for _ in range(rng.randrange(0, 40))]
+            user.record_completions(completions)
+
+        history = columnar.load_history()
+        result = columnar.compute_streaks(history, today)
+        computed = {}
+        for n in range(5):
+            for habit_name, habit_streak in User.UserClass(None, None, f"user{n}", None).compute_all_streaks(
+                    today).items():
+                computed[(f"user{n}", habit_name)] = (habit_streak["current"], habit_streak["longest"])
+        vectorized = {(owner, habit_name): (current, longest) for owner, habit_name, current, longest
+                      in zip(history["habits"]["owner"], history["habits"]["habit_name"], result["current"],
+                             result["longest"])}
+        assert vectorized == computed
+        assert any(current for current, longest in computed.values())
+
+    def test_empty_history(self):
+        result = columnar.compute_streaks(columnar.load_history())
+        assert len(result["habit_id"]) == len(result["current"]) == 0
@@ -0,0 +1,63 @@
+from unittest import TestCase
+
+import sys
+import os
+import sqlite3
+import tempfile
+import csv_io
+
+# https://stackoverflow.com/a/11158224
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+
+class TestCsvIo(TestCase):
+    def test_import_export(self):
+        conn = sqlite3.connect(":memory:")
+        imported = csv_io.import_all(DATA_FOLDER, conn, batch_size=10)
+        assert imported == {"users": 2, "habits": 9, "progress": 88}
+        assert conn.execute("SELECT count(*) FROM streaks").fetchone()[0] == 9
+
+        with tempfile.TemporaryDirectory() as folder:
+            exported = csv_io.export_all(folder, conn, batch_size=10)
+            assert exported == imported
+            for table in ["users", "habits", "progress"]:
+                with open(os.path.join(DATA_FOLDER, f"{table}.csv")) as original, \
+                        open(os.path.join(folder, f"{table}.csv")) as export:
+                    assert original.read().strip() == export.read().strip()
+
+    def test_import_twice(self):
+        conn = sqlite3.connect(":memory:")
+        csv_io.import_all(DATA_FOLDER, conn)
+        imported = csv_io.import_all(DATA_FOLDER, conn)
+        assert imported == {"users": 0, "habits": 0, "progress": 0}
+        assert conn.execute("SELECT count(*) FROM progress").fetchone()[0] == 88
+        assert conn.execute("SELECT sum(completions) FROM completion_counts "
+                            "WHERE period_type = 'Daily'").fetchone()[0] == 88
+
+    def test_round_trip_with_duplicates(self):
+        conn = sqlite3.connect(":memory:")
+        csv_io.import_all(DATA_FOLDER, conn)
+        # a second completion of the same habit at the same date and time
+        conn.execute("INSERT INTO progress (habit_id, datetime_of_completion, completed_at, day_ordinal) "
+                     "SELECT habit_id, datetime_of_completion, completed_at, day_ordinal FROM progress "
+                     "WHERE progress_id = 1")
+        conn.commit()
+
+        copy = sqlite3.connect(":memory:")
+        with tempfile.TemporaryDirectory() as folder:
+            csv_io.export_all(folder, conn)
+            assert csv_io.import_all(folder, copy)["progress"] == 89
+            assert csv_io.import_all(folder, copy)["progress"] == 0
+        assert copy.execute("SELECT count(*) FROM progress").fetchone()[0] == 89
+        assert copy.execute("SELECT sum(completions) FROM completion_counts "
+                            "WHERE period_type = 'Daily'").fetchone()[0] == 89
+
+    def test_wrong_header(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "users.csv")
+            with open(path, "w") as file:
+                file.write("username,password\n")
+            with self.assertRaises(ValueError):
+                list(csv_io.read_rows(path, csv_io.USERS_HEADER))
@@ -0,0 +1,152 @@
+from unittest import TestCase
+
+import sys
+import os
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import database
+import User
+from . import TempDatabaseTestCase
+
+# https://stackoverflow.com/a/11158224
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+
+class TestConnectionPool(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pool = database.ConnectionPool(os.path.join(self.tmp.name, "test.db"), pool_size=2, timeout=0.1)
+
+    def tearDown(self):
+        self.pool.close()
+        self.tmp.cleanup()
+
+    def test_thread_local_connection(self):
+        conn = self.pool.get_connection()
+        assert self.pool.get_connection() is conn
+        assert self.pool.get_cursor().connection is conn
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(self.pool.get_connection()))
+        thread.start()
+        thread.join()
+        assert other[0] is not conn
+
+    def test_connection_returns_to_pool_when_thread_ends(self):
+        for _ in range(10):
+            thread = threading.Thread(target=self.pool.get_connection)
+            thread.start()
+            thread.join()
+        # only two connections may exist, so all threads must have given theirs back
+        with self.pool.connection() as first, self.pool.connection() as second:
+            assert first is not second
+
+    def test_pool_is_bounded(self):
+        with self.pool.connection(), self.pool.connection():
+            with self.assertRaises(sqlite3.OperationalError):
+                self.pool.acquire()
+
+    def test_configure(self):
+        db_path = os.path.join(self.tmp.name, "configured.db")
+        database.configure(db_path)
+        try:
+            assert database.get_db_path() == db_path
+            database.get_connection().execute("CREATE TABLE t (x integer)")
+            assert os.path.exists(db_path)
+        finally:
+            database.configure()
+        assert database.get_db_path() == database.DEFAULT_DB_PATH
+
+    def test_storage_options(self):
+        conn = self.pool.get_connection()
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == database.BUSY_TIMEOUT * 1000
+        assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+
+
+class TestRunWrite(TestCase):
+    def setUp(self):
+        self.conn = database.configure_connection(sqlite3.connect(":memory:"))
+        self.conn.execute("CREATE TABLE t (x integer)")
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_retries_while_locked(self):
+        calls = []
+
+        def write(conn, value):
+            calls.append(value)
+            conn.execute("INSERT INTO t VALUES(?)", (value,))
+            if len(calls) < 3:
+                raise sqlite3.OperationalError("database is locked")
+            return value
+
+        assert database.run_write(self.conn, write, 7, delay=0) == 7
+        assert calls == [7, 7, 7]
+        # the failed attempts were rolled back
+        assert self.conn.execute("SELECT x FROM t").fetchall() == [(7,)]
+
+    def test_gives_up_after_the_last_attempt(self):
+        def write(conn):
+            raise sqlite3.OperationalError("database is locked")
+
+        with self.assertRaises(sqlite3.OperationalError):
+            database.run_write(self.conn, write, attempts=2, delay=0)
+        assert not self.conn.in_transaction
+
+    def test_other_errors_are_not_retried(self):
+        calls = []
+
+        def write(conn):
+            calls.append(1)
+            conn.execute("INSERT INTO t VALUES(1)")
+            conn.execute("INSERT INTO missing_table VALUES(1)")
+
+        with self.assertRaises(sqlite3.OperationalError):
+            database.run_write(self.conn, write, delay=0)
+        assert calls == [1]
+        assert self.conn.execute("SELECT count(*) FROM t").fetchone()[0] == 0
+
+    def test_open_transaction(self):
+        self.conn.execute("INSERT INTO t VALUES(1)")
+        with self.assertRaises(sqlite3.ProgrammingError):
+            database.run_write(self.conn, lambda conn: None)
+
+
+class TestParallelWriters(TempDatabaseTestCase):
+    PROCESSES = 4
+    COMPLETIONS = 25
+
+    def setUp(self):
+        super().setUp()
+        self.make_user().add_habit("Yoga", "Health", "Daily")
+
+    def test_parallel_completions(self):
+        folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        script = ("import User\n"
+                  "user = User.UserClass(None, None, 'anna', None)\n"
+                  f"for _ in range({self.COMPLETIONS}):\n"
+                  "    assert user.complete_habit('Yoga')\n")
+        # an open read transaction must not block the writers (WAL)
+        reader = sqlite3.connect(self.db_path)
+        reader.execute("BEGIN")
+        assert reader.execute("SELECT count(*) FROM progress").fetchone()[0] == 0
+
+        writers = [subprocess.Popen([sys.executable, "-c", script], cwd=folder, stderr=subprocess.PIPE, text=True,
+                                    env=dict(os.environ, HABIT_TRACKER_DB=self.db_path))
+                   for _ in range(self.PROCESSES)]
+        for writer in writers:
+            _, errors = writer.communicate(timeout=60)
+            assert writer.returncode == 0, errors
+        # the reader still sees its snapshot
+        assert reader.execute("SELECT count(*) FROM progress").fetchone()[0] == 0
+        reader.close()
+
+        conn = database.get_connection()
+        assert conn.execute("SELECT count(*) FROM progress").fetchone()[0] == self.PROCESSES * self.COMPLETIONS
+        # every completion updated the streak inside its own transaction, none got lost
+        assert User.UserClass(None, None, "anna", None).get_stored_streaks()["Yoga"]["current"] == 1
@@ -2,6 +2,7 @@ from unittest import TestCase
 
 import sys
 import os
+import sqlite3
 import initialisation
 import User
 
@@ -15,4 +16,33 @@ class Test(TestCase):
         non_existing_user = initialisation.get_user("non_existing_user")
 
         assert type(test_user) == User.UserClass
-        assert non_existing_user is None
\ No newline at end of file
+        assert non_existing_user is None
+
+    def test_migrate_database(self):
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE TABLE users (firstname text, lastname text, username text PRIMARY KEY, password text)")
+        conn.execute("CREATE TABLE habits (habit_name text, owner text, category text, periodicity text, "
+                     "datetime_of_creation datetime)")
+        conn.execute("CREATE TABLE progress (habit_name text, periodicity text, owner text, "
+                     "datetime_of_completion datetime)")
+        conn.execute("INSERT INTO habits VALUES('Yoga', 'anna', 'Health', 'Weekly', '2021-07-26 18:18:00.915870')")
+        conn.execute("INSERT INTO habits VALUES('Yoga', 'max', 'Health', 'Daily', '2021-07-26 18:18:00.915870')")
+        conn.execute("INSERT INTO progress VALUES('Yoga', 'Weekly', 'anna', '2021-08-06 14:27:40.303914')")
+        conn.execute("INSERT INTO progress VALUES('Yoga', 'Daily', 'max', '2021-08-07 14:27:40.303914')")
+        conn.execute("INSERT INTO progress VALUES('Deleted', 'Daily', 'max', '2021-08-07 14:27:40.303914')")
+        conn.commit()
+
+        initialisation.migrate_database(conn)
+        progress = conn.execute("SELECT habits.owner, progress.datetime_of_completion FROM progress "
+                                "JOIN habits ON habits.habit_id = progress.habit_id ORDER BY progress_id").fetchall()
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == initialisation.SCHEMA_VERSION
+        assert progress == [('anna', '2021-08-06 14:27:40.303914'), ('max', '2021-08-07 14:27:40.303914')]
+        assert conn.execute("SELECT day_ordinal, completed_at FROM progress ORDER BY progress_id").fetchall() == \
+            [(738008, 1628260060), (738009, 1628346460)]
+        assert conn.execute("SELECT * FROM completion_counts ORDER BY habit_id, period_type").fetchall() == \
+            [(1, 'Daily', 738008, 1), (1, 'Weekly', 105429, 1), (2, 'Daily', 738009, 1), (2, 'Weekly', 105429, 1)]
+
+        # a second run leaves the migrated database untouched
+        initialisation.migrate_database(conn)
+        assert conn.execute("SELECT count(*) FROM habits").fetchone()[0] == 2
+
@@ -0,0 +1,62 @@
+from unittest import TestCase
+
+import sys
+import os
+import json
+import sqlite3
+import tempfile
+import loadtest
+
+# https://stackoverflow.com/a/11158224
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+
+class TestLoadTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "load.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_prepare_database(self):
+        plan = loadtest.prepare_database(self.db_path, users=3)
+        assert [username for username, _ in plan] == ["load0", "load1", "load2"]
+        conn = sqlite3.connect(self.db_path)
+        # load2 is a copy of the first user of the data folder again
+        assert conn.execute("SELECT count(*) FROM progress JOIN habits ON habits.habit_id = progress.habit_id "
+                            "WHERE owner = 'load0'").fetchone()[0] == \
+            conn.execute("SELECT count(*) FROM progress JOIN habits ON habits.habit_id = progress.habit_id "
+                         "WHERE owner = 'load2'").fetchone()[0] > 0
+        assert conn.execute("SELECT count(*) FROM streaks").fetchone()[0] == sum(len(habits) for _, habits in plan)
+        conn.close()
+
+    def test_parse_mix(self):
+        assert loadtest.parse_mix("complete=2,stats") == {"complete": 2.0, "stats": 1.0}
+        with self.assertRaises(ValueError):
+            loadtest.parse_mix("sleep=1")
+
+    def test_run(self):
+        output = os.path.join(self.tmp.name, "load.json")
+        report = loadtest.run(users=4, processes=1, threads=3, duration=0.3, db_path=self.db_path, output=output)
+        with open(output) as file:
+            assert json.load(file) == report
+        results = report["results"]
+        assert results["all"]["calls"] == sum(results[name]["calls"] for name in loadtest.DEFAULT_MIX) > 0
+        assert results["all"]["busy"] == results["all"]["errors"] == 0
+        assert results["all"]["p50_ms"] <= results["all"]["p99_ms"] <= results["all"]["max_ms"]
+
+        conn = sqlite3.connect(self.db_path)
+        loadtest.prepare_database(os.path.join(self.tmp.name, "fresh.db"), users=4)
+        fresh = sqlite3.connect(os.path.join(self.tmp.name, "fresh.db"))
+        # every completion of the load test was stored
+        assert conn.execute("SELECT count(*) FROM progress").fetchone()[0] == \
+            fresh.execute("SELECT count(*) FROM progress").fetchone()[0] + results["complete"]["calls"]
+        conn.close()
+        fresh.close()
+
+    def test_several_processes(self):
+        report = loadtest.run(users=2, processes=2, threads=2, duration=0.2, mix={"complete": 1, "stats": 1},
+                              db_path=self.db_path)
+        assert report["results"]["complete"]["calls"] > 0
+        assert report["results"]["all"]["errors"] == 0
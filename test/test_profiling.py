@@ -0,0 +1,76 @@
+from freezegun import freeze_time
+
+import sys
+import os
+import io
+import json
+import sqlite3
+import subprocess
+import database
+import profiling
+import queries
+import User
+from . import TempDatabaseTestCase
+
+# https://stackoverflow.com/a/11158224
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+
+class TestProfiling(TempDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_user()
+        profiling.reset()
+
+    def tearDown(self):
+        profiling.disable()
+        profiling.reset()
+        super().tearDown()
+
+    def test_disabled_by_default(self):
+        assert type(database.get_connection()) is sqlite3.Connection
+        assert not hasattr(User.UserClass.compute_all_streaks, "__wrapped__")
+        User.UserClass(None, None, "anna", None).compute_all_streaks()
+        assert profiling.summary() == {"sql": [], "method": []}
+
+    @freeze_time('2021-08-07 12:00')
+    def test_enable(self):
+        profiling.enable()
+        user = User.UserClass(None, None, "anna", None)
+        user.add_habit("Walking", "Health", "Daily")
+        user.record_completions(["Walking", "Walking"])
+        assert user.compute_current_daily_streak("Walking") == 1
+        user.compute_all_streaks()
+
+        result = profiling.summary()
+        methods = {entry["name"]: entry for entry in result["method"]}
+        assert methods["UserClass.compute_current_daily_streak"]["calls"] == 1
+        assert methods["UserClass.compute_all_streaks"]["calls"] == 1
+        statements = {entry["name"]: entry for entry in result["sql"]}
+        insert = next(entry for name, entry in statements.items() if name.startswith("INSERT INTO progress"))
+        assert insert["calls"] == 1 and insert["rows"] == 2
+        # the day of the completions is read from the rollup table by iterating over the cursor
+        periods = next(entry for name, entry in statements.items() if name.startswith("SELECT period FROM"))
+        assert periods["rows"] == 1
+
+        output = io.StringIO()
+        json_path = os.path.join(self.tmp.name, "profile.json")
+        profiling.write_summary(output, json_path)
+        assert "UserClass.compute_all_streaks" in output.getvalue()
+        with open(json_path) as file:
+            assert json.load(file) == result
+
+        profiling.disable()
+        assert type(database.get_connection()) is sqlite3.Connection
+        assert not hasattr(User.UserClass.compute_all_streaks, "__wrapped__")
+
+    def test_command_line(self):
+        folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        json_path = os.path.join(self.tmp.name, "profile.json")
+        process = subprocess.run([sys.executable, "main.py", f"--profile={json_path}", "stats", "--user", "anna",
+                                  "--password", "1234"], cwd=folder, capture_output=True, text=True,
+                                 env=dict(os.environ, HABIT_TRACKER_DB=self.db_path))
+        assert process.returncode == 0, process.stderr
+        assert "SQL statements" in process.stderr
+        with open(json_path) as file:
+            assert any(entry["name"] == queries.SELECT_USER for entry in json.load(file)["sql"])
@@ -0,0 +1,28 @@
+from unittest.mock import patch
+
+import sys
+import os
+import initialisation
+import User
+from . import TempDatabaseTestCase
+
+# https://stackoverflow.com/a/11158224
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+
+class TestQueries(TempDatabaseTestCase):
+    def test_quotes(self):
+        User.UserClass("Seán", "O'Brien", "o'brien", initialisation.hash_password("1234")).store_in_db()
+        user = initialisation.authenticate("o'brien", "1234")
+        assert user.lastname == "O'Brien"
+        user.add_habit("Tom's walk", "Health", "Daily")
+        assert user.change_habit("Tom's walk", periodicity="Weekly").periodicity == "Weekly"
+        assert user.complete_habit("Tom's walk")
+        assert user.get_stored_streaks()["Tom's walk"]["current"] == 1
+
+        with patch("questionary.select") as select, patch("questionary.text") as text:
+            select.return_value.ask.return_value = "(2) last name"
+            text.return_value.ask.return_value = "D'Arcy'; DROP TABLE users; --"
+            user.update_profile()
+        assert initialisation.get_user("o'brien").lastname == "D'Arcy'; DROP TABLE users; --"
+
@@ -0,0 +1,64 @@
+from datetime import date, datetime, timedelta
+
+import sys
+import os
+import random
+import database
+import rollup
+import streaks
+from . import TempDatabaseTestCase
+
+# https://stackoverflow.com/a/11158224
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+
+class TestRollup(TempDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.conn = database.get_connection()
+        for habit_name in ["Yoga", "Walking"]:
+            self.conn.execute("INSERT INTO habits (habit_name, owner, category, periodicity, datetime_of_creation) "
+                              "VALUES(?, 'anna', 'Health', 'Daily', '2020-01-01 00:00:00')", (habit_name,))
+
+    def store(self, completions):
+        self.conn.executemany("INSERT INTO progress (habit_id, datetime_of_completion, completed_at, day_ordinal) "
+                              "VALUES(?, ?, ?, ?)",
+                              [(habit_id, datetime_of_completion, *streaks.completion_columns(datetime_of_completion))
+                               for habit_id, datetime_of_completion in completions])
+        rollup.add_completions(self.conn, completions)
+
+    def counts(self):
+        return self.conn.execute("SELECT * FROM completion_counts").fetchall()
+
+    def test_add_completions_matches_rebuild(self):
+        rng = random.Random(3)
+        # two years around the turn of the year, so week 52 / 53 / 1 are included
+        first_day = datetime(2020, 12, 1, 8)
+        for _ in range(10):
+            self.store([(rng.choice([1, 2]), first_day + timedelta(days=rng.randrange(60), hours=rng.randrange(12)))
+                        for _ in range(rng.randrange(1, 30))])
+        incremental = self.counts()
+        rollup.rebuild_completion_counts(self.conn)
+        assert self.counts() == incremental
+        rollup.rebuild_completion_counts(self.conn, [2])
+        assert self.counts() == incremental
+        assert sum(row[3] for row in incremental if row[1] == "Weekly") == \
+            self.conn.execute("SELECT count(*) FROM progress").fetchone()[0]
+
+    def test_periods(self):
+        # Thursday 31.12.2020 (week 53) twice, Monday 04.01.2021 (week 1) and Tuesday 05.01.2021
+        self.store([(1, datetime(2020, 12, 31, 9)), (1, datetime(2020, 12, 31, 18)), (1, datetime(2021, 1, 4, 9)),
+                    (1, datetime(2021, 1, 5, 9))])
+        days = [date(2020, 12, 31).toordinal(), date(2021, 1, 4).toordinal(), date(2021, 1, 5).toordinal()]
+        weeks = [streaks.week_ordinal(days[0]), streaks.week_ordinal(days[1])]
+        assert list(rollup.iter_periods(self.conn, 1, "Daily")) == days
+        assert list(rollup.iter_periods(self.conn, 1, "Weekly", newest_first=True)) == weeks[::-1]
+        assert weeks[1] - weeks[0] == 1
+        assert rollup.count_in_period(self.conn, 1, "Daily", days[0]) == 2
+        assert rollup.count_in_period(self.conn, 1, "Weekly", weeks[1]) == 2
+        assert rollup.count_in_period(self.conn, 2, "Weekly", weeks[1]) == 0
+
+    def test_deleted_habit(self):
+        self.store([(1, datetime(2021, 8, 7, 9)), (2, datetime(2021, 8, 7, 9))])
+        self.conn.execute("DELETE FROM habits WHERE habit_id = 1")
+        assert {row[0] for row in self.counts()} == {2}
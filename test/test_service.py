@@ -0,0 +1,106 @@
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+import sys
+import os
+import asyncio
+import base64
+import json
+import database
+import service
+from . import TempDatabaseTestCase
+
+# https://stackoverflow.com/a/11158224
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+
+# setUp() of TempDatabaseTestCase runs before asyncSetUp(), its tearDown() after asyncTearDown()
+class TestHabitService(TempDatabaseTestCase, IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.make_user()
+        self.service = service.HabitService()
+        server = await self.service.start("127.0.0.1", 0)
+        self.port = server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        await self.service.close()
+
+    async def request(self, method, path, payload=None, password="1234"):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        credentials = base64.b64encode(f"anna:{password}".encode("utf-8")).decode("ascii")
+        writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nAuthorization: Basic {credentials}\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        head, _, body = response.partition(b"\r\n\r\n")
+        return int(head.split()[1]), json.loads(body)
+
+    async def test_habits(self):
+        status, habit = await self.request("POST", "/habits", {"habit_name": "Yoga", "category": "Health",
+                                                               "periodicity": "Weekly"})
+        assert status == 201 and habit["habit_name"] == "Yoga"
+        assert (await self.request("POST", "/habits", {"habit_name": "Yoga", "category": "Health",
+                                                       "periodicity": "Weekly"}))[0] == 409
+        assert (await self.request("POST", "/habits", {"habit_name": "Yoga", "category": "Sleep",
+                                                       "periodicity": "Weekly"}))[0] == 400
+
+        status, habit = await self.request("PATCH", "/habits/Yoga", {"periodicity": "Daily"})
+        assert status == 200 and habit == dict(habit, category="Health", periodicity="Daily")
+        status, result = await self.request("GET", "/habits")
+        assert [habit["habit_name"] for habit in result["habits"]] == ["Yoga"]
+
+        assert (await self.request("DELETE", "/habits/Yoga"))[0] == 200
+        assert (await self.request("GET", "/habits/Yoga"))[0] == 404
+        assert (await self.request("PUT", "/habits/Yoga"))[0] == 405
+
+    async def test_completions_and_stats(self):
+        await self.request("POST", "/habits", {"habit_name": "Walking", "category": "Health", "periodicity": "Daily"})
+        assert (await self.request("POST", "/habits/Walking/completions", {}))[0] == 201
+        status, result = await self.request("POST", "/completions", {"completions": [
+            {"habit": "Walking", "at": "2021-08-06 10:00"}, {"habit": "Swimming"}]})
+        assert status == 201 and result == {"recorded": 1, "unknown": ["Swimming"]}
+        assert (await self.request("POST", "/habits/Walking/completions", {"at": "yesterday"}))[0] == 400
+
+        status, habit = await self.request("GET", "/habits/Walking")
+        assert habit["current"] == 1 and habit["completions_in_current_period"] == 1
+        status, result = await self.request("GET", "/stats")
+        assert result["streaks"]["Walking"] == {"periodicity": "Daily", "current": 1, "longest": 1}
+
+        status, stats = await self.request("GET", "/habits/Walking/stats?days=7")
+        assert status == 200 and stats["completed"] == 1 and stats["completions"] == 1
+        status, result = await self.request("GET", "/stats?weeks=4")
+        assert result["window"]["Walking"]["completions"] == 1
+        assert (await self.request("GET", "/habits/Walking/stats?days=7&weeks=1"))[0] == 400
+        assert (await self.request("GET", "/habits/Walking/stats?days=many"))[0] == 400
+        assert (await self.request("GET", "/habits/Running/stats?days=7"))[0] == 404
+
+    async def test_authentication(self):
+        assert (await self.request("GET", "/habits", password="wrong"))[0] == 401
+        assert (await self.request("GET", "/health", password="wrong"))[0] == 200
+
+    async def test_concurrent_clients(self):
+        await self.request("POST", "/habits", {"habit_name": "Yoga", "category": "Health", "periodicity": "Daily"})
+        results = await asyncio.gather(*[self.request("POST", "/habits/Yoga/completions", {})
+                                         for _ in range(200)])
+        assert [status for status, _ in results] == [201] * 200
+        conn = database.get_connection()
+        assert conn.execute("SELECT count(*) FROM progress").fetchone()[0] == 200
+        assert conn.execute("SELECT sum(completions) FROM completion_counts "
+                            "WHERE period_type = 'Daily'").fetchone()[0] == 200
+
+    async def test_too_many_pending_requests(self):
+        self.service.max_pending = 1
+        headers = {"authorization": "Basic " + base64.b64encode(b"anna:1234").decode("ascii")}
+        results = await asyncio.gather(*[self.service.handle_request("GET", "/stats", headers, b"")
+                                         for _ in range(5)])
+        assert [status for status, _ in results] == [200, 503, 503, 503, 503]
+
+    async def test_unexpected_error_is_logged(self):
+        headers = {"authorization": "Basic " + base64.b64encode(b"anna:1234").decode("ascii")}
+        with patch("User.UserClass.get_all_habits", side_effect=RuntimeError("broken")), \
+                self.assertLogs("service", level="ERROR") as logs:
+            status, payload = await self.service.handle_request("GET", "/habits", headers, b"")
+        assert status == 500 and payload == {"error": "Internal server error."}
+        assert "GET /habits failed" in logs.output[0] and "RuntimeError: broken" in logs.output[0]
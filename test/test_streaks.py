@@ -0,0 +1,95 @@
+from unittest import TestCase
+from datetime import date, datetime
+
+import sys
+import os
+import sqlite3
+import numpy as np
+import initialisation
+import rollup
+import streaks
+
+# https://stackoverflow.com/a/11158224
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+
+class TestStreaks(TestCase):
+    def test_day_ordinal(self):
+        expected = date(2021, 8, 7).toordinal()
+        assert streaks.day_ordinal('2021-08-07 11:57:59.369350') == expected
+        assert streaks.day_ordinal('2021-08-07 11:57:59') == expected
+        assert streaks.day_ordinal(datetime(2021, 8, 7, 11, 57)) == expected
+        assert streaks.day_ordinal(date(2021, 8, 7)) == expected
+
+    def test_completion_columns(self):
+        completed_at, day = streaks.completion_columns('2021-08-07 11:57:59.369350')
+        # the time is read as UTC, whatever the time zone of the machine
+        assert completed_at == 1628337479
+        assert day == date(2021, 8, 7).toordinal()
+        assert streaks.completion_columns('2021-08-07 11:57:59') == (completed_at, day)
+        # the same as the NumPy datetime64 values of columnar.py
+        assert completed_at == np.datetime64('2021-08-07T11:57:59.369350').astype('datetime64[s]').astype('int64')
+
+    def test_day_ordinals_datetime64(self):
+        timestamps = np.array(['2021-08-06T14:27:55', '2021-08-07T11:57:59'], dtype='datetime64[us]')
+        days = streaks.day_ordinals(timestamps)
+        assert list(days) == [date(2021, 8, 6).toordinal(), date(2021, 8, 7).toordinal()]
+
+    def test_week_ordinal(self):
+        # Monday to Sunday share one week, the following Monday starts the next week
+        monday = streaks.week_ordinal(date(2021, 8, 2).toordinal())
+        assert streaks.week_ordinal(date(2021, 8, 8).toordinal()) == monday
+        assert streaks.week_ordinal(date(2021, 8, 9).toordinal()) == monday + 1
+        # week 52 of 2020 is followed by week 53 and week 1 of 2021
+        assert streaks.week_ordinal(date(2021, 1, 4).toordinal()) - \
+            streaks.week_ordinal(date(2020, 12, 21).toordinal()) == 2
+
+    def test_compute_streaks(self):
+        assert streaks.compute_streaks([], 10) == (0, 0)
+        assert streaks.compute_streaks([1, 2, 2, 3, 5, 6, 10], 10) == (1, 3)
+        assert streaks.compute_streaks([1, 2, 3, 7, 8, 9], 10) == (0, 3)
+        assert streaks.compute_streaks([7, 8, 9], 10, grace=1) == (3, 3)
+        assert streaks.compute_streaks(np.array([8, 9, 10, 11, 12, 13]), 10) == (3, 6)
+
+    def test_compute_streaks_unsorted(self):
+        with self.assertRaises(ValueError):
+            streaks.compute_streaks([3, 1, 2], 3)
+
+    def test_current_streak(self):
+        for periods, current_period, grace in [([], 10, 0), ([1, 2, 2, 3, 5, 6, 10], 10, 0), ([1, 2, 3, 7, 8, 9], 10, 0),
+                                               ([7, 8, 9], 10, 1), ([8, 9, 10, 11, 12, 13], 10, 0),
+                                               ([9, 9, 10, 12], 11, 1)]:
+            current, longest = streaks.compute_streaks(periods, current_period, grace)
+            assert streaks.current_streak(reversed(periods), current_period, grace) == current
+
+    def test_current_streak_stops_early(self):
+        def newest_first():
+            yield from [10, 9, 9, 8, 5]
+            raise AssertionError("the periods after the break must not be read")
+
+        assert streaks.current_streak(newest_first(), 10) == 3
+        with self.assertRaises(ValueError):
+            streaks.current_streak([2, 1, 3], 2)
+
+    def test_record_completions(self):
+        conn = sqlite3.connect(":memory:")
+        initialisation.migrate_database(conn)
+        conn.execute("INSERT INTO habits (habit_name, owner, category, periodicity, datetime_of_creation) "
+                     "VALUES('Yoga', 'anna', 'Health', 'Daily', '2021-07-26 18:18:00.915870')")
+        completions = [datetime(2021, 8, day, 12) for day in [1, 2, 2, 3, 5, 6, 4]]
+        for datetime_of_completion in completions:
+            conn.execute("INSERT INTO progress (habit_id, datetime_of_completion, completed_at, day_ordinal) "
+                         "VALUES(1, ?, ?, ?)",
+                         (datetime_of_completion, *streaks.completion_columns(datetime_of_completion)))
+            rollup.add_completions(conn, [(1, datetime_of_completion)])
+            streaks.record_completions(conn, [(1, "Daily", datetime_of_completion)])
+            stored = conn.execute("SELECT * FROM streaks").fetchall()
+            streaks.rebuild_streak_table(conn)
+            assert conn.execute("SELECT * FROM streaks").fetchall() == stored
+        assert stored == [(1, 6, 6, date(2021, 8, 6).toordinal())]
+
+    def test_current_from_table(self):
+        assert streaks.current_from_table(None, None, 10) == 0
+        assert streaks.current_from_table(3, 10, 10) == 3
+        assert streaks.current_from_table(3, 9, 10, grace=1) == 3
+        assert streaks.current_from_table(3, 9, 10) == 0